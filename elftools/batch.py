@@ -0,0 +1,212 @@
+#-------------------------------------------------------------------------------
+# elftools: batch.py
+#
+# Analysis of many ELF files in a pool of worker processes
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from collections import namedtuple
+from concurrent.futures import (ProcessPoolExecutor, FIRST_COMPLETED,
+        wait)
+from concurrent.futures.process import BrokenProcessPool
+import itertools
+import os
+import pickle
+import signal
+import threading
+import time
+
+from .elf.elffile import ELFFile
+
+
+FileResult = namedtuple('FileResult', 'path value error elapsed')
+FileResult.__doc__ = """ The outcome of analyzing one file with analyze_files().
+
+    value is what the function returned, or None if it failed. error is the
+    exception it raised (a TimeoutError if it ran out of time), or None.
+    elapsed is the time spent on the file in seconds, including opening it.
+"""
+
+
+def analyze_files(func, paths, max_workers=None, chunksize=1, timeout=None,
+                  mmap=False):
+    """ Call func on an ELFFile for each of the given paths, in a pool of
+        max_workers processes (by default one per CPU), and yield a
+        FileResult for each path as soon as it's available. Results come in
+        completion order, not in the order of paths.
+
+        func must be picklable (e.g. a module-level function) and so must
+        the values it returns. Each ELFFile is opened in a worker with
+        ELFFile.load_from_path (memory-mapped if mmap is True), and is closed
+        when func returns.
+
+        Paths are sent to the workers in chunks of chunksize paths, to reduce
+        the overhead of the pool for many small files. paths may be any
+        iterable (such as a generator walking a directory tree); only a few
+        chunks per worker are pending at any time.
+
+        An exception raised for a file is reported in its FileResult and
+        doesn't stop the analysis of the other files. If timeout is given,
+        the analysis of a file is interrupted after timeout seconds; this
+        relies on SIGALRM, and is ignored on platforms without it. If a
+        worker process dies (e.g. killed by the OS for using too much
+        memory), all the files of its pending chunks fail with a
+        BrokenProcessPool error, and the pool is restarted for the other
+        files.
+    """
+    chunks = _iter_chunks(paths, chunksize)
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    pending = {}
+    try:
+        while True:
+            for chunk in itertools.islice(chunks, max_pending - len(pending)):
+                future = executor.submit(
+                    _analyze_chunk, func, chunk, timeout, mmap)
+                pending[future] = chunk
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool)
+                   for future in done):
+                # All the pending chunks fail with the pool
+                done, _ = wait(pending)
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+            for future in done:
+                chunk = pending.pop(future)
+                if future.exception() is not None:
+                    for path in chunk:
+                        yield FileResult(path, None, future.exception(), 0.0)
+                else:
+                    for result in future.result():
+                        yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class DWARFInfoHandle(object):
+    """ A picklable reference to the DWARF information of an ELF file, to
+        send to worker processes.
+
+        path, mmap and decompressed_cache_size are passed to
+        ELFFile.load_from_path, and relocate_dwarf_sections and follow_links
+        to its get_dwarf_info(). cu_offsets are offsets of CUs already known
+        (e.g. found by iterating the CUs in the parent process), passed to
+        DWARFInfo.add_known_CU_offsets(): they let get_CU_containing() start
+        from the nearest CU instead of scanning .debug_info from its
+        beginning.
+
+        Only these arguments are pickled. The file is opened by the first
+        call to get(), which returns the DWARFInfo, and closed by close().
+    """
+    def __init__(self, path, mmap=False, decompressed_cache_size=0,
+                 relocate_dwarf_sections=True, follow_links=True,
+                 cu_offsets=()):
+        self.path = path
+        self.mmap = mmap
+        self.decompressed_cache_size = decompressed_cache_size
+        self.relocate_dwarf_sections = relocate_dwarf_sections
+        self.follow_links = follow_links
+        self.cu_offsets = sorted(cu_offsets)
+        self._elffile = None
+        self._dwarfinfo = None
+
+    def get(self):
+        """ Return the DWARFInfo, opening the file the first time.
+        """
+        if self._dwarfinfo is None:
+            self._elffile = ELFFile.load_from_path(
+                self.path, mmap=self.mmap,
+                decompressed_cache_size=self.decompressed_cache_size)
+            self._dwarfinfo = self._elffile.get_dwarf_info(
+                relocate_dwarf_sections=self.relocate_dwarf_sections,
+                follow_links=self.follow_links)
+            self._dwarfinfo.add_known_CU_offsets(self.cu_offsets)
+        return self._dwarfinfo
+
+    def close(self):
+        if self._elffile is not None:
+            self._elffile.close()
+            self._elffile = self._dwarfinfo = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_elffile'] = state['_dwarfinfo'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+def _iter_chunks(paths, chunksize):
+    paths = iter(paths)
+    while True:
+        chunk = list(itertools.islice(paths, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ELFStructs shared by the files analyzed in a worker process
+_structs_cache = {}
+
+
+def _analyze_chunk(func, paths, timeout, mmap):
+    """ Analyze the given paths in a worker process, returning the list of
+        their FileResults.
+    """
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        value = error = None
+        try:
+            with _time_limit(timeout):
+                elffile = ELFFile.load_from_path(
+                    path, mmap=mmap, structs_cache=_structs_cache)
+                try:
+                    value = func(elffile)
+                finally:
+                    elffile.close()
+        except Exception as e:
+            error = e
+        result = FileResult(path, value, error, time.perf_counter() - start)
+        try:
+            pickle.dumps(result)
+        except Exception as e:
+            # Report values or exceptions that can't be sent back as errors
+            result = FileResult(path, None, RuntimeError(
+                'Result of %s cannot be pickled: %r' % (path, e)),
+                result.elapsed)
+        results.append(result)
+    return results
+
+
+class _time_limit(object):
+    """ Context manager raising TimeoutError in its block after the given
+        number of seconds, if SIGALRM is available.
+    """
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.enabled = (timeout is not None and hasattr(signal, 'SIGALRM') and
+                        threading.current_thread() is threading.main_thread())
+
+    def __enter__(self):
+        if self.enabled:
+            self.previous_handler = signal.signal(signal.SIGALRM,
+                                                  self._handle_alarm)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+
+    def __exit__(self, type, value, traceback):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+
+    def _handle_alarm(self, signum, frame):
+        raise TimeoutError('Analysis timed out after %s seconds' %
+                           self.timeout)
@@ -6,11 +6,20 @@
 # Eli Bendersky (eliben@gmail.com)
 # This code is in the public domain
 #-------------------------------------------------------------------------------
+from collections import OrderedDict
 from contextlib import contextmanager
+from io import BytesIO
 from .exceptions import ELFParseError, ELFError, DWARFError
 from ..construct import ConstructError, ULInt8
 import os
 
+try:
+    import mmap
+    _MMAP_TYPES = (mmap.mmap,)
+except ImportError:
+    # Jython
+    _MMAP_TYPES = ()
+
 
 def merge_dicts(*dicts):
     "Given any number of dicts, merges them into a new one."""
@@ -19,6 +28,12 @@ def merge_dicts(*dicts):
         result.update(d)
     return result
 
+def reverse_enum(enum):
+    """ Given a dict mapping enum names to values (see elf/enums.py), return
+        a dict mapping the values back to their names.
+    """
+    return dict((v, k) for k, v in enum.items() if k != '_default_')
+
 def bytes2str(b):
     """Decode a bytes object into a string."""
     return b.decode('latin-1')
@@ -74,6 +89,189 @@ def parse_cstring_from_stream(stream, stream_pos=None):
     return b''.join(chunks) if found else None
 
 
+def read_view(stream, offset, size):
+    """ Read |size| bytes at |offset| from the given stream. If the stream is
+        a memory mapping (an mmap object), a memoryview slice over the mapping
+        is returned instead of a copy of the data.
+    """
+    if isinstance(stream, _MMAP_TYPES):
+        return memoryview(stream)[offset:offset + size]
+    stream.seek(offset)
+    return stream.read(size)
+
+
+class BufferStream(object):
+    """ A read-only, seekable stream over a bytes-like object (bytes,
+        bytearray, mmap or memoryview). Unlike BytesIO, the underlying buffer
+        is not copied when the stream is created; only the ranges that are
+        actually read are.
+    """
+    def __init__(self, buf):
+        self._view = memoryview(buf)
+        if self._view.format != 'B' or self._view.ndim != 1:
+            self._view = self._view.cast('B')
+        self._size = self._view.nbytes
+        self._pos = 0
+
+    def read(self, size=-1):
+        start = self._pos
+        if size is None or size < 0:
+            end = self._size
+        else:
+            end = min(start + size, self._size)
+        if end <= start:
+            return b''
+        self._pos = end
+        return self._view[start:end].tobytes()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            pos = offset
+        elif whence == os.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == os.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError('Invalid whence (%r)' % whence)
+        if pos < 0:
+            raise ValueError('Negative seek position %d' % pos)
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def getbuffer(self):
+        return self._view
+
+    def getvalue(self):
+        return self._view.tobytes()
+
+    def close(self):
+        self._view.release()
+
+
+class LazyStream(object):
+    """ A proxy for a stream that is only created when it's first used.
+
+        factory:
+            A callable taking no arguments and returning the actual stream.
+            It's called at most once, the first time the stream is read,
+            seeked, etc.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._stream = None
+
+    @property
+    def loaded(self):
+        """ Whether the underlying stream has been created yet.
+        """
+        return self._stream is not None
+
+    def load(self):
+        """ Create the underlying stream (if not done yet) and return it.
+        """
+        if self._stream is None:
+            self._stream = self._factory()
+            self._factory = None
+            # Bind the hot stream methods directly on this object, so that
+            # from now on calls don't go through __getattr__.
+            self.read = self._stream.read
+            self.seek = self._stream.seek
+            self.tell = self._stream.tell
+        return self._stream
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't found on the object, i.e.
+        # for any stream method until the stream is loaded.
+        if name.startswith('__') or name in ('_factory', '_stream'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+def get_stream_buffer(stream):
+    """ Return the whole contents of the given stream as a bytes-like object,
+        if the stream allows it: bytes for a BytesIO, a memoryview for a
+        BufferStream, and the mapping itself for an mmap object. LazyStreams
+        are loaded. Return None for other streams.
+
+        Only BufferStreams and mmap objects are shared without copying.
+        BytesIO.getvalue() copies the contents once the BytesIO has been
+        written to, so callers should keep the result rather than call this
+        again.
+    """
+    if isinstance(stream, LazyStream):
+        stream = stream.load()
+    if isinstance(stream, BytesIO):
+        return stream.getvalue()
+    elif isinstance(stream, BufferStream):
+        return stream.getbuffer()
+    elif isinstance(stream, _MMAP_TYPES):
+        return stream
+    return None
+
+
+class LRUCache(object):
+    """ A mapping that keeps its most recently used entries, evicting the
+        least recently used ones once the total size of the entries goes over
+        max_size.
+
+        max_size:
+            The maximal total size of the entries.
+
+        sizeof:
+            A function returning the size of a value. If not given, each
+            entry counts for 1, so max_size is the maximal number of entries.
+    """
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.size = 0
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """ Return the value for key (marking it as recently used), or default
+            if key isn't in the cache.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """ Add an entry to the cache, evicting the least recently used ones
+            if needed. A value larger than max_size is not cached at all.
+        """
+        if key in self._entries:
+            self._remove(key)
+        value_size = self._value_size(value)
+        if value_size > self.max_size:
+            return
+        self._entries[key] = value
+        self.size += value_size
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _value_size(self, value):
+        return 1 if self._sizeof is None else self._sizeof(value)
+
+    def _remove(self, key):
+        self.size -= self._value_size(self._entries.pop(key))
+
+
 def elf_assert(cond, msg=''):
     """ Assert that cond is True, otherwise raise ELFError(msg)
     """
@@ -7,6 +7,7 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 from ..common.utils import struct_parse, dwarf_assert
+from .dieparser import compile_abbrev
 
 
 class AbbrevTable(object):
@@ -62,6 +63,8 @@ class AbbrevDecl(object):
     def __init__(self, code, decl):
         self.code = code
         self.decl = decl
+        # AbbrevDecoders by DWARFStructs, see get_decoder()
+        self._decoders = {}
 
     def has_children(self):
         """ Does the entry have children?
@@ -75,5 +78,16 @@ class AbbrevDecl(object):
         for attr_spec in self['attr_spec']:
             yield attr_spec.name, attr_spec.form
 
+    def get_decoder(self, structs):
+        """ Get the AbbrevDecoder decoding the attribute values of the entry
+            with the given DWARFStructs, or None if they can't be decoded
+            without the structs. It's compiled the first time it's needed.
+        """
+        try:
+            return self._decoders[structs]
+        except KeyError:
+            decoder = self._decoders[structs] = compile_abbrev(self, structs)
+            return decoder
+
     def __getitem__(self, entry):
         return self.decl[entry]
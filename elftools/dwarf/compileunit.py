@@ -6,11 +6,33 @@
 # Eli Bendersky (eliben@gmail.com)
 # This code is in the public domain
 #-------------------------------------------------------------------------------
-from bisect import bisect_right
-from .die import DIE
+from collections import namedtuple, OrderedDict
+
+from .die import DIE, _make_attributes
+from .dieparser import read_uleb128
 from ..common.utils import dwarf_assert
 
 
+# ScannedDIE - a DIE found by CompileUnit.scan_DIEs:
+#
+# offset:
+#   The offset of the DIE in the .debug_info section, to get the full DIE
+#   from with get_DIE_from_refaddr
+#
+# tag:
+#   The DW_TAG_* of the DIE
+#
+# attributes:
+#   An ordered dict of the AttributeValues of the scanned attributes of the
+#   DIE, by name
+#
+ScannedDIE = namedtuple('ScannedDIE', 'offset tag attributes')
+
+# The forms of the DW_AT_sibling references relative to the CU
+_CU_REF_FORMS = ('DW_FORM_ref1', 'DW_FORM_ref2', 'DW_FORM_ref4',
+                 'DW_FORM_ref8', 'DW_FORM_ref', 'DW_FORM_ref_udata')
+
+
 class CompileUnit(object):
     """ A DWARF compilation unit (CU).
 
@@ -55,16 +77,11 @@ class CompileUnit(object):
         # requested.
         self._abbrev_table = None
 
-        # A list of DIEs belonging to this CU.
-        # This list is lazily constructed as DIEs are iterated over.
-        self._dielist = []
-        # A list of file offsets, corresponding (by index) to the DIEs
-        # in `self._dielist`. This list exists separately from
-        # `self._dielist` to make it binary searchable, enabling the
-        # DIE population strategy used in `iter_DIE_children`.
-        # Like `self._dielist`, this list is lazily constructed
-        # as DIEs are iterated over.
-        self._diemap = []
+        # The top DIE of this CU, and a dict of the DIEs belonging to this CU
+        # by offset. The dict is lazily filled as DIEs are iterated over or
+        # looked up, in any order, at a constant cost per DIE.
+        self._top_DIE = None
+        self._dies = {}
 
     def dwarf_format(self):
         """ Get the DWARF format (32 or 64) for this CU
@@ -83,21 +100,16 @@ class CompileUnit(object):
         """ Get the top DIE (which is either a DW_TAG_compile_unit or
             DW_TAG_partial_unit) of this CU
         """
-
-        # Note that a top DIE always has minimal offset and is therefore
-        # at the beginning of our lists, so no bisect is required.
-        if len(self._diemap) > 0:
-            return self._dielist[0]
+        if self._top_DIE is not None:
+            return self._top_DIE
 
         top = DIE(
                 cu=self,
                 stream=self.dwarfinfo.debug_info_sec.stream,
                 offset=self.cu_die_offset)
 
-        self._dielist.insert(0, top)
-        self._diemap.insert(0, self.cu_die_offset)
-
-        top._translate_indirect_attributes() # Can't translate indirect attributes until the top DIE has been parsed to the end
+        self._top_DIE = top
+        self._dies[self.cu_die_offset] = top
 
         return top
 
@@ -105,7 +117,7 @@ class CompileUnit(object):
         """ Returns whether the top DIE in this CU has already been parsed and cached.
             No parsing on demand!
         """
-        return len(self._diemap) > 0        
+        return self._top_DIE is not None
 
     @property
     def size(self):
@@ -159,13 +171,12 @@ class CompileUnit(object):
 
             yield child
 
+            sibling = (child._get_attribute("DW_AT_sibling")
+                       if child.has_children else None)
             if not child.has_children:
                 cur_offset += child.size
-            elif "DW_AT_sibling" in child.attributes:
-                sibling = child.attributes["DW_AT_sibling"]
-                if sibling.form in ('DW_FORM_ref1', 'DW_FORM_ref2',
-                                    'DW_FORM_ref4', 'DW_FORM_ref8',
-                                    'DW_FORM_ref', 'DW_FORM_ref_udata'):
+            elif sibling is not None:
+                if sibling.form in _CU_REF_FORMS:
                     cur_offset = sibling.value + self.cu_offset
                 elif sibling.form == 'DW_FORM_ref_addr':
                     cur_offset = sibling.value
@@ -187,6 +198,38 @@ class CompileUnit(object):
 
                 cur_offset = child._terminator.offset + child._terminator.size
 
+    def scan_DIEs(self, tags=None, attributes=None, skip_children_of=()):
+        """ Scan the DIEs of this CU, in order of their appearance, yielding a
+            ScannedDIE for each one with a tag in tags, or for every DIE if
+            tags is None. Null DIEs are not yielded.
+
+            This is much cheaper than iter_DIEs for scans that only need a few
+            attributes of some DIEs: no DIE objects are created, only the
+            attributes named in attributes are translated and returned (all
+            of them if None), and the values of the others are skipped by
+            their size.
+
+            The children of the DIEs with a tag in skip_children_of are not
+            scanned. They are skipped with the DW_AT_sibling attribute of their
+            parent if it has one, and otherwise by the size of their
+            attributes.
+
+            The full DIE of a ScannedDIE is given by
+            get_DIE_from_refaddr(scanned.offset).
+        """
+        if tags is not None:
+            tags = frozenset(tags)
+        if attributes is not None:
+            attributes = frozenset(attributes)
+        skip_children_of = frozenset(skip_children_of)
+
+        buf = self.dwarfinfo._get_debug_info_buffer()
+        if buf is None:
+            return self._scan_DIE_subtree(
+                self.get_top_DIE(), tags, attributes, skip_children_of)
+        return self._scan_DIEs_from_buffer(
+            buf, tags, attributes, skip_children_of)
+
     #------ PRIVATE ------#
 
     def __getitem__(self, name):
@@ -209,6 +252,116 @@ class CompileUnit(object):
                     yield d
             yield die._terminator
 
+    def _scan_DIE_subtree(self, die, tags, attributes, skip_children_of):
+        """ scan_DIEs for a DIE and its subtree, when the section data can't
+            be accessed directly.
+        """
+        if tags is None or die.tag in tags:
+            yield ScannedDIE(
+                offset=die.offset,
+                tag=die.tag,
+                attributes=OrderedDict(
+                    (name, die.attributes[name]) for name in die.attributes
+                    if attributes is None or name in attributes))
+        if die.has_children and die.tag not in skip_children_of:
+            for child in die.iter_children():
+                for scanned in self._scan_DIE_subtree(
+                        child, tags, attributes, skip_children_of):
+                    yield scanned
+
+    def _scan_DIEs_from_buffer(self, buf, tags, attributes, skip_children_of):
+        """ scan_DIEs from the section data in buf, using the decoders of
+            the abbreviations.
+        """
+        structs = self.structs
+        abbrev_table = self.get_abbrev_table()
+        top_die = self.get_top_DIE()
+        end = self.cu_offset + self.size
+        pos = self.cu_die_offset
+        # The nesting level of the DIEs, to stop at the end of the subtree of
+        # the top DIE like iter_DIEs
+        depth = 0
+        while pos < end:
+            offset = pos
+            abbrev_code, pos = read_uleb128(buf, pos)
+            if abbrev_code == 0:
+                depth -= 1
+                if depth <= 0:
+                    return
+                continue
+            abbrev_decl = abbrev_table.get_abbrev(abbrev_code)
+            decoder = abbrev_decl.get_decoder(structs)
+            tag = abbrev_decl['tag']
+            wanted = tags is None or tag in tags
+            has_children = abbrev_decl.has_children()
+            skip_children = has_children and tag in skip_children_of
+
+            if wanted or skip_children or decoder is None:
+                # The sibling is needed to skip the children
+                names = attributes
+                if (skip_children and names is not None and
+                        'DW_AT_sibling' not in names):
+                    names = names | frozenset(('DW_AT_sibling',))
+                if decoder is None:
+                    # Some forms can only be parsed with the structs
+                    die = DIE(cu=self,
+                              stream=self.dwarfinfo.debug_info_sec.stream,
+                              offset=offset)
+                    attrs = OrderedDict(
+                        (name, die.attributes[name]) for name in die.attributes
+                        if names is None or name in names)
+                    pos = offset + die.size
+                else:
+                    raw_values, offsets, pos = decoder.decode(buf, pos)
+                    attrs = _make_attributes(top_die, decoder.attr_specs,
+                                             raw_values, offsets, names)
+                if names is attributes:
+                    sibling = attrs.get('DW_AT_sibling')
+                else:
+                    sibling = attrs.pop('DW_AT_sibling', None)
+                if wanted:
+                    yield ScannedDIE(offset=offset, tag=tag, attributes=attrs)
+            else:
+                pos = decoder.skip(buf, pos)
+
+            if skip_children:
+                if sibling is not None and sibling.form in _CU_REF_FORMS:
+                    pos = sibling.value + self.cu_offset
+                elif (sibling is not None and
+                      sibling.form == 'DW_FORM_ref_addr'):
+                    pos = sibling.value
+                else:
+                    pos = self._skip_DIE_children(buf, pos, end)
+            elif has_children:
+                depth += 1
+            if depth == 0:
+                return
+
+    def _skip_DIE_children(self, buf, pos, end):
+        """ Return the offset following the children of a DIE, which start at
+            pos in buf, and their null terminator.
+        """
+        structs = self.structs
+        abbrev_table = self.get_abbrev_table()
+        depth = 1
+        while depth > 0 and pos < end:
+            offset = pos
+            abbrev_code, pos = read_uleb128(buf, pos)
+            if abbrev_code == 0:
+                depth -= 1
+                continue
+            abbrev_decl = abbrev_table.get_abbrev(abbrev_code)
+            decoder = abbrev_decl.get_decoder(structs)
+            if decoder is None:
+                pos = offset + DIE(
+                    cu=self, stream=self.dwarfinfo.debug_info_sec.stream,
+                    offset=offset).size
+            else:
+                pos = decoder.skip(buf, pos)
+            if abbrev_decl.has_children():
+                depth += 1
+        return pos
+
     def _get_cached_DIE(self, offset):
         """ Given a DIE offset, look it up in the cache.  If not present,
             parse the DIE and insert it into the cache.
@@ -221,25 +374,14 @@ class CompileUnit(object):
 
             See also get_DIE_from_refaddr(self, refaddr).
         """
-        # The top die must be in the cache if any DIE is in the cache.
-        # The stream is the same for all DIEs in this CU, so populate
-        # the top DIE and obtain a reference to its stream.
-        top_die_stream = self.get_top_DIE().stream
-
-        # `offset` is the offset in the stream of the DIE we want to return.
-        # The map is maintined as a parallel array to the list.  We call
-        # bisect each time to ensure new DIEs are inserted in the correct
-        # order within both `self._dielist` and `self._diemap`.
-        i = bisect_right(self._diemap, offset)
-
-        # Note that `self._diemap` cannot be empty because a the top DIE
-        # was inserted by the call to .get_top_DIE().  Also it has the minimal
-        # offset, so the bisect_right insert point will always be at least 1.
-        if offset == self._diemap[i - 1]:
-            die = self._dielist[i - 1]
-        else:
-            die = DIE(cu=self, stream=top_die_stream, offset=offset)
-            self._dielist.insert(i, die)
-            self._diemap.insert(i, offset)
-
+        die = self._dies.get(offset)
+        if die is None:
+            # The top die must be in the cache if any DIE is in the cache.
+            # The stream is the same for all DIEs in this CU, so populate
+            # the top DIE and obtain a reference to its stream.
+            top_die_stream = self.get_top_DIE().stream
+            die = self._dies.get(offset)
+            if die is None:
+                die = DIE(cu=self, stream=top_die_stream, offset=offset)
+                self._dies[offset] = die
         return die
@@ -8,11 +8,13 @@
 #-------------------------------------------------------------------------------
 from collections import namedtuple, OrderedDict
 import os
+import struct
 
 from ..common.exceptions import DWARFError
 from ..common.utils import bytes2str, struct_parse, preserve_stream_pos
 from .enums import DW_FORM_raw2name
 from .dwarf_util import _resolve_via_offset_table, _get_base_offset
+from .dieparser import read_uleb128
 
 
 # AttributeValue - describes an attribute value in the DIE:
@@ -38,6 +40,157 @@ from .dwarf_util import _resolve_via_offset_table, _get_base_offset
 AttributeValue = namedtuple(
     'AttributeValue', 'name form value raw_value offset')
 
+# The forms whose value differs from their raw value, in _translate_attr_value
+_TRANSLATED_FORMS = frozenset((
+    'DW_FORM_strp', 'DW_FORM_line_strp', 'DW_FORM_GNU_strp_alt',
+    'DW_FORM_strp_sup', 'DW_FORM_flag', 'DW_FORM_flag_present',
+    'DW_FORM_addrx', 'DW_FORM_addrx1', 'DW_FORM_addrx2', 'DW_FORM_addrx3',
+    'DW_FORM_addrx4',
+    'DW_FORM_strx', 'DW_FORM_strx1', 'DW_FORM_strx2', 'DW_FORM_strx3',
+    'DW_FORM_strx4',
+    'DW_FORM_loclistx', 'DW_FORM_rnglistx'))
+
+# The forms indexing tables of the CU, found through the DW_AT_*_base
+# attributes of its top DIE
+_INDEXED_FORMS = frozenset((
+    'DW_FORM_addrx', 'DW_FORM_addrx1', 'DW_FORM_addrx2', 'DW_FORM_addrx3',
+    'DW_FORM_addrx4',
+    'DW_FORM_strx', 'DW_FORM_strx1', 'DW_FORM_strx2', 'DW_FORM_strx3',
+    'DW_FORM_strx4',
+    'DW_FORM_loclistx', 'DW_FORM_rnglistx'))
+
+
+def _make_attribute_value(die, name, form, raw_value, offset):
+    """ Return the AttributeValue of an attribute decoded by an
+        AbbrevDecoder, its raw value translated by die (a DIE of its CU).
+    """
+    if form == 'DW_FORM_indirect':
+        raw_value, value_form, value_raw = raw_value
+        value = die._translate_attr_value(value_form, value_raw)
+    elif form in _TRANSLATED_FORMS:
+        value = die._translate_attr_value(form, raw_value)
+    else:
+        value = raw_value
+    return AttributeValue(
+        name=name,
+        form=form,
+        value=value,
+        raw_value=raw_value,
+        offset=offset)
+
+
+def _make_attributes(die, attr_specs, raw_values, offsets, names=None):
+    """ Return an _AttributeDict of the raw values decoded by an
+        AbbrevDecoder, to be translated by die (a DIE of their CU). If names
+        is given, only the attributes it contains are added.
+    """
+    attributes = _AttributeDict.fromkeys(
+        [name for name, _ in attr_specs
+         if names is None or name in names], _UNTRANSLATED)
+    if attributes:
+        attributes._die = die
+        attributes._attr_values = (attr_specs, raw_values, offsets)
+    return attributes
+
+
+# The value of the attributes of an _AttributeDict not built yet
+_UNTRANSLATED = object()
+
+
+class _AttributeDict(OrderedDict):
+    """ The attributes of a DIE: an ordered dictionary mapping attribute
+        names to AttributeValues. Each AttributeValue is only built, and its
+        value translated (e.g. looked up in the string table), the first time
+        it's accessed. The methods returning all the values, like items()
+        and values(), build them all.
+    """
+    # The DIE translating the values, and the attribute specs, raw values
+    # and offsets they're built from, until they're all built
+    _die = None
+    _attr_values = None
+    # The index of each attribute in _attr_values, by name
+    _indices = None
+
+    def __getitem__(self, name):
+        value = OrderedDict.__getitem__(self, name)
+        if value is _UNTRANSLATED:
+            value = self._translate(name)
+        return value
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def pop(self, name, *default):
+        if name in self:
+            self[name]
+        return OrderedDict.pop(self, name, *default)
+
+    def popitem(self, last=True):
+        self._translate_all()
+        return OrderedDict.popitem(self, last)
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def items(self):
+        self._translate_all()
+        return OrderedDict.items(self)
+
+    def values(self):
+        self._translate_all()
+        return OrderedDict.values(self)
+
+    def __eq__(self, other):
+        self._translate_all()
+        if isinstance(other, _AttributeDict):
+            other._translate_all()
+        return OrderedDict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self._translate_all()
+        if isinstance(other, _AttributeDict):
+            other._translate_all()
+        return OrderedDict.__ne__(self, other)
+
+    def __repr__(self):
+        self._translate_all()
+        return OrderedDict.__repr__(self)
+
+    def _translate(self, name):
+        attr_specs, raw_values, offsets = self._attr_values
+        if self._indices is None:
+            self._indices = dict(
+                (attr_name, i) for i, (attr_name, _) in enumerate(attr_specs))
+        i = self._indices[name]
+        value = _make_attribute_value(self._die, name, attr_specs[i][1],
+                                      raw_values[i], offsets[i])
+        OrderedDict.__setitem__(self, name, value)
+        return value
+
+    def _translate_all(self):
+        die = self._die
+        if die is not None:
+            attr_specs, raw_values, offsets = self._attr_values
+            get, setitem = OrderedDict.get, OrderedDict.__setitem__
+            # Backwards, as the last of several attributes with the same name
+            # is the one kept
+            for (name, form), raw_value, offset in reversed(
+                    list(zip(attr_specs, raw_values, offsets))):
+                if get(self, name) is not _UNTRANSLATED:
+                    continue
+                if form in _TRANSLATED_FORMS or form == 'DW_FORM_indirect':
+                    value = _make_attribute_value(
+                        die, name, form, raw_value, offset)
+                else:
+                    value = AttributeValue(name, form, raw_value, raw_value,
+                                           offset)
+                setitem(self, name, value)
+            self._die = self._attr_values = self._indices = None
+
 
 class DIE(object):
     """ A DWARF debugging information entry. On creation, parses itself from
@@ -56,7 +209,11 @@ class DIE(object):
 
             attributes:
                 An ordered dictionary mapping attribute names to values. It's
-                ordered to preserve the order of attributes in the section
+                ordered to preserve the order of attributes in the section.
+                Each value is translated the first time it's accessed, so the
+                strings and the other values read from other sections are
+                only looked up for the attributes that are used, and errors
+                in them are only raised then.
 
             has_children:
                 Specifies whether this DIE has children
@@ -81,7 +238,10 @@ class DIE(object):
         self.stream = stream
         self.offset = offset
 
-        self.attributes = OrderedDict()
+        self._attributes = None
+        # The attribute specs, raw values and offsets of the attributes, until
+        # self._attributes is built from them
+        self._attr_values = ((), (), ())
         self.tag = None
         self.has_children = None
         self.abbrev_code = None
@@ -93,6 +253,13 @@ class DIE(object):
 
         self._parse_DIE()
 
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = _make_attributes(self, *self._attr_values)
+            self._attr_values = None
+        return self._attributes
+
     def is_null(self):
         """ Is this a null entry?
         """
@@ -216,10 +383,36 @@ class DIE(object):
     def __str__(self):
         return self.__repr__()
 
+    def _get_attribute(self, name):
+        """ Return the AttributeValue of the named attribute, or None if
+            there's no such attribute, without building the attributes
+            dictionary if it hasn't been built yet.
+        """
+        if self._attributes is not None:
+            return self._attributes.get(name)
+        value = None
+        for (attr_name, form), raw_value, offset in zip(*self._attr_values):
+            if attr_name == name:
+                value = _make_attribute_value(self, name, form, raw_value,
+                                              offset)
+        return value
+
     def _parse_DIE(self):
         """ Parses the DIE info from the section, based on the abbreviation
             table of the CU
         """
+        # DIEs of .debug_info are decoded straight from the section data if
+        # possible. On truncated data, parse again from the stream to report
+        # the error as usual.
+        if self.stream is self.dwarfinfo.debug_info_sec.stream:
+            buf = self.dwarfinfo._get_debug_info_buffer()
+            if buf is not None:
+                try:
+                    if self._parse_DIE_from_buffer(buf):
+                        return
+                except (IndexError, struct.error):
+                    pass
+
         structs = self.cu.structs
 
         # A DIE begins with the abbreviation code. Read it and use it to
@@ -240,6 +433,9 @@ class DIE(object):
 
         # Guided by the attributes listed in the abbreviation declaration, parse
         # values from the stream.
+        attr_specs = []
+        raw_values = []
+        offsets = []
         for spec in abbrev_decl['attr_spec']:
             form = spec.form
             name = spec.name
@@ -247,29 +443,61 @@ class DIE(object):
             # Special case here: the attribute value is stored in the attribute
             # definition in the abbreviation spec, not in the DIE itself.
             if form == 'DW_FORM_implicit_const':
-                value = spec.value
-                raw_value = value
+                raw_value = spec.value
+            elif form == 'DW_FORM_indirect':
+                # The raw value is the actual form, followed by the value
+                raw_value = struct_parse(structs.Dwarf_dw_form[form], self.stream)
+                try:
+                    value_form = DW_FORM_raw2name[raw_value]
+                except KeyError as err:
+                    raise DWARFError(
+                            'Found DW_FORM_indirect with unknown raw_value=' +
+                            str(raw_value))
+                raw_value = (raw_value, value_form, struct_parse(
+                    structs.Dwarf_dw_form[value_form], self.stream))
             else:
                 raw_value = struct_parse(structs.Dwarf_dw_form[form], self.stream)
-                value = self._translate_attr_value(form, raw_value)
-            self.attributes[name] = AttributeValue(
-                name=name,
-                form=form,
-                value=value,
-                raw_value=raw_value,
-                offset=attr_offset)
+            attr_specs.append((name, form))
+            raw_values.append(raw_value)
+            offsets.append(attr_offset)
+        self._attr_values = (attr_specs, raw_values, offsets)
 
         self.size = self.stream.tell() - self.offset
 
+    def _parse_DIE_from_buffer(self, buf):
+        """ Parses the DIE info like _parse_DIE, from a bytes-like object
+            holding the section data, with the decoder compiled for its
+            abbreviation. Return False if there's no such decoder.
+        """
+        offset = self.offset
+        self.abbrev_code, pos = read_uleb128(buf, offset)
+
+        # This may be a null entry
+        if self.abbrev_code == 0:
+            self.size = pos - offset
+            return True
+
+        abbrev_decl = self.cu.get_abbrev_table().get_abbrev(self.abbrev_code)
+        decoder = abbrev_decl.get_decoder(self.cu.structs)
+        if decoder is None:
+            return False
+        self.tag = abbrev_decl['tag']
+        self.has_children = abbrev_decl.has_children()
+
+        raw_values, offsets, end = decoder.decode(buf, pos)
+        self._attr_values = (decoder.attr_specs, raw_values, offsets)
+
+        self.size = end - offset
+        return True
+
     def _translate_attr_value(self, form, raw_value):
         """ Translate a raw attr value according to the form
         """
-        # Indirect forms can only be parsed if the top DIE of this CU has already been parsed
-        # and listed in the CU, since the top DIE would have to contain the DW_AT_xxx_base attributes.
-        # This breaks if there is an indirect encoding in the top DIE itself before the
-        # corresponding _base, and it was seen in the wild.
-        # There is a hook in get_top_DIE() to resolve those lazily.
-        translate_indirect = self.cu.has_top_DIE() or self.offset != self.cu.cu_die_offset        
+        # Indirect forms need the DW_AT_xxx_base attributes of the top DIE of
+        # this CU. In the top DIE itself, an indirect encoding may come before
+        # the corresponding _base, and it was seen in the wild: this works
+        # because values are only translated once all the attributes of the
+        # DIE have been parsed, when they're accessed.
         value = None
         if form == 'DW_FORM_strp':
             with preserve_stream_pos(self.stream):
@@ -298,18 +526,18 @@ class DIE(object):
                 self.cu.structs.Dwarf_dw_form[form], self.stream)
             # Let's hope this doesn't get too deep :-)
             return self._translate_attr_value(form, raw_value)
-        elif form in ('DW_FORM_addrx', 'DW_FORM_addrx1', 'DW_FORM_addrx2', 'DW_FORM_addrx3', 'DW_FORM_addrx4') and translate_indirect:
+        elif form in ('DW_FORM_addrx', 'DW_FORM_addrx1', 'DW_FORM_addrx2', 'DW_FORM_addrx3', 'DW_FORM_addrx4'):
             value = self.cu.dwarfinfo.get_addr(self.cu, raw_value)
-        elif form in ('DW_FORM_strx', 'DW_FORM_strx1', 'DW_FORM_strx2', 'DW_FORM_strx3', 'DW_FORM_strx4') and translate_indirect:
+        elif form in ('DW_FORM_strx', 'DW_FORM_strx1', 'DW_FORM_strx2', 'DW_FORM_strx3', 'DW_FORM_strx4'):
             stream = self.dwarfinfo.debug_str_offsets_sec.stream
             base_offset = _get_base_offset(self.cu, 'DW_AT_str_offsets_base')
             offset_size = 4 if self.cu.structs.dwarf_format == 32 else 8
             with preserve_stream_pos(stream):
                 str_offset = struct_parse(self.cu.structs.Dwarf_offset(''), stream, base_offset + raw_value*offset_size)
             value = self.dwarfinfo.get_string_from_table(str_offset)
-        elif form == 'DW_FORM_loclistx' and translate_indirect:
+        elif form == 'DW_FORM_loclistx':
             value = _resolve_via_offset_table(self.dwarfinfo.debug_loclists_sec.stream, self.cu, raw_value, 'DW_AT_loclists_base')
-        elif form == 'DW_FORM_rnglistx' and translate_indirect:
+        elif form == 'DW_FORM_rnglistx':
             value = _resolve_via_offset_table(self.dwarfinfo.debug_rnglists_sec.stream, self.cu, raw_value, 'DW_AT_rnglists_base')
         else:
             value = raw_value
@@ -324,9 +552,7 @@ class DIE(object):
         """
         for key in self.attributes:
             attr = self.attributes[key]
-            if attr.form in ('DW_FORM_strx', 'DW_FORM_strx1', 'DW_FORM_strx2', 'DW_FORM_strx3', 'DW_FORM_strx4',
-                'DW_FORM_addrx', 'DW_FORM_addrx1', 'DW_FORM_addrx2', 'DW_FORM_addrx3', 'DW_FORM_addrx4',
-                'DW_FORM_loclistx', 'DW_FORM_rnglistx'):
+            if attr.form in _INDEXED_FORMS:
                 # Can't change value in place, got to replace the whole attribute record
                 self.attributes[key] = AttributeValue(
                     name=attr.name,
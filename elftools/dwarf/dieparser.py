@@ -0,0 +1,291 @@
+#-------------------------------------------------------------------------------
+# elftools: dwarf/dieparser.py
+#
+# Decoding of DIE attribute values straight from the .debug_info data
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import struct
+
+from ..common.exceptions import DWARFError
+from ..construct import FormatField
+from ..construct.lib.container import ListContainer
+from .enums import DW_FORM_raw2name
+
+
+# The readers below take a bytes-like object (bytes, mmap or memoryview) and
+# an offset into it, and return the decoded value and the offset following it.
+# They raise IndexError or struct.error on truncated data.
+
+def read_uleb128(buf, pos):
+    """ Read an unsigned LEB128 value.
+    """
+    byte = buf[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value = byte & 0x7f
+    shift = 7
+    while True:
+        pos += 1
+        byte = buf[pos]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos + 1
+        shift += 7
+
+
+def read_sleb128(buf, pos):
+    """ Read a signed LEB128 value.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                # negative -> sign extend
+                value |= -(1 << shift)
+            return value, pos
+
+
+def read_cstring(buf, pos):
+    """ Read a null-terminated string, returned as bytes without the null.
+    """
+    if isinstance(buf, memoryview):
+        # memoryviews can't be searched: look for the null in small copies
+        end = pos
+        while True:
+            chunk = bytes(buf[end:end + 64])
+            i = chunk.find(b'\x00')
+            if i >= 0:
+                end += i
+                break
+            if len(chunk) < 64:
+                raise IndexError('unterminated string at %s' % pos)
+            end += 64
+    else:
+        end = buf.find(b'\x00', pos)
+        if end < 0:
+            raise IndexError('unterminated string at %s' % pos)
+    return bytes(buf[pos:end]), end + 1
+
+
+# Forms encoded as LEB128 values, and blocks by the encoding of their length
+# (None for ULEB128). Fixed-size forms are found from their structs.
+_ULEB128_FORMS = (
+    'DW_FORM_udata', 'DW_FORM_ref_udata', 'DW_FORM_addrx', 'DW_FORM_strx',
+    'DW_FORM_indirect', 'DW_FORM_loclistx', 'DW_FORM_rnglistx',
+    'DW_AT_GNU_all_call_sites')
+_SLEB128_FORMS = ('DW_FORM_sdata',)
+_BLOCK_FORMS = {
+    'DW_FORM_block1': 'Dwarf_uint8',
+    'DW_FORM_block2': 'Dwarf_uint16',
+    'DW_FORM_block4': 'Dwarf_uint32',
+    'DW_FORM_block': None,
+    'DW_FORM_exprloc': None,
+}
+
+# Form readers by DWARFStructs
+_form_readers_cache = {}
+
+
+def get_form_readers(structs):
+    """ Return a dict mapping the forms of structs.Dwarf_dw_form to readers of
+        their raw values, decoding them as the structs do. Forms without a
+        reader here are left out, and must be parsed with the structs.
+    """
+    readers = _form_readers_cache.get(structs)
+    if readers is None:
+        readers = {}
+        for form, form_struct in structs.Dwarf_dw_form.items():
+            reader = _make_form_reader(structs, form, form_struct)
+            if reader is not None:
+                readers[form] = reader
+        _form_readers_cache[structs] = readers
+    return readers
+
+
+def _make_form_reader(structs, form, form_struct):
+    if isinstance(form_struct, FormatField):
+        unpack_from = form_struct.packer.unpack_from
+        size = form_struct.packer.size
+        def read_fixed(buf, pos):
+            return unpack_from(buf, pos)[0], pos + size
+        return read_fixed
+    elif form in _ULEB128_FORMS:
+        return read_uleb128
+    elif form in _SLEB128_FORMS:
+        return read_sleb128
+    elif form == 'DW_FORM_string':
+        return read_cstring
+    elif form == 'DW_FORM_flag_present':
+        return lambda buf, pos: (b'', pos)
+    elif form == 'DW_FORM_data16':
+        def read_data16(buf, pos):
+            if pos + 16 > len(buf):
+                raise IndexError('truncated data16 at %s' % pos)
+            return ListContainer(buf[pos:pos + 16]), pos + 16
+        return read_data16
+    elif form in _BLOCK_FORMS:
+        if _BLOCK_FORMS[form] is None:
+            read_length = read_uleb128
+        else:
+            read_length = _make_form_reader(
+                structs, None, getattr(structs, _BLOCK_FORMS[form])(''))
+        def read_block(buf, pos):
+            length, pos = read_length(buf, pos)
+            if pos + length > len(buf):
+                raise IndexError('truncated block at %s' % pos)
+            return ListContainer(buf[pos:pos + length]), pos + length
+        return read_block
+    return None
+
+
+class AbbrevDecoder(object):
+    """ Decodes the attribute values of the DIEs of one abbreviation, for
+        given DWARFStructs. Made by compile_abbrev().
+
+        attr_specs:
+            (name, form) pairs of the attributes of the abbreviation
+
+        fixed_size:
+            The size in bytes of the attribute values of every DIE of the
+            abbreviation, or None if it varies (e.g. with LEB128 values).
+    """
+    def __init__(self, attr_specs, steps, fixed_size):
+        self.attr_specs = attr_specs
+        self.fixed_size = fixed_size
+        # (unpack_from, size, relative offsets) for a run of fixed-size
+        # values, or (None, reader, None) for a single value
+        self._steps = steps
+
+    def decode(self, buf, pos):
+        """ Decode the attribute values of the DIE whose abbreviation code
+            ends at pos in buf. Return (raw_values, offsets, end): the raw
+            values and offsets of the attributes, in the order of attr_specs,
+            and the offset following the DIE.
+
+            The raw value of a DW_FORM_implicit_const attribute is its value,
+            and that of a DW_FORM_indirect attribute is a tuple of the form
+            code, the form and its raw value.
+        """
+        raw_values = []
+        offsets = []
+        for unpack_from, arg, rel_offsets in self._steps:
+            if unpack_from is not None:
+                raw_values.extend(unpack_from(buf, pos))
+                offsets.extend([pos + rel for rel in rel_offsets])
+                pos += arg
+            else:
+                offsets.append(pos)
+                raw_value, pos = arg(buf, pos)
+                raw_values.append(raw_value)
+        return raw_values, offsets, pos
+
+    def skip(self, buf, pos):
+        """ Return the offset following the DIE whose abbreviation code ends
+            at pos in buf, without decoding its attribute values if they
+            have a fixed size.
+        """
+        if self.fixed_size is not None:
+            return pos + self.fixed_size
+        return self.decode(buf, pos)[2]
+
+
+# Decoding steps and fixed sizes, by DWARFStructs and the forms (and implicit
+# constants) of the abbreviations: many abbreviations are repeated in the
+# abbreviation tables of different CUs.
+_steps_cache = {}
+
+
+def compile_abbrev(abbrev_decl, structs):
+    """ Compile an AbbrevDecoder for the given AbbrevDecl and DWARFStructs.
+        Return None if some of its forms can only be parsed with the structs.
+
+        Runs of attributes with fixed-size forms are decoded with a single
+        struct.Struct.
+    """
+    attr_specs = []
+    forms = []
+    for spec in abbrev_decl['attr_spec']:
+        attr_specs.append((spec.name, spec.form))
+        forms.append((spec.form, spec.value
+                      if spec.form == 'DW_FORM_implicit_const' else None))
+    key = (structs, tuple(forms))
+    compiled = _steps_cache.get(key)
+    if compiled is None:
+        compiled = _steps_cache[key] = _compile_steps(structs, forms)
+    if compiled is False:
+        return None
+    return AbbrevDecoder(tuple(attr_specs), *compiled)
+
+
+def _compile_steps(structs, forms):
+    """ Return the decoding steps and fixed size of the given (form,
+        implicit constant) pairs, or False if some of the forms have no
+        reader.
+    """
+    readers = get_form_readers(structs)
+    byteorder = '<' if structs.little_endian else '>'
+    steps = []
+    fixed_size = 0
+    # Format characters of the current run of fixed-size forms, and their
+    # offsets relative to its start
+    run_format = []
+    run_offsets = []
+
+    def end_run():
+        if run_format:
+            packer = struct.Struct(byteorder + ''.join(run_format))
+            steps.append((packer.unpack_from, packer.size, tuple(run_offsets)))
+            del run_format[:], run_offsets[:]
+
+    for form, implicit_const in forms:
+        form_struct = structs.Dwarf_dw_form.get(form)
+        if isinstance(form_struct, FormatField):
+            fmt, size = form_struct.packer.format[1:], form_struct.packer.size
+        elif form == 'DW_FORM_flag_present':
+            # Unpacks to b'', like the structs
+            fmt, size = '0s', 0
+        else:
+            end_run()
+            if form == 'DW_FORM_implicit_const':
+                steps.append((None, _make_const_reader(implicit_const), None))
+                continue
+            elif form == 'DW_FORM_indirect':
+                reader = _make_indirect_reader(readers)
+            elif form in readers:
+                reader = readers[form]
+            else:
+                return False
+            steps.append((None, reader, None))
+            fixed_size = None
+            continue
+
+        run_offsets.append(struct.calcsize(byteorder + ''.join(run_format)))
+        run_format.append(fmt)
+        if fixed_size is not None:
+            fixed_size += size
+    end_run()
+    return tuple(steps), fixed_size
+
+
+def _make_const_reader(value):
+    return lambda buf, pos: (value, pos)
+
+
+def _make_indirect_reader(readers):
+    def read_indirect(buf, pos):
+        code, pos = read_uleb128(buf, pos)
+        try:
+            form = DW_FORM_raw2name[code]
+        except KeyError:
+            raise DWARFError(
+                    'Found DW_FORM_indirect with unknown raw_value=' +
+                    str(code))
+        raw_value, pos = readers[form](buf, pos)
+        return (code, form, raw_value), pos
+    return read_indirect
@@ -13,7 +13,7 @@ from bisect import bisect_right
 from ..construct.lib.container import Container
 from ..common.exceptions import DWARFError
 from ..common.utils import (struct_parse, dwarf_assert,
-                            parse_cstring_from_stream)
+                            parse_cstring_from_stream, get_stream_buffer)
 from .structs import DWARFStructs
 from .compileunit import CompileUnit
 from .abbrevtable import AbbrevTable
@@ -131,6 +131,13 @@ class DWARFInfo(object):
         # Access with .iter_CUs(), .get_CU_containing(), and/or .get_CU_at().
         self._cu_cache = []
         self._cu_offsets_map = []
+        # Sorted offsets of CUs known in advance (see .add_known_CU_offsets()),
+        # used as starting points by .get_CU_containing()
+        self._known_cu_offsets = []
+
+        # The contents of .debug_info for the DIE parser, or False if they
+        # can't be accessed directly
+        self._debug_info_buffer = None
 
     @property
     def has_debug_info(self):
@@ -191,6 +198,9 @@ class DWARFInfo(object):
         # The first CU starts at offset 0, so start there if cache is empty.
         i = bisect_right(self._cu_offsets_map, refaddr)
         start = self._cu_offsets_map[i - 1] if i > 0 else 0
+        i = bisect_right(self._known_cu_offsets, refaddr)
+        if i > 0:
+            start = max(start, self._known_cu_offsets[i - 1])
 
         # parse CUs until we find one containing the desired address
         for cu in self._parse_CUs_iter(start):
@@ -199,6 +209,16 @@ class DWARFInfo(object):
 
         raise ValueError("CU for reference address %s not found" % refaddr)
 
+    def add_known_CU_offsets(self, offsets):
+        """ Make the CU header offsets given in the iterable offsets known in
+            advance, e.g. when they were found by iterating the CUs of the
+            same file in another process. get_CU_containing() then starts
+            parsing from the nearest known CU instead of from the closest CU
+            already parsed.
+        """
+        self._known_cu_offsets = sorted(
+            set(self._known_cu_offsets).union(offsets))
+
     def get_CU_at(self, offset):
         """ Given a CU header offset, return the parsed CU.
 
@@ -395,6 +415,16 @@ class DWARFInfo(object):
 
     #------ PRIVATE ------#
 
+    def _get_debug_info_buffer(self):
+        """ Return the contents of the .debug_info section as a bytes-like
+            object, or None if its stream doesn't give access to them without
+            copying.
+        """
+        if self._debug_info_buffer is None:
+            self._debug_info_buffer = (
+                get_stream_buffer(self.debug_info_sec.stream) or False)
+        return self._debug_info_buffer or None
+
     def _parse_CUs_iter(self, offset=0):
         """ Iterate CU objects in order of appearance in the debug_info section.
 
@@ -566,3 +596,22 @@ class DWARFInfo(object):
             return suplink.sup_filename
         return None
 
+    def parse_debugsup_checksum(self):
+        """ Extract the checksum identifying the supplementary file (the
+            build ID of the file for .gnu_debugaltlink) from either .debug_sup
+            or .gnu_debugaltlink sections, as bytes. Return None if there is
+            none.
+        """
+        if self.debug_sup_sec is not None:
+            stream = self.debug_sup_sec.stream
+            stream.seek(0)
+            suplink = self.structs.Dwarf_debugsup.parse_stream(stream)
+            if suplink.is_supplementary == 0:
+                # The checksum follows the file name, prefixed by its length
+                length = struct_parse(self.structs.Dwarf_uleb128(''), stream)
+                return stream.read(length) or None
+        if self.gnu_debugaltlink_sec is not None:
+            self.gnu_debugaltlink_sec.stream.seek(0)
+            suplink = self.structs.Dwarf_debugaltlink.parse_stream(self.gnu_debugaltlink_sec.stream)
+            return suplink.sup_checksum
+        return None
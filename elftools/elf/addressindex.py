@@ -0,0 +1,179 @@
+#-------------------------------------------------------------------------------
+# elftools: elf/addressindex.py
+#
+# Section and segment interval index for address translation
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from bisect import bisect_left, bisect_right
+
+from .constants import SH_FLAGS
+from .segments import Segment
+
+
+class _IntervalList(object):
+    """ A list of [start, end) intervals with an integer value each, sorted by
+        start, answering containment queries by bisection.
+    """
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self._starts = [start for start, _, _ in intervals]
+        self._ends = [end for _, end, _ in intervals]
+        self._values = [value for _, _, value in intervals]
+        # The largest end of the intervals up to each position, to stop the
+        # backwards scan of find_all() early.
+        self._max_ends = []
+        max_end = None
+        for end in self._ends:
+            max_end = end if max_end is None else max(max_end, end)
+            self._max_ends.append(max_end)
+
+    def find_all(self, start, end):
+        """ Return the sorted list of the values of the intervals containing
+            the range [start, end).
+        """
+        result = []
+        i = bisect_right(self._starts, start) - 1
+        while i >= 0 and self._max_ends[i] >= end:
+            if self._ends[i] >= end:
+                result.append(self._values[i])
+            i -= 1
+        result.sort()
+        return result
+
+
+class AddressIndex(object):
+    """ Interval index of the sections and segments of an ELFFile, used by
+        ELFFile to translate virtual addresses and file offsets. Each part of
+        the index is built from the headers the first time it's needed, and
+        queries are answered by bisection.
+    """
+    def __init__(self, elffile):
+        self.elffile = elffile
+        # (p_vaddr, p_offset) of the PT_LOAD segments, and their intervals
+        self._load_segments = None
+        self._load_segment_intervals = None
+        self._section_address_intervals = None
+        self._section_offset_intervals = None
+        # Section indices by segment index, and the reverse mapping
+        self._segment_sections = None
+        self._section_segments = None
+
+    def address_offsets(self, start, size=1):
+        """ Yield a file offset for each PT_LOAD segment containing the memory
+            region [start...start+size), in program header order.
+        """
+        if self._load_segments is None:
+            self._load_segments = []
+            intervals = []
+            # consider LOAD only to prevent same address being yielded twice
+            for n, seg in enumerate(self.elffile.iter_segments(type='PT_LOAD')):
+                self._load_segments.append((seg['p_vaddr'], seg['p_offset']))
+                intervals.append(
+                    (seg['p_vaddr'], seg['p_vaddr'] + seg['p_filesz'], n))
+            self._load_segment_intervals = _IntervalList(intervals)
+        for n in self._load_segment_intervals.find_all(start, start + size):
+            vaddr, offset = self._load_segments[n]
+            yield start - vaddr + offset
+
+    def section_at_address(self, address):
+        """ Return the index of the allocated section containing the given
+            virtual address, or None. TLS sections without data (.tbss) don't
+            occupy any address space and are never returned.
+        """
+        if self._section_address_intervals is None:
+            intervals = []
+            for n, header in self._iter_section_headers():
+                flags = header['sh_flags']
+                if (flags & SH_FLAGS.SHF_ALLOC and header['sh_size'] > 0 and
+                        not (flags & SH_FLAGS.SHF_TLS and
+                             header['sh_type'] == 'SHT_NOBITS')):
+                    intervals.append((header['sh_addr'],
+                                      header['sh_addr'] + header['sh_size'],
+                                      n))
+            self._section_address_intervals = _IntervalList(intervals)
+        found = self._section_address_intervals.find_all(address, address + 1)
+        return found[0] if found else None
+
+    def section_at_offset(self, offset):
+        """ Return the index of the section whose data contains the given file
+            offset, or None.
+        """
+        if self._section_offset_intervals is None:
+            intervals = []
+            for n, header in self._iter_section_headers():
+                if (header['sh_type'] not in ('SHT_NULL', 'SHT_NOBITS') and
+                        header['sh_size'] > 0):
+                    intervals.append((header['sh_offset'],
+                                      header['sh_offset'] + header['sh_size'],
+                                      n))
+            self._section_offset_intervals = _IntervalList(intervals)
+        found = self._section_offset_intervals.find_all(offset, offset + 1)
+        return found[0] if found else None
+
+    def segment_sections(self, n):
+        """ Return the sorted list of the indices of the sections contained in
+            segment #n, as decided by Segment.section_in_segment.
+        """
+        if self._segment_sections is None:
+            self._make_membership()
+        return list(self._segment_sections[n])
+
+    def section_segments(self, n):
+        """ Return the sorted list of the indices of the segments containing
+            section #n.
+        """
+        if self._section_segments is None:
+            self._make_membership()
+        return list(self._section_segments.get(n, ()))
+
+    def _iter_section_headers(self):
+        for n in range(self.elffile.num_sections()):
+            header = self.elffile._get_section_header(n)
+            if header is not None:
+                yield n, header
+
+    def _make_membership(self):
+        """ Compute the sections of each segment. Only the sections that can
+            pass the address or offset checks of section_in_segment are
+            tested: allocated sections by address, and the other sections by
+            offset, except for non-allocated NOBITS sections which have
+            neither and are always tested.
+        """
+        headers = {}
+        alloc = []
+        nonalloc = []
+        nonalloc_nobits = []
+        for n, header in self._iter_section_headers():
+            headers[n] = header
+            if header['sh_flags'] & SH_FLAGS.SHF_ALLOC:
+                alloc.append((header['sh_addr'], n))
+            elif header['sh_type'] == 'SHT_NOBITS':
+                nonalloc_nobits.append(n)
+            else:
+                nonalloc.append((header['sh_offset'], n))
+        alloc.sort()
+        nonalloc.sort()
+        alloc_addrs = [addr for addr, _ in alloc]
+        nonalloc_offsets = [offset for offset, _ in nonalloc]
+
+        self._segment_sections = []
+        self._section_segments = {}
+        for nseg in range(self.elffile.num_segments()):
+            segment = Segment(self.elffile._get_segment_header(nseg),
+                              self.elffile.stream)
+            vaddr = segment['p_vaddr']
+            offset = segment['p_offset']
+            candidates = [n for _, n in alloc[
+                bisect_left(alloc_addrs, vaddr):
+                bisect_left(alloc_addrs, vaddr + segment['p_memsz'])]]
+            candidates.extend(n for _, n in nonalloc[
+                bisect_left(nonalloc_offsets, offset):
+                bisect_left(nonalloc_offsets, offset + segment['p_filesz'])])
+            candidates.extend(nonalloc_nobits)
+
+            sections = sorted(n for n in candidates
+                              if segment.section_in_segment(headers[n]))
+            self._segment_sections.append(sections)
+            for n in sections:
+                self._section_segments.setdefault(n, []).append(nseg)
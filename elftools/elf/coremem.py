@@ -0,0 +1,167 @@
+#-------------------------------------------------------------------------------
+# elftools: elf/coremem.py
+#
+# Random access to the memory image of core files
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from bisect import bisect_right
+import struct
+
+from ..common.exceptions import ELFError
+from ..common.utils import LRUCache, bytes2str
+
+
+class CoreMemory(object):
+    """ Random access reader for the virtual memory of a process, as recorded
+        in an ET_CORE ELF file.
+
+        Addresses are resolved through the PT_LOAD segments of the core file.
+        Memory that wasn't dumped in the core, such as the unmodified pages
+        of mapped files, is read from the files listed in the NT_FILE note,
+        opened with stream_loader (a function taking the file path and
+        returning a binary stream). By default the stream_loader of the
+        ELFFile is used; if there is none, only the dumped memory is
+        available.
+
+        Memory is read page by page, and the most recently used pages are kept
+        in a cache of cache_pages pages, so that repeated small reads (e.g.
+        following pointers) are cheap.
+    """
+    def __init__(self, elffile, stream_loader=None, cache_pages=256):
+        if elffile['e_type'] != 'ET_CORE':
+            raise ELFError('Memory can only be read from a core file')
+        self.elffile = elffile
+        self.stream_loader = stream_loader or elffile.stream_loader
+        self.page_size = 4096
+
+        # Sorted (start, end, file offset) intervals of the memory dumped in
+        # the core file, and of the memory mapped from the files listed in
+        # the NT_FILE note (with the file name).
+        dumped = []
+        for segment in elffile.iter_segments(type='PT_LOAD'):
+            if segment['p_filesz'] > 0:
+                dumped.append((segment['p_vaddr'],
+                               segment['p_vaddr'] + segment['p_filesz'],
+                               segment['p_offset'], None))
+        mapped = []
+        for segment in elffile.iter_segments(type='PT_NOTE'):
+            for note in segment.iter_notes():
+                if note['n_type'] != 'NT_FILE':
+                    continue
+                desc = note['n_desc']
+                self.page_size = desc['page_size']
+                for entry, filename in zip(desc['Elf_Nt_File_Entry'],
+                                           desc['filename']):
+                    mapped.append((entry['vm_start'], entry['vm_end'],
+                                   entry['page_offset'] * desc['page_size'],
+                                   bytes2str(filename)))
+        self._regions = [sorted(dumped), sorted(mapped)]
+        self._region_starts = [[r[0] for r in regions]
+                               for regions in self._regions]
+
+        self._pages = LRUCache(cache_pages)
+        # Streams of the mapped files by name (None if they can't be opened)
+        self._file_streams = {}
+
+    def read(self, address, size):
+        """ Read size bytes of memory at the given address. Raise an ELFError
+            if any part of this memory isn't available.
+        """
+        page_size = self.page_size
+        chunks = []
+        while size > 0:
+            pageno, start = divmod(address, page_size)
+            data, holes = self._get_page(pageno)
+            end = min(start + size, page_size)
+            for hole_start, hole_end in holes:
+                if hole_start < end and start < hole_end:
+                    raise ELFError('Memory at %#x is not available' % (
+                        pageno * page_size + max(start, hole_start)))
+            chunks.append(data[start:end])
+            address += end - start
+            size -= end - start
+        return b''.join(chunks)
+
+    def read_pointer(self, address):
+        """ Read a pointer (an address-sized integer) at the given address.
+        """
+        fmt = ('<' if self.elffile.little_endian else '>') + (
+            'I' if self.elffile.elfclass == 32 else 'Q')
+        return struct.unpack(fmt, self.read(address, struct.calcsize(fmt)))[0]
+
+    def close(self):
+        """ Close the streams of the mapped files opened by this reader.
+        """
+        for stream in self._file_streams.values():
+            if stream is not None:
+                stream.close()
+        self._file_streams.clear()
+        self._pages.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _get_page(self, pageno):
+        """ Return (data, holes) for the given memory page, where holes lists
+            the (start, end) ranges of the page that aren't available.
+        """
+        page = self._pages.get(pageno)
+        if page is None:
+            chunks = []
+            holes = []
+            pos = pageno * self.page_size
+            page_end = pos + self.page_size
+            while pos < page_end:
+                end, data = self._read_region(pos, page_end)
+                if not data:
+                    data = b'\x00' * (end - pos)
+                    holes.append((pos % self.page_size,
+                                  (end - 1) % self.page_size + 1))
+                elif len(data) < end - pos:
+                    # The mapped file is shorter than the mapping
+                    holes.append(((pos + len(data)) % self.page_size,
+                                  (end - 1) % self.page_size + 1))
+                    data += b'\x00' * (end - pos - len(data))
+                chunks.append(data)
+                pos = end
+            page = (b''.join(chunks), tuple(holes))
+            self._pages.put(pageno, page)
+        return page
+
+    def _read_region(self, pos, limit):
+        """ Read the memory at pos from the first region (dumped memory first,
+            then mapped files) containing it, up to the end of that region or
+            limit. Return the end of the range and its data, which is empty
+            if no region contains pos.
+        """
+        end = limit
+        for regions, starts in zip(self._regions, self._region_starts):
+            i = bisect_right(starts, pos) - 1
+            if i >= 0 and pos < regions[i][1]:
+                start, region_end, offset, filename = regions[i]
+                end = min(end, region_end)
+                stream = (self.elffile.stream if filename is None
+                          else self._get_file_stream(filename))
+                if stream is None:
+                    continue
+                stream.seek(offset + pos - start)
+                return end, stream.read(end - pos)
+            # The next region of this kind takes precedence
+            if i + 1 < len(starts):
+                end = min(end, starts[i + 1])
+        return end, b''
+
+    def _get_file_stream(self, filename):
+        if filename not in self._file_streams:
+            stream = None
+            if self.stream_loader is not None:
+                try:
+                    stream = self.stream_loader(filename)
+                except (IOError, OSError):
+                    pass
+            self._file_streams[filename] = stream
+        return self._file_streams[filename]
@@ -0,0 +1,231 @@
+#-------------------------------------------------------------------------------
+# elftools: elf/debugfiles.py
+#
+# Resolution of separate debug files by build ID and debuglink
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import json
+import os
+import struct
+import zlib
+
+from ..common.exceptions import ELFError
+from ..common.utils import bytes2str
+from .elffile import ELFFile
+from .probe import probe_path
+
+
+def get_build_id(elffile):
+    """ Return the hex string of the GNU build ID of the given ELFFile, or
+        None if it has none. The note sections are searched, or the note
+        segments if there are no sections.
+    """
+    if elffile.num_sections() > 0:
+        note_containers = elffile.iter_sections(type='SHT_NOTE')
+    else:
+        note_containers = elffile.iter_segments(type='PT_NOTE')
+    for container in note_containers:
+        for note in container.iter_notes():
+            if note['n_type'] == 'NT_GNU_BUILD_ID' and note['n_name'] == 'GNU':
+                return note['n_desc']
+    return None
+
+
+def get_debuglink(elffile):
+    """ Return (filename, crc) from the .gnu_debuglink section of the given
+        ELFFile, or None if it has none.
+    """
+    section = elffile.get_section_by_name('.gnu_debuglink')
+    if section is None:
+        return None
+    data = section.data()
+    end = data.find(b'\x00')
+    # The CRC follows the name, aligned to 4 bytes
+    crc_offset = (end + 4) & ~3
+    if end <= 0 or crc_offset + 4 > len(data):
+        raise ELFError('Invalid .gnu_debuglink section')
+    crc = struct.unpack_from('<I' if elffile.little_endian else '>I',
+                             data, crc_offset)[0]
+    return bytes2str(data[:end]), crc
+
+
+def file_crc32(path, chunk_size=1 << 16):
+    """ Compute the CRC32 of the file at the given path, as used by
+        .gnu_debuglink, reading it in chunks of chunk_size bytes.
+    """
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return crc & 0xffffffff
+            crc = zlib.crc32(chunk, crc)
+
+
+class DebugFileResolver(object):
+    """ Finds the separate debug files of ELF files, the way debuggers do,
+        in a list of local debug roots (such as /usr/lib/debug).
+
+        A debug file is found by the GNU build ID of the ELF file, either in
+        the .build-id/xx/yyyy.debug layout of a debug root or through the
+        build ID index, or else by the name in its .gnu_debuglink section,
+        which is looked up in the directory of the ELF file, in its .debug
+        subdirectory, and in the same directory under each debug root. The
+        CRC recorded in .gnu_debuglink is checked.
+
+        The build ID index maps build IDs to the paths of all the ELF files
+        found in the debug roots, for symbol stores not laid out by build
+        ID. It's built by scanning the roots the first time a build ID isn't
+        found in the .build-id layout, and is then only rescanned on
+        update_index(). If index_path is given, the index is kept in this
+        file, so that other processes and later runs don't scan the roots
+        again.
+    """
+    def __init__(self, debug_roots=('/usr/lib/debug',), index_path=None):
+        self.debug_roots = [os.path.abspath(root) for root in debug_roots]
+        self.index_path = index_path
+        # Build ID to path, or None until loaded or built
+        self._index = None
+        # CRCs of the debuglink candidates, by (path, size, mtime)
+        self._crcs = {}
+
+    def find_debug_file(self, elffile, path=None):
+        """ Return the path of the debug file of the given ELFFile, or None.
+
+            path is the path of the ELF file, needed to follow its debuglink.
+            Without it, the debug file is only looked up by build ID.
+        """
+        build_id = get_build_id(elffile)
+        if build_id is not None:
+            debug_path = self.find_by_build_id(build_id)
+            if debug_path is not None:
+                return debug_path
+        debuglink = get_debuglink(elffile)
+        if debuglink is not None and path is not None:
+            return self.find_by_debuglink(path, *debuglink)
+        return None
+
+    def open_debug_file(self, elffile, path=None):
+        """ Return an ELFFile for the debug file of the given ELFFile (see
+            find_debug_file), or None if there is none.
+        """
+        debug_path = self.find_debug_file(elffile, path)
+        if debug_path is None:
+            return None
+        return ELFFile.load_from_path(debug_path)
+
+    def find_by_build_id(self, build_id):
+        """ Return the path of the debug file with the given build ID (a hex
+            string), or None.
+        """
+        build_id = build_id.lower()
+        if len(build_id) > 2:
+            for root in self.debug_roots:
+                path = os.path.join(root, '.build-id', build_id[:2],
+                                    build_id[2:] + '.debug')
+                if os.path.isfile(path):
+                    return path
+
+        index = self._get_index()
+        path = index.get(build_id)
+        if path is not None and self._probe_build_id(path) != build_id:
+            # The file was removed or replaced since it was indexed
+            self.update_index()
+            path = self._index.get(build_id)
+        return path
+
+    def find_by_debuglink(self, path, filename, crc):
+        """ Return the path of the debug file named filename with the given
+            CRC, for the ELF file at the given path, or None.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        candidates = [os.path.join(directory, filename),
+                      os.path.join(directory, '.debug', filename)]
+        for root in self.debug_roots:
+            candidates.append(os.path.join(
+                root, os.path.splitdrive(directory)[1].lstrip(os.sep),
+                filename))
+        for candidate in candidates:
+            if (os.path.isfile(candidate) and
+                    not os.path.samefile(candidate, path) and
+                    self._get_crc(candidate) == crc):
+                return candidate
+        return None
+
+    def update_index(self):
+        """ Rebuild the build ID index by scanning the debug roots, and save
+            it to index_path if given.
+        """
+        index = {}
+        for root in self.debug_roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                # Files in the .build-id layout are found without the index
+                if dirpath == root and '.build-id' in dirnames:
+                    dirnames.remove('.build-id')
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    if os.path.islink(path):
+                        continue
+                    build_id = self._probe_build_id(path)
+                    if build_id is not None:
+                        index.setdefault(build_id, path)
+        self._index = index
+        if self.index_path is not None:
+            self._save_index()
+
+    def _get_index(self):
+        if self._index is None:
+            if self.index_path is not None:
+                self._index = self._load_index()
+            if self._index is None:
+                self.update_index()
+        return self._index
+
+    def _load_index(self):
+        """ Return the build ID index saved in index_path, or None if there is
+            none for the current debug roots.
+        """
+        try:
+            with open(self.index_path, 'r') as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if saved.get('debug_roots') != self.debug_roots:
+            return None
+        return saved.get('build_ids')
+
+    def _save_index(self):
+        # Write to a temporary file first, so that concurrent readers never
+        # see a partial index
+        temp_path = '%s.%d.tmp' % (self.index_path, os.getpid())
+        with open(temp_path, 'w') as f:
+            json.dump({'debug_roots': self.debug_roots,
+                       'build_ids': self._index}, f)
+        os.replace(temp_path, self.index_path)
+
+    def _get_crc(self, path):
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        if key not in self._crcs:
+            self._crcs[key] = file_crc32(path)
+        return self._crcs[key]
+
+    @staticmethod
+    def _probe_build_id(path):
+        """ Return the build ID of the ELF file at the given path, or None.
+            It's read from the note segments with probe_path(), or from the
+            note sections for files without note segments (such as object
+            files and dwz files).
+        """
+        # Debug roots can hold any kind of file, and ELF files that are
+        # truncated or malformed raise all sorts of errors while they're
+        # parsed. They're skipped, so one bad file doesn't stop the scan.
+        try:
+            build_id = probe_path(path).build_id
+            if build_id is None:
+                with ELFFile.load_from_path(path) as elffile:
+                    build_id = get_build_id(elffile)
+            return build_id
+        except Exception:
+            return None
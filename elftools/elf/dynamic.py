@@ -7,6 +7,7 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 import itertools
+import sys
 
 from collections import defaultdict
 from .hash import ELFHashTable, GNUHashTable
@@ -22,15 +23,33 @@ class _DynamicStringTable(object):
     """ Bare string table based on values found via ELF dynamic tags and
         loadable segments only.  Good enough for get_string() only.
     """
-    def __init__(self, stream, table_offset):
+    def __init__(self, stream, table_offset, table_size=None):
         self._stream = stream
         self._table_offset = table_offset
+        self._table_size = table_size
+        # The contents of the table if its size is known, read on first use
+        self._table = None
+        # Decoded strings by offset
+        self._strings = {}
 
     def get_string(self, offset):
         """ Get the string stored at the given offset in this string table.
+            Strings are memoized and interned, like in StringTableSection.
         """
-        s = parse_cstring_from_stream(self._stream, self._table_offset + offset)
-        return s.decode('utf-8') if s else ''
+        s = self._strings.get(offset)
+        if s is None:
+            if self._table is None and self._table_size is not None:
+                self._stream.seek(self._table_offset)
+                self._table = self._stream.read(self._table_size)
+            end = self._table.find(b'\x00', offset) if self._table else -1
+            if end >= 0:
+                raw = self._table[offset:end]
+            else:
+                raw = parse_cstring_from_stream(self._stream,
+                                                self._table_offset + offset)
+            s = sys.intern(raw.decode('utf-8')) if raw else ''
+            self._strings[offset] = s
+        return s
 
 
 class DynamicTag(object):
@@ -99,6 +118,13 @@ class Dynamic(object):
         self._offset = position
         self._tagsize = self.elfstructs.Elf_Dyn.sizeof()
         self._empty = empty
+        # The raw tags of the dynamic array and their index by tag type,
+        # parsed on first use by _get_tag_table()
+        self._tags = None
+        self._tag_index = None
+        # (virtual address, file offset) of the tables looked up by
+        # get_table_offset(), by tag name
+        self._table_offsets = {}
 
         # Do not access this directly yourself; use _get_stringtable() instead.
         self._stringtable = stringtable
@@ -106,6 +132,9 @@ class Dynamic(object):
     def get_table_offset(self, tag_name):
         """ Return the virtual address and file offset of a dynamic table.
         """
+        if tag_name in self._table_offsets:
+            return self._table_offsets[tag_name]
+
         ptr = None
         for tag in self._iter_tags(type=tag_name):
             ptr = tag['d_ptr']
@@ -117,6 +146,7 @@ class Dynamic(object):
         if ptr:
             offset = next(self.elffile.address_offsets(ptr), None)
 
+        self._table_offsets[tag_name] = ptr, offset
         return ptr, offset
 
     def _get_stringtable(self):
@@ -133,7 +163,11 @@ class Dynamic(object):
         # dynamic string table.
         _, table_offset = self.get_table_offset('DT_STRTAB')
         if table_offset is not None:
-            self._stringtable = _DynamicStringTable(self._stream, table_offset)
+            table_size = None
+            for tag in self._iter_tags('DT_STRSZ'):
+                table_size = tag['d_val']
+            self._stringtable = _DynamicStringTable(self._stream, table_offset,
+                                                    table_size)
             return self._stringtable
 
         # That didn't work for some reason.  Let's use the section header
@@ -141,17 +175,32 @@ class Dynamic(object):
         self._stringtable = self.elffile.get_section_by_name('.dynstr')
         return self._stringtable
 
+    def _get_tag_table(self):
+        """ Parse the dynamic array up to the DT_NULL tag once, and index the
+            raw tags by type. Return the list of raw tags.
+        """
+        if self._tags is None:
+            tags = []
+            if not self._empty:
+                for n in itertools.count():
+                    tag = self._get_tag(n)
+                    tags.append(tag)
+                    if tag['d_tag'] == 'DT_NULL':
+                        break
+            self._tag_index = {}
+            for tag in tags:
+                self._tag_index.setdefault(tag['d_tag'], []).append(tag)
+            self._tags = tags
+        return self._tags
+
     def _iter_tags(self, type=None):
         """ Yield all raw tags (limit to |type| if specified)
         """
-        if self._empty:
-            return
-        for n in itertools.count():
-            tag = self._get_tag(n)
-            if type is None or tag['d_tag'] == type:
-                yield tag
-            if tag['d_tag'] == 'DT_NULL':
-                break
+        tags = self._get_tag_table()
+        if type is not None:
+            tags = self._tag_index.get(type, ())
+        for tag in tags:
+            yield tag
 
     def iter_tags(self, type=None):
         """ Yield all tags (limit to |type| if specified)
@@ -181,11 +230,8 @@ class Dynamic(object):
         if self._num_tags != -1:
             return self._num_tags
 
-        for n in itertools.count():
-            tag = self.get_tag(n)
-            if tag.entry.d_tag == 'DT_NULL':
-                self._num_tags = n + 1
-                return self._num_tags
+        self._num_tags = len(self._get_tag_table())
+        return self._num_tags
 
     def get_relocation_tables(self):
         """ Load all available relocation tables from DYNAMIC tags.
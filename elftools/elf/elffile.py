@@ -10,7 +10,10 @@ import io
 from io import BytesIO
 import os
 import struct
+import threading
+import warnings
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import resource
@@ -25,7 +28,8 @@ except ImportError:
         PAGESIZE = 4096
 
 from ..common.exceptions import ELFError, ELFParseError
-from ..common.utils import struct_parse, elf_assert
+from ..common.utils import (struct_parse, elf_assert, BufferStream,
+        LazyStream, LRUCache, read_view, _MMAP_TYPES)
 from .structs import ELFStructs
 from .sections import (
         Section, StringTableSection, SymbolTableSection,
@@ -41,8 +45,14 @@ from .segments import Segment, InterpSegment, NoteSegment
 from ..dwarf.dwarfinfo import DWARFInfo, DebugSectionDescriptor, DwarfConfig
 from ..ehabi.ehabiinfo import EHABIInfo
 from .hash import ELFHashSection, GNUHashSection
+from .addressindex import AddressIndex
 from .constants import SHN_INDICES
 
+
+# Lock of the supplementary_dwarfinfo_caches of ELFFiles, which may be shared
+# by ELFFiles used in different threads
+_supplementary_dwarfinfo_lock = threading.Lock()
+
 class ELFFile(object):
     """ Creation: the constructor accepts a stream (file-like object) with the
         contents of an ELF file.
@@ -53,6 +63,23 @@ class ELFFile(object):
         creating a new ELFFile. Currently, the only such relative file path is
         obtained from the supplementary object files.
 
+        If decompressed_cache_size is non-zero, the decompressed data of
+        compressed sections is kept in an LRU cache holding up to this many
+        bytes, so that a section is not decompressed again when it's read
+        again.
+
+        structs_cache is an optional dict used to share the ELFStructs of
+        files with the same layout (endianness, class, type, machine and OS
+        ABI), keyed by ELFStructs.__getstate__(). Creating the structs takes
+        most of the time spent opening a file, so passing the same dict when
+        opening many files saves it for all the files after the first.
+
+        supplementary_dwarfinfo_cache is an optional LRUCache in which
+        get_supplementary_dwarfinfo() keeps the DWARFInfo of supplementary
+        (dwz) files. Passing the same cache when opening many files referring
+        to the same supplementary file saves reading it again for each of
+        them. Without it, the supplementary file is read by each ELFFile.
+
         Accessible attributes:
 
             stream:
@@ -75,8 +102,17 @@ class ELFFile(object):
 
             e_ident_raw:
                 the raw e_ident field of the header
+
+            decompressed_cache:
+                LRUCache of decompressed section data, or None
     """
-    def __init__(self, stream, stream_loader=None):
+    # The AddressIndex, built on first use by _get_address_index. Set on the
+    # class so that address_offsets also works for subclasses that don't
+    # call __init__.
+    _address_index = None
+
+    def __init__(self, stream, stream_loader=None, decompressed_cache_size=0,
+                 structs_cache=None, supplementary_dwarfinfo_cache=None):
         self.stream = stream
         self.stream.seek(0, io.SEEK_END)
         self.stream_len = self.stream.tell()
@@ -88,33 +124,93 @@ class ELFFile(object):
 
         self.structs.create_basic_structs()
         self.header = self._parse_elf_header()
-        self.structs.create_advanced_structs(
-                self['e_type'],
-                self['e_machine'],
-                self['e_ident']['EI_OSABI'])
+        structs_key = self._get_structs_key()
+        if structs_cache is not None and structs_key in structs_cache:
+            self.structs = structs_cache[structs_key]
+        else:
+            self.structs.create_advanced_structs(*structs_key[2:])
+            if structs_cache is not None:
+                structs_cache[structs_key] = self.structs
         self.stream.seek(0)
         self.e_ident_raw = self.stream.read(16)
 
+        # The section header table is read from the stream in one go the
+        # first time a section header is needed. Parsed headers and section
+        # objects are cached by index, so repeated lookups are cheap and the
+        # same Section object is returned each time.
+        self._section_header_table = None
+        self._section_headers = {}
+        self._section_cache = {}
+        self._section_type_map = None
+
+        self.decompressed_cache = None
+        if decompressed_cache_size:
+            self.decompressed_cache = LRUCache(decompressed_cache_size, len)
+
         self._section_header_stringtable = \
             self._get_section_header_stringtable()
         self._section_name_map = None
+        self._relocation_handler = None
         self.stream_loader = stream_loader
+        self.supplementary_dwarfinfo_cache = supplementary_dwarfinfo_cache
+        # Arguments of load_from_path, if the file was opened by it, for
+        # pickling
+        self._path_options = None
+        # Memory mapping of the file from which the DWARF sections are parsed
+        # in place, if it's not the stream itself (see load_from_path)
+        self._dwarf_mapping = None
 
     @classmethod
-    def load_from_path(cls, path):
+    def load_from_path(cls, path, mmap=False, decompressed_cache_size=0,
+                       structs_cache=None, supplementary_dwarfinfo_cache=None):
         """Takes a path to a file on the local filesystem, and returns an
         ELFFile from it, setting up a correct stream_loader relative to the
         original file.
+
+        If mmap is True, the file is memory-mapped instead of being read
+        through a file stream. The data_view() methods of sections and
+        segments then return memoryview slices over the mapping (data() still
+        returns bytes), and DWARF sections that need no relocation are parsed
+        in place without being copied.
+
+        decompressed_cache_size, structs_cache and
+        supplementary_dwarfinfo_cache are passed to the ELFFile.
+
+        An ELFFile created this way can be pickled (e.g. to be sent to a
+        worker process): only its path and the mmap and
+        decompressed_cache_size options are pickled. Unpickling opens the
+        file again from its path and parses its header right away; the
+        section name map and other caches are rebuilt when they're used.
         """
         base_directory = os.path.dirname(path)
+        def open_stream(elf_path):
+            if mmap:
+                return ELFFile._open_mmap(elf_path)
+            return open(elf_path, 'rb')
         def loader(elf_path):
             # FIXME: use actual path instead of str/bytes
             if not os.path.isabs(elf_path):
                 elf_path = os.path.join(base_directory,
                                         elf_path)
-            return open(elf_path, 'rb')
-        stream = open(path, 'rb')
-        return ELFFile(stream, loader)
+            return open_stream(elf_path)
+        stream = open_stream(path)
+        elffile = ELFFile(stream, loader,
+                          decompressed_cache_size=decompressed_cache_size,
+                          structs_cache=structs_cache,
+                          supplementary_dwarfinfo_cache=supplementary_dwarfinfo_cache)
+        elffile._path_options = (os.path.abspath(path), mmap,
+                                 decompressed_cache_size)
+        if mmap:
+            # The DWARF sections get a mapping of their own, which close()
+            # leaves to be unmapped once the last of them is released
+            elffile._dwarf_mapping = ELFFile._open_mmap(path)
+        return elffile
+
+    def __reduce__(self):
+        if self._path_options is None:
+            raise TypeError(
+                'Only an ELFFile created with load_from_path can be pickled')
+        return (ELFFile.load_from_path, self._path_options)
 
     def num_sections(self):
         """ Number of sections in the file
@@ -137,8 +233,12 @@ class ELFFile(object):
         """ Get the section at index #n from the file (Section object or a
             subclass)
         """
-        section_header = self._get_section_header(n)
-        return self._make_section(section_header)
+        section = self._section_cache.get(n)
+        if section is None:
+            section_header = self._get_section_header(n)
+            section = self._make_section(section_header)
+            self._section_cache[n] = section
+        return section
 
     def get_section_by_name(self, name):
         """ Get a section from the file, by name. Return None if no such
@@ -170,10 +270,14 @@ class ELFFile(object):
             name of the type as defined in the ELF specification, e.g.
             'SHT_SYMTAB'.
         """
-        for i in range(self.num_sections()):
-            section = self.get_section(i)
-            if type is None or section['sh_type'] == type:
-                yield section
+        if type is None:
+            for i in range(self.num_sections()):
+                yield self.get_section(i)
+        else:
+            if self._section_type_map is None:
+                self._make_section_type_map()
+            for i in self._section_type_map.get(type, ()):
+                yield self.get_section(i)
 
     def num_segments(self):
         """ Number of segments in the file
@@ -204,9 +308,9 @@ class ELFFile(object):
             'PT_LOAD'.
         """
         for i in range(self.num_segments()):
-            segment = self.get_segment(i)
-            if type is None or segment['p_type'] == type:
-                yield segment
+            segment_header = self._get_segment_header(i)
+            if type is None or segment_header['p_type'] == type:
+                yield self._make_segment(segment_header)
 
     def address_offsets(self, start, size=1):
         """ Yield a file offset for each ELF segment containing a memory region.
@@ -214,12 +318,32 @@ class ELFFile(object):
             A memory region is defined by the range [start...start+size). The
             offset of the region is yielded.
         """
-        end = start + size
-        # consider LOAD only to prevent same address being yielded twice
-        for seg in self.iter_segments(type='PT_LOAD'):
-            if (start >= seg['p_vaddr'] and
-                end <= seg['p_vaddr'] + seg['p_filesz']):
-                yield start - seg['p_vaddr'] + seg['p_offset']
+        return self._get_address_index().address_offsets(start, size)
+
+    def get_section_by_address(self, address):
+        """ Get the allocated section containing the given virtual address.
+            Return None if no such section exists.
+        """
+        index = self._get_address_index().section_at_address(address)
+        return None if index is None else self.get_section(index)
+
+    def get_section_by_offset(self, offset):
+        """ Get the section whose data contains the given file offset.
+            Return None if no such section exists.
+        """
+        index = self._get_address_index().section_at_offset(offset)
+        return None if index is None else self.get_section(index)
+
+    def get_segment_section_indices(self, n):
+        """ Get the indices of the sections contained in segment #n, as
+            decided by Segment.section_in_segment.
+        """
+        return self._get_address_index().segment_sections(n)
+
+    def get_section_segment_indices(self, n):
+        """ Get the indices of the segments containing section #n.
+        """
+        return self._get_address_index().section_segments(n)
 
     def has_dwarf_info(self):
         """ Check whether this file appears to have debugging information.
@@ -230,7 +354,8 @@ class ELFFile(object):
             self.get_section_by_name('.zdebug_info') or
             self.get_section_by_name('.eh_frame'))
 
-    def get_dwarf_info(self, relocate_dwarf_sections=True, follow_links=True):
+    def get_dwarf_info(self, relocate_dwarf_sections=True, follow_links=True,
+                       decompress_threads=None, lazy_sections=False):
         """ Return a DWARFInfo object representing the debugging information in
             this file.
 
@@ -239,6 +364,23 @@ class ELFFile(object):
 
             If follow_links is True, we will try to load the supplementary
             object file (if any), and use it to resolve references and imports.
+
+            If lazy_sections is True, the debug sections are loaded lazily:
+            each one is read from the file, relocated and decompressed only
+            when it's first used. The returned DWARFInfo then reads from the
+            stream of this ELFFile, which must remain open (and the ELFFile
+            not closed) as long as the DWARFInfo is used. Otherwise, all the
+            sections are loaded before returning, and the DWARFInfo doesn't
+            need the stream anymore.
+
+            If decompress_threads is given, the compressed debug sections (if
+            any) are decompressed concurrently in a pool of this many threads,
+            even if lazy_sections is True. Sections found in
+            decompressed_cache are not decompressed again.
+
+            The returned DWARFInfo can't be pickled. Use
+            elftools.batch.DWARFInfoHandle to send the DWARF information of
+            a file to another process.
         """
         # Expect that has_dwarf_info was called, so at least .debug_info is
         # present.
@@ -266,18 +408,32 @@ class ELFFile(object):
          debug_line_str_name, debug_loclists_sec_name, debug_rnglists_sec_name,
          debug_sup_name, gnu_debugaltlink_name, eh_frame_sec_name) = section_names
 
+        executor = None
+        if decompress_threads:
+            executor = ThreadPoolExecutor(max_workers=decompress_threads)
+
         debug_sections = {}
-        for secname in section_names:
-            section = self.get_section_by_name(secname)
-            if section is None:
-                debug_sections[secname] = None
-            else:
-                dwarf_section = self._read_dwarf_section(
-                    section,
-                    relocate_dwarf_sections)
-                if compressed and secname.startswith('.z'):
-                    dwarf_section = self._decompress_dwarf_section(dwarf_section)
-                debug_sections[secname] = dwarf_section
+        try:
+            for secname in section_names:
+                section = self.get_section_by_name(secname)
+                if section is None:
+                    debug_sections[secname] = None
+                else:
+                    debug_sections[secname] = self._read_dwarf_section(
+                        section,
+                        relocate_dwarf_sections,
+                        decompress=compressed and secname.startswith('.z'),
+                        executor=executor)
+
+            if not lazy_sections:
+                for secname, descriptor in debug_sections.items():
+                    if descriptor is not None:
+                        debug_sections[secname] = descriptor._replace(
+                            stream=descriptor.stream.load())
+        finally:
+            if executor is not None:
+                # The submitted decompressions still run to completion
+                executor.shutdown(wait=False)
 
         # Lookup if we have any of the .gnu_debugaltlink (GNU proprietary
         # implementation) or .debug_sup sections, referencing a supplementary
@@ -316,16 +472,60 @@ class ELFFile(object):
         """
         Read supplementary dwarfinfo, from either the standared .debug_sup
         section or the GNU proprietary .gnu_debugaltlink.
+
+        If this ELFFile has a supplementary_dwarfinfo_cache, the
+        supplementary dwarfinfo is looked up there first, and kept there
+        after being read.
         """
         supfilepath = dwarfinfo.parse_debugsupinfo()
         if supfilepath is not None and self.stream_loader is not None:
             stream = self.stream_loader(supfilepath)
+            cache = self.supplementary_dwarfinfo_cache
+            key = None
+            if cache is not None:
+                key = self._supplementary_dwarfinfo_key(
+                    stream, supfilepath, dwarfinfo.parse_debugsup_checksum())
+            if key is not None:
+                with _supplementary_dwarfinfo_lock:
+                    dwarf_info = cache.get(key)
+                if dwarf_info is not None:
+                    stream.close()
+                    return dwarf_info
             supelffile = ELFFile(stream)
             dwarf_info = supelffile.get_dwarf_info()
-            stream.close()
+            # A memory mapping isn't closed, since the DWARF sections may be
+            # parsed in place from it: it's unmapped once they're released
+            if not isinstance(stream, _MMAP_TYPES):
+                supelffile.close()
+            if key is not None:
+                with _supplementary_dwarfinfo_lock:
+                    cache.put(key, dwarf_info)
             return dwarf_info
         return None
 
+    @staticmethod
+    def _supplementary_dwarfinfo_key(stream, supfilepath, checksum):
+        """ Return the key identifying a supplementary file in
+            supplementary_dwarfinfo_cache: its real path if known (or else
+            the path it's referred to with) and its checksum, or else its
+            size and modification time. Return None if the file can't be
+            identified reliably.
+        """
+        name = getattr(stream, 'name', None)
+        if isinstance(name, (str, bytes)):
+            path = os.path.realpath(name)
+        elif checksum is not None:
+            path = supfilepath
+        else:
+            return None
+        if checksum is not None:
+            return (path, checksum)
+        try:
+            stat = os.fstat(stream.fileno())
+        except (AttributeError, OSError, ValueError):
+            # Not backed by a file descriptor
+            return None
+        return (path, stat.st_size, stat.st_mtime)
 
     def has_ehabi_info(self):
         """ Check whether this file appears to have arm exception handler index table.
@@ -610,15 +810,50 @@ class ELFFile(object):
     def _get_section_header(self, n):
         """ Find the header of section #n, parse it and return the struct
         """
+        header = self._section_headers.get(n)
+        if header is not None:
+            return header
 
         stream_pos = self._section_offset(n)
         if stream_pos > self.stream_len:
             return None
 
-        return struct_parse(
-            self.structs.Elf_Shdr,
-            self.stream,
-            stream_pos=stream_pos)
+        table = self._get_section_header_table()
+        table_pos = stream_pos - self['e_shoff']
+        if 0 <= table_pos < len(table.getbuffer()):
+            header = struct_parse(self.structs.Elf_Shdr, table, table_pos)
+        else:
+            # Outside of the table as sized by the ELF header (e.g. a bogus
+            # sh_link), so read it directly.
+            header = struct_parse(
+                self.structs.Elf_Shdr,
+                self.stream,
+                stream_pos=stream_pos)
+        self._section_headers[n] = header
+        return header
+
+    def _get_section_header_table(self):
+        """ Read the raw contents of the section header table into memory
+            with a single read, the first time it's needed.
+        """
+        if self._section_header_table is None:
+            self._section_header_table = BytesIO()
+            if self['e_shoff'] != 0:
+                if self['e_shnum'] == 0:
+                    # The number of sections is stored in the first header
+                    # (see num_sections), which has to be read on its own.
+                    header = struct_parse(
+                        self.structs.Elf_Shdr,
+                        self.stream,
+                        stream_pos=self['e_shoff'])
+                    self._section_headers[0] = header
+                    num_sections = header['sh_size']
+                else:
+                    num_sections = self['e_shnum']
+                self.stream.seek(self['e_shoff'])
+                self._section_header_table = BytesIO(self.stream.read(
+                    num_sections * self['e_shentsize']))
+        return self._section_header_table
 
     def _get_section_name(self, section_header):
         """ Given a section header, find this section's name in the file's
@@ -671,10 +906,36 @@ class ELFFile(object):
         else:
             return Section(section_header, name, self)
 
+    def _make_section_type_map(self):
+        self._section_type_map = {}
+        for i in range(self.num_sections()):
+            header = self._get_section_header(i)
+            if header is not None:
+                self._section_type_map.setdefault(
+                    header['sh_type'], []).append(i)
+
     def _make_section_name_map(self):
+        """ Build the section name to index mapping straight from the raw
+            section header table and the section header string table, without
+            creating any Section objects.
+        """
+        if self._section_header_stringtable is None:
+            raise ELFParseError("String Table not found")
+        stringtable = self._section_header_stringtable
+        table = self._get_section_header_table().getbuffer()
+        entsize = self['e_shentsize']
+        # sh_name is the first field of the section header, a 32-bit word for
+        # both ELF classes.
+        name_struct = struct.Struct('<I' if self.little_endian else '>I')
+
         self._section_name_map = {}
-        for i, sec in enumerate(self.iter_sections()):
-            self._section_name_map[sec.name] = i
+        for i in range(self.num_sections()):
+            entry_pos = i * entsize
+            if entry_pos + name_struct.size <= len(table):
+                name_offset = name_struct.unpack_from(table, entry_pos)[0]
+            else:
+                name_offset = self._get_section_header(i)['sh_name']
+            self._section_name_map[stringtable.get_string(name_offset)] = i
 
     def _make_symbol_table_section(self, section_header, name):
         """ Create a SymbolTableSection
@@ -771,71 +1032,216 @@ class ELFFile(object):
                 name='',
                 elffile=self)
 
+    def _get_structs_key(self):
+        """ Return the key of the ELFStructs of this file in structs_cache,
+            from the parsed ELF header. It's the state the ELFStructs gets
+            from create_advanced_structs, as returned by __getstate__().
+        """
+        return (self.little_endian, self.elfclass, self['e_type'],
+                self['e_machine'], self['e_ident']['EI_OSABI'])
+
     def _parse_elf_header(self):
         """ Parses the ELF file header and assigns the result to attributes
             of this object.
         """
         return struct_parse(self.structs.Elf_Ehdr, self.stream, stream_pos=0)
 
-    def _read_dwarf_section(self, section, relocate_dwarf_sections):
-        """ Read the contents of a DWARF section from the stream and return a
-            DebugSectionDescriptor. Apply relocations if asked to.
+    def _read_dwarf_section(self, section, relocate_dwarf_sections,
+                            decompress=False, executor=None):
+        """ Return a DebugSectionDescriptor for the contents of a DWARF
+            section. Apply relocations if asked to, and decompress the section
+            if it's a .zdebug_* one and decompress is True.
+
+            The section data is read from the stream (and decompressed and
+            relocated) only when the stream of the descriptor is first used.
+            If an executor is given, the decompression of a compressed section
+            is submitted to it right away instead.
         """
-        # The section data is read into a new stream, for processing
-        section_stream = BytesIO()
-        section_stream.write(section.data())
+        if decompress:
+            size = self._get_zdebug_uncompressed_size(section)
+        else:
+            size = section.data_size
+
+        future = None
+        if executor is not None:
+            future = self._submit_decompression(executor, section, decompress,
+                                                size)
+
+        def load_section():
+            if future is not None:
+                data = future.result()
+                if self.decompressed_cache is not None:
+                    self.decompressed_cache.put(
+                        self._get_decompressed_cache_key(section, decompress),
+                        data)
+            else:
+                data = self._get_dwarf_section_data(section, decompress, size)
+            return self._make_dwarf_section_stream(
+                section, data, relocate_dwarf_sections)
 
-        if relocate_dwarf_sections:
-            reloc_handler = RelocationHandler(self)
-            reloc_section = reloc_handler.find_relocations_for_section(section)
-            if reloc_section is not None:
-                reloc_handler.apply_section_relocations(
-                        section_stream, reloc_section)
+        section_stream = LazyStream(load_section)
 
         return DebugSectionDescriptor(
                 stream=section_stream,
                 name=section.name,
                 global_offset=section['sh_offset'],
-                size=section.data_size,
+                size=size,
                 address=section['sh_addr'])
 
+    def _get_dwarf_section_data(self, section, decompress, size):
+        """ Return the contents of a DWARF section, decompressed.
+        """
+        if not decompress:
+            if self._dwarf_mapping is not None and not section.compressed:
+                return read_view(self._dwarf_mapping, section['sh_offset'],
+                                 section.data_size)
+            # Section.data_view() takes care of SHF_COMPRESSED sections
+            return section.data_view()
+
+        key = self._get_decompressed_cache_key(section, decompress)
+        if self.decompressed_cache is not None:
+            data = self.decompressed_cache.get(key)
+            if data is not None:
+                return data
+        data = self._decompress_zdebug_data(section.data_view(), size)
+        if self.decompressed_cache is not None:
+            self.decompressed_cache.put(key, data)
+        return data
+
+    def _submit_decompression(self, executor, section, decompress, size):
+        """ Read the raw data of a compressed DWARF section and submit its
+            decompression to the executor. Return the future of the
+            decompressed data, or None if there's nothing to decompress.
+
+            The stream is only accessed here, in the calling thread: the
+            worker threads only run zlib on data already in memory.
+        """
+        if not (decompress or section.compressed):
+            return None
+        if (self.decompressed_cache is not None and
+                self._get_decompressed_cache_key(section, decompress) in
+                self.decompressed_cache):
+            return None
+        if decompress:
+            return executor.submit(self._decompress_zdebug_data,
+                                   section.data_view(), size)
+        return executor.submit(section.decompress, section.compressed_data())
+
     @staticmethod
-    def _decompress_dwarf_section(section):
-        """ Returns the uncompressed contents of the provided DWARF section.
+    def _get_decompressed_cache_key(section, decompress):
+        """ The key of the decompressed data of a DWARF section in
+            decompressed_cache.
+        """
+        if decompress:
+            return ('zdebug', section['sh_offset'])
+        return section._cache_key
+
+    def _make_dwarf_section_stream(self, section, data,
+                                   relocate_dwarf_sections):
+        """ Return a stream holding the given (decompressed) contents of a
+            DWARF section. Apply relocations if asked to.
+        """
+        reloc_section = None
+        if relocate_dwarf_sections:
+            reloc_handler = self._get_relocation_handler()
+            reloc_section = reloc_handler.find_relocations_for_section(section)
+
+        if reloc_section is not None:
+            # Relocate a copy of the data, which the stream then reads from
+            # without copying it again.
+            buf = bytearray(data)
+            reloc_handler.apply_section_relocations_to_buffer(
+                    buf, reloc_section)
+            section_stream = BufferStream(buf)
+        elif isinstance(data, memoryview):
+            # The file is memory-mapped and the data is used as is, so parse
+            # it straight from the mapping.
+            section_stream = BufferStream(data)
+        else:
+            section_stream = BytesIO(data)
+        return section_stream
+
+    def _get_address_index(self):
+        """ Return the AddressIndex of this file, built on first use.
+        """
+        if self._address_index is None:
+            self._address_index = AddressIndex(self)
+        return self._address_index
+
+    def _get_relocation_handler(self):
+        """ Return the RelocationHandler of this file. It's shared by all
+            sections, so that its indexes are only built once.
+        """
+        if self._relocation_handler is None:
+            self._relocation_handler = RelocationHandler(self)
+        return self._relocation_handler
+
+    def _get_zdebug_uncompressed_size(self, section):
+        """ Read the header of a compressed .zdebug_* section and return the
+            size of its uncompressed contents.
         """
         # TODO: support other compression formats from readelf.c
-        assert section.size > 12, 'Unsupported compression format.'
+        assert section.data_size > 12, 'Unsupported compression format.'
 
-        section.stream.seek(0)
         # According to readelf.c the content should contain "ZLIB"
         # followed by the uncompressed section size - 8 bytes in
         # big-endian order
-        compression_type = section.stream.read(4)
+        self.stream.seek(section['sh_offset'])
+        compression_type = self.stream.read(4)
         assert compression_type == b'ZLIB', \
             'Invalid compression type: %r' % (compression_type)
 
-        uncompressed_size = struct.unpack('>Q', section.stream.read(8))[0]
+        return struct.unpack('>Q', self.stream.read(8))[0]
 
+    @staticmethod
+    def _decompress_zdebug_data(data, uncompressed_size):
+        """ Return the uncompressed contents of a .zdebug_* section, given its
+            raw data.
+
+            This doesn't access the stream, so it can safely be called from a
+            worker thread.
+        """
+        # Skip the "ZLIB" magic and the uncompressed size
         decompressor = zlib.decompressobj()
-        uncompressed_stream = BytesIO()
-        while True:
-            chunk = section.stream.read(PAGESIZE)
-            if not chunk:
-                break
-            uncompressed_stream.write(decompressor.decompress(chunk))
-        uncompressed_stream.write(decompressor.flush())
-
-        uncompressed_stream.seek(0, io.SEEK_END)
-        size = uncompressed_stream.tell()
+        uncompressed = decompressor.decompress(memoryview(data)[12:])
+        tail = decompressor.flush()
+        if tail:
+            uncompressed += tail
+
+        size = len(uncompressed)
         assert uncompressed_size == size, \
                 'Wrong uncompressed size: expected %r, but got %r' % (
                     uncompressed_size, size,
                 )
 
-        return section._replace(stream=uncompressed_stream, size=size)
+        return uncompressed
+
+    @staticmethod
+    def _open_mmap(path):
+        """ Open the file at the given path as a read-only memory mapping.
+        """
+        import mmap
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
     def close(self):
-        self.stream.close()
+        """ Close the stream of the file.
+
+            A memory-mapped file can't be unmapped while memoryviews over it
+            (such as those returned by Section.data_view()) are alive: a
+            ResourceWarning is then issued, and the mapping is released when
+            the last of them is garbage collected. The DWARF sections of a
+            file opened by load_from_path are parsed in place from a mapping
+            of their own, which is unmapped once they're released, so they
+            can still be used after the file is closed.
+        """
+        self._dwarf_mapping = None
+        try:
+            self.stream.close()
+        except BufferError:
+            warnings.warn('ELFFile closed while views of its memory mapping '
+                          'are alive: the mapping stays open until they are '
+                          'released', ResourceWarning, stacklevel=2)
 
     def __enter__(self):
         return self
@@ -7,12 +7,31 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 
+import array
 import struct
+import sys
 
 from ..common.utils import struct_parse
 from .sections import Section
 
 
+def _make_symbol_name_getter(symboltable):
+    """ Return a function giving the name of the symbol at the given index of
+        symboltable. The names of a symbol table section are looked up from
+        its raw st_name column (see SymbolTableSection.to_arrays), without
+        parsing the symbols.
+    """
+    if not hasattr(symboltable, 'to_arrays'):
+        return lambda i: symboltable.get_symbol(i).name
+    st_names = symboltable.to_arrays(use_numpy=False)['st_name']
+    get_string = symboltable.stringtable.get_string
+    def get_name(i):
+        if i < len(st_names):
+            return get_string(st_names[i])
+        return symboltable.get_symbol(i).name
+    return get_name
+
+
 class ELFHashTable(object):
     """ Representation of an ELF hash table to find symbols in the
         symbol table - useful for super-stripped binaries without section
@@ -33,6 +52,8 @@ class ELFHashTable(object):
         self.params = struct_parse(self.elffile.structs.Elf_Hash,
                                    self.elffile.stream,
                                    start_offset)
+        # See lookup_many
+        self._get_symbol_name = None
 
     def get_number_of_symbols(self):
         """ Get the number of symbols from the hash table parameters.
@@ -42,16 +63,54 @@ class ELFHashTable(object):
     def get_symbol(self, name):
         """ Look up a symbol from this hash table with the given name.
         """
+        for _, sym in self._iter_matches(name):
+            return sym
+        return None
+
+    def lookup_many(self, names):
+        """ Look up all the given names at once. Return a dict mapping each
+            name found in the table to the list of symbols with that name, in
+            symbol table order.
+
+            The hash chains are compared by name without parsing the symbols
+            (for a symbol table section), and only the matching symbols are
+            parsed.
+        """
+        result = {}
+        nbuckets = self.params['nbuckets']
+        if nbuckets == 0:
+            return result
+        if self._get_symbol_name is None:
+            self._get_symbol_name = _make_symbol_name_getter(self._symboltable)
+        get_symbol_name = self._get_symbol_name
+        buckets = self.params['buckets']
+        chains = self.params['chains']
+        for name in set(names):
+            matches = []
+            symndx = buckets[self.elf_hash(name) % nbuckets]
+            while symndx != 0:
+                if get_symbol_name(symndx) == name:
+                    matches.append(symndx)
+                symndx = chains[symndx]
+            if matches:
+                result[name] = [self._symboltable.get_symbol(symndx)
+                                for symndx in sorted(matches)]
+        return result
+
+    def _iter_matches(self, name):
+        """ Yield (index, symbol) tuples for the symbols with the given name
+            from the hash chain of the name.
+        """
         if self.params['nbuckets'] == 0:
-            return None
+            return
+        chains = self.params['chains']
         hval = self.elf_hash(name) % self.params['nbuckets']
         symndx = self.params['buckets'][hval]
         while symndx != 0:
             sym = self._symboltable.get_symbol(symndx)
             if sym.name == name:
-                return sym
-            symndx = self.params['chains'][symndx]
-        return None
+                yield symndx, sym
+            symndx = chains[symndx]
 
     @staticmethod
     def elf_hash(name):
@@ -105,6 +164,10 @@ class GNUHashTable(object):
         self._chain_pos = start_offset + 4 * self._wordsize + \
             self.params['bloom_size'] * self._xwordsize + \
             self.params['nbuckets'] * self._wordsize
+        # The array of chain hash values, read on first lookup
+        self._chains = None
+        # See lookup_many
+        self._get_symbol_name = None
 
     def get_number_of_symbols(self):
         """ Get the number of symbols in the hash table by finding the bucket
@@ -142,27 +205,88 @@ class GNUHashTable(object):
     def get_symbol(self, name):
         """ Look up a symbol from this hash table with the given name.
         """
+        for symbol in self._iter_matches(name):
+            return symbol
+        return None
+
+    def lookup_many(self, names):
+        """ Look up all the given names at once. Return a dict mapping each
+            name found in the table to the list of symbols with that name, in
+            symbol table order.
+
+            Note that the symbols before symoffset (usually the undefined
+            ones) aren't part of a GNU hash table, and are never found.
+
+            The hash chains are compared by hash value and then by name
+            without parsing the symbols (for a symbol table section), and
+            only the matching symbols are parsed.
+        """
+        result = {}
+        if self._get_symbol_name is None:
+            self._get_symbol_name = _make_symbol_name_getter(self._symboltable)
+        get_symbol_name = self._get_symbol_name
+        symoffset = self.params['symoffset']
+        buckets = self.params['buckets']
+        nbuckets = self.params['nbuckets']
+        chains = self._get_chains()
+        for name in set(names):
+            namehash = self.gnu_hash(name)
+            if not self._matches_bloom(namehash):
+                continue
+            symidx = buckets[namehash % nbuckets]
+            if symidx < symoffset:
+                continue
+            matches = []
+            while symidx - symoffset < len(chains):
+                cur_hash = chains[symidx - symoffset]
+                if (cur_hash | 1 == namehash | 1 and
+                        get_symbol_name(symidx) == name):
+                    matches.append(symidx)
+                if cur_hash & 1:
+                    break
+                symidx += 1
+            if matches:
+                result[name] = [self._symboltable.get_symbol(symidx)
+                                for symidx in matches]
+        return result
+
+    def _get_chains(self):
+        """ Read the array of chain hash values from the stream.
+        """
+        if self._chains is None:
+            count = self.get_number_of_symbols() - self.params['symoffset']
+            self.elffile.stream.seek(self._chain_pos)
+            data = self.elffile.stream.read(count * self._wordsize)
+            self._chains = array.array('I' if array.array('I').itemsize == 4
+                                       else 'L', data)
+            if self.elffile.little_endian != (sys.byteorder == 'little'):
+                self._chains.byteswap()
+        return self._chains
+
+    def _iter_matches(self, name):
+        """ Yield the symbols with the given name from the hash chain of the
+            name.
+        """
         namehash = self.gnu_hash(name)
         if not self._matches_bloom(namehash):
-            return None
+            return
 
+        symoffset = self.params['symoffset']
         symidx = self.params['buckets'][namehash % self.params['nbuckets']]
-        if symidx < self.params['symoffset']:
-            return None
+        if symidx < symoffset:
+            return
 
-        self.elffile.stream.seek(self._chain_pos + (symidx - self.params['symoffset']) * self._wordsize)
-        hash_format = '<I' if self.elffile.little_endian else '>I'
-        while True:
-            cur_hash = struct.unpack(hash_format, self.elffile.stream.read(self._wordsize))[0]
+        chains = self._get_chains()
+        while symidx - symoffset < len(chains):
+            cur_hash = chains[symidx - symoffset]
             if cur_hash | 1 == namehash | 1:
                 symbol = self._symboltable.get_symbol(symidx)
                 if name == symbol.name:
-                    return symbol
+                    yield symbol
 
             if cur_hash & 1:
                 break
             symidx += 1
-        return None
 
     @staticmethod
     def gnu_hash(key):
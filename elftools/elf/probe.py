@@ -0,0 +1,147 @@
+#-------------------------------------------------------------------------------
+# elftools: elf/probe.py
+#
+# Lightweight identification of ELF files
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from collections import namedtuple
+import struct
+
+from ..common.exceptions import ELFError
+from ..common.utils import elf_assert, bytes2hex, bytes2str, reverse_enum
+from .enums import ENUM_E_TYPE, ENUM_E_MACHINE
+
+
+ELFProbe = namedtuple('ELFProbe',
+    'elfclass little_endian machine type interpreter build_id')
+ELFProbe.__doc__ = """ Identification of an ELF file, as returned by probe().
+
+    elfclass and little_endian are as in ELFFile. machine and type are the
+    names of the e_machine and e_type values (e.g. 'EM_X86_64' and 'ET_DYN').
+    interpreter is the path in the PT_INTERP segment and build_id the hex
+    string of the NT_GNU_BUILD_ID note, or None if there are none.
+"""
+
+# The size of the prefix read first; it usually contains the program headers
+# and the PT_INTERP and PT_NOTE segments too.
+_PREFIX_SIZE = 4096
+
+_PT_INTERP = 3
+_PT_NOTE = 4
+_NT_GNU_BUILD_ID = 3
+
+# e_type, e_machine, e_phoff, e_shoff, e_phentsize, e_phnum and e_shentsize of
+# the ELF header, following the 16 bytes of e_ident
+_EHDR_FORMATS = {
+    32: 'HH4x4xI I 4x2xH H H',
+    64: 'HH4x8xQ Q 4x2xH H H',
+}
+
+# p_type, p_offset, p_filesz and p_align of a program header
+_PHDR_FORMATS = {
+    32: 'I I 4x4x I 4x4x I',
+    64: 'I 4x Q 8x8x Q 8x Q',
+}
+
+# sh_info of a section header
+_SHDR_INFO_FORMATS = {
+    32: '28xI',
+    64: '44xI',
+}
+
+
+_DECODE_E_TYPE = reverse_enum(ENUM_E_TYPE)
+_DECODE_E_MACHINE = reverse_enum(ENUM_E_MACHINE)
+
+
+def probe(stream):
+    """ Identify the ELF file in the given binary stream, without creating an
+        ELFFile. Return an ELFProbe.
+
+        Only the first bytes of the file and its PT_INTERP and PT_NOTE
+        segments are read. Raise an ELFError if the stream doesn't hold an
+        ELF file, which is detected from its first 16 bytes.
+    """
+    stream.seek(0)
+    ident = stream.read(16)
+    elf_assert(ident[:4] == b'\x7fELF', 'Magic number does not match')
+    if ident[4:5] == b'\x01':
+        elfclass = 32
+    elif ident[4:5] == b'\x02':
+        elfclass = 64
+    else:
+        raise ELFError('Invalid EI_CLASS %s' % repr(ident[4:5]))
+    if ident[5:6] == b'\x01':
+        byteorder = '<'
+    elif ident[5:6] == b'\x02':
+        byteorder = '>'
+    else:
+        raise ELFError('Invalid EI_DATA %s' % repr(ident[5:6]))
+
+    prefix = ident + stream.read(_PREFIX_SIZE - len(ident))
+
+    def read(offset, size):
+        if offset + size <= len(prefix):
+            return prefix[offset:offset + size]
+        stream.seek(offset)
+        return stream.read(size)
+
+    def unpack(fmt, offset):
+        fmt = byteorder + fmt
+        data = read(offset, struct.calcsize(fmt))
+        elf_assert(len(data) == struct.calcsize(fmt),
+                   'Unexpected end of file at %#x' % offset)
+        return struct.unpack(fmt, data)
+
+    (e_type, e_machine, e_phoff, e_shoff, e_phentsize, e_phnum,
+     e_shentsize) = unpack(_EHDR_FORMATS[elfclass], 16)
+    if e_phnum == 0xffff and e_shoff:
+        # The number of program headers is in sh_info of section header 0
+        e_phnum = unpack(_SHDR_INFO_FORMATS[elfclass], e_shoff)[0]
+
+    interpreter = None
+    build_id = None
+    if e_phoff:
+        for n in range(e_phnum):
+            p_type, p_offset, p_filesz, p_align = unpack(
+                _PHDR_FORMATS[elfclass], e_phoff + n * e_phentsize)
+            if p_type == _PT_INTERP and interpreter is None:
+                interpreter = bytes2str(
+                    read(p_offset, p_filesz).split(b'\x00', 1)[0])
+            elif p_type == _PT_NOTE and build_id is None:
+                build_id = _find_build_id(read(p_offset, p_filesz),
+                                          byteorder, 8 if p_align == 8 else 4)
+
+    return ELFProbe(
+        elfclass=elfclass,
+        little_endian=byteorder == '<',
+        machine=_DECODE_E_MACHINE.get(e_machine, e_machine),
+        type=_DECODE_E_TYPE.get(e_type, e_type),
+        interpreter=interpreter,
+        build_id=build_id)
+
+
+def probe_path(path):
+    """ Identify the ELF file at the given path. See probe().
+    """
+    with open(path, 'rb') as stream:
+        return probe(stream)
+
+
+def _find_build_id(notes, byteorder, align):
+    """ Return the hex string of the GNU build ID note in the given note
+        segment data, or None.
+    """
+    header = struct.Struct(byteorder + 'III')
+    offset = 0
+    while offset + header.size <= len(notes):
+        namesz, descsz, note_type = header.unpack_from(notes, offset)
+        offset += header.size
+        name = notes[offset:offset + namesz]
+        offset += (namesz + align - 1) & ~(align - 1)
+        desc = notes[offset:offset + descsz]
+        offset += (descsz + align - 1) & ~(align - 1)
+        if note_type == _NT_GNU_BUILD_ID and name == b'GNU\x00':
+            return bytes2hex(desc)
+    return None
@@ -7,8 +7,10 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 from collections import namedtuple
+from io import BytesIO
+import struct
 
-from ..common.exceptions import ELFRelocationError
+from ..common.exceptions import ELFRelocationError, ELFParseError
 from ..common.utils import elf_assert, struct_parse
 from .sections import Section
 from .enums import (
@@ -187,34 +189,181 @@ class RelocationHandler(object):
     """
     def __init__(self, elffile):
         self.elffile = elffile
+        # The relocation recipes for the machine architecture of the file,
+        # looked up once on first use.
+        self._recipes = None
+        # Maps section indices to the relocation section targeting them
+        # (through sh_info). Built on first use.
+        self._reloc_sections_by_target = None
 
     def find_relocations_for_section(self, section):
         """ Given a section, find the relocation section for it in the ELF
             file. Return a RelocationSection object, or None if none was
             found.
         """
-        reloc_section_names = (
-                '.rel' + section.name,
-                '.rela' + section.name)
-        # Find the relocation section aimed at this one. Currently assume
-        # that either .rel or .rela section exists for this section, but
-        # not both.
-        for relsection in self.elffile.iter_sections():
-            if (    isinstance(relsection, RelocationSection) and
-                    relsection.name in reloc_section_names):
-                return relsection
-        return None
+        # Find the relocation section aimed at this one by name, using the
+        # section name map of the file. Currently assume that either .rel or
+        # .rela section exists for this section, but not both.
+        for reloc_section_name in ('.rel' + section.name,
+                                   '.rela' + section.name):
+            index = self.elffile.get_section_index(reloc_section_name)
+            if index is not None:
+                relsection = self.elffile.get_section(index)
+                if isinstance(relsection, RelocationSection):
+                    return relsection
+
+        # Otherwise, look for a relocation section whose sh_info points to
+        # this section.
+        section_index = self.elffile.get_section_index(section.name)
+        if section_index is None:
+            return None
+        if self._reloc_sections_by_target is None:
+            self._reloc_sections_by_target = {}
+            for sec_type in ('SHT_REL', 'SHT_RELA'):
+                for relsection in self.elffile.iter_sections(type=sec_type):
+                    if relsection['sh_info'] != 0:
+                        self._reloc_sections_by_target.setdefault(
+                            relsection['sh_info'], relsection)
+        return self._reloc_sections_by_target.get(section_index)
 
     def apply_section_relocations(self, stream, reloc_section):
         """ Apply all relocations in reloc_section (a RelocationSection object)
             to the given stream, that contains the data of the section that is
             being relocated. The stream is modified as a result.
         """
+        if isinstance(stream, BytesIO):
+            # In-memory stream: patch its buffer in bulk
+            with stream.getbuffer() as buf:
+                self.apply_section_relocations_to_buffer(buf, reloc_section)
+            return
+
         # The symbol table associated with this relocation section
         symtab = self.elffile.get_section(reloc_section['sh_link'])
         for reloc in reloc_section.iter_relocations():
             self._do_apply_relocation(stream, reloc, symtab)
 
+    def apply_section_relocations_to_buffer(self, buf, reloc_section):
+        """ Apply all relocations in reloc_section (a RelocationSection object)
+            to the given writable buffer (e.g. a bytearray), that contains the
+            data of the section that is being relocated. The buffer is
+            modified as a result.
+
+            This gives the same result as apply_section_relocations, but works
+            on the whole relocation table at once: the relocation entries and
+            the symbol values are decoded in bulk, and the relocated values
+            are patched in place with struct.pack_into.
+        """
+        num_relocations = reloc_section.num_relocations()
+        if num_relocations == 0:
+            return
+
+        is_rela = reloc_section.is_RELA()
+        recipes = self._get_recipes(
+            is_rela, lambda: reloc_section.get_relocation(0))
+        symtab = self.elffile.get_section(reloc_section['sh_link'])
+        sym_values = symtab.to_arrays(use_numpy=False)['st_value']
+        num_symbols = len(sym_values)
+
+        endianness = '<' if self.elffile.little_endian else '>'
+        value_structs = {
+            4: struct.Struct(endianness + 'I'),
+            8: struct.Struct(endianness + 'Q')}
+        buf_size = len(buf)
+
+        for r_offset, r_info_sym, r_info_type, r_addend in \
+                self._iter_raw_relocations(reloc_section):
+            if r_info_sym >= num_symbols:
+                raise ELFRelocationError(
+                    'Invalid symbol reference in relocation: index %s' % (
+                        r_info_sym))
+
+            recipe = recipes.get(r_info_type, None)
+            if recipe is None:
+                raise ELFRelocationError(
+                        'Unsupported relocation type: %s' % r_info_type)
+
+            value_struct = value_structs.get(recipe.bytesize)
+            if value_struct is None:
+                raise ELFRelocationError('Invalid bytesize %s for relocation' %
+                        recipe.bytesize)
+            if r_offset + recipe.bytesize > buf_size:
+                raise ELFParseError(
+                    'Relocation offset %#x out of section bounds' % r_offset)
+
+            original_value = value_struct.unpack_from(buf, r_offset)[0]
+            relocated_value = recipe.calc_func(
+                value=original_value,
+                sym_value=sym_values[r_info_sym],
+                offset=r_offset,
+                addend=r_addend if recipe.has_addend else 0)
+            value_struct.pack_into(
+                buf, r_offset,
+                relocated_value % (1 << (recipe.bytesize * 8)))
+
+    def _get_recipes(self, is_rela, get_sample_reloc):
+        """ Return the relocation recipes (a dict mapping relocation types to
+            recipes) for the machine architecture of the file, checking that
+            relocations of this kind (REL or RELA) are expected for it.
+
+            get_sample_reloc returns a relocation of the checked section, for
+            error reporting.
+        """
+        if self._recipes is None:
+            arch = self.elffile.get_machine_arch()
+            self._recipes = self._ARCH_RECIPES.get(arch, (None, {}))
+
+        rela_expected, recipes = self._recipes
+        if rela_expected is not None and is_rela != rela_expected:
+            raise ELFRelocationError(
+                'Unexpected %s relocation for %s: %s' % (
+                    'RELA' if is_rela else 'REL',
+                    self.elffile.get_machine_arch(),
+                    get_sample_reloc()))
+        return recipes
+
+    def _iter_raw_relocations(self, reloc_section):
+        """ Yield (r_offset, r_info_sym, r_info_type, r_addend) tuples for all
+            the relocations in the section, decoded in bulk. r_addend is 0
+            for REL relocations.
+        """
+        elffile = self.elffile
+        endianness = '<' if elffile.little_endian else '>'
+        is_rela = reloc_section.is_RELA()
+        addend_format = ('i' if elffile.elfclass == 32 else 'q') if is_rela \
+            else ''
+        if elffile.elfclass == 32:
+            entry_struct = struct.Struct(endianness + 'II' + addend_format)
+        elif elffile['e_machine'] == 'EM_MIPS':
+            # r_offset, r_sym, r_ssym, r_type3, r_type2, r_type (see
+            # ELFStructs._create_rel)
+            entry_struct = struct.Struct(endianness + 'QIBBBB' + addend_format)
+        else:
+            entry_struct = struct.Struct(endianness + 'QQ' + addend_format)
+
+        if entry_struct.size != reloc_section.entry_size:
+            # Entries with an unusual sh_entsize are parsed one by one
+            for reloc in reloc_section.iter_relocations():
+                yield (reloc['r_offset'], reloc['r_info_sym'],
+                       reloc['r_info_type'],
+                       reloc['r_addend'] if is_rela else 0)
+            return
+
+        data = reloc_section.data_view()
+        data = data[:reloc_section.num_relocations() *
+                    reloc_section.entry_size]
+        if elffile.elfclass == 32:
+            for entry in entry_struct.iter_unpack(data):
+                yield (entry[0], (entry[1] >> 8) & 0xFFFFFF, entry[1] & 0xFF,
+                       entry[2] if is_rela else 0)
+        elif elffile['e_machine'] == 'EM_MIPS':
+            for entry in entry_struct.iter_unpack(data):
+                yield (entry[0], entry[1], entry[5],
+                       entry[6] if is_rela else 0)
+        else:
+            for entry in entry_struct.iter_unpack(data):
+                yield (entry[0], entry[1] >> 32, entry[1] & 0xFFFFFFFF,
+                       entry[2] if is_rela else 0)
+
     def _do_apply_relocation(self, stream, reloc, symtab):
         # Preparations for performing the relocation: obtain the value of
         # the symbol mentioned in the relocation, as well as the relocation
@@ -227,32 +376,8 @@ class RelocationHandler(object):
         sym_value = symtab.get_symbol(reloc['r_info_sym'])['st_value']
 
         reloc_type = reloc['r_info_type']
-        recipe = None
-
-        if self.elffile.get_machine_arch() == 'x86':
-            if reloc.is_RELA():
-                raise ELFRelocationError(
-                    'Unexpected RELA relocation for x86: %s' % reloc)
-            recipe = self._RELOCATION_RECIPES_X86.get(reloc_type, None)
-        elif self.elffile.get_machine_arch() == 'x64':
-            if not reloc.is_RELA():
-                raise ELFRelocationError(
-                    'Unexpected REL relocation for x64: %s' % reloc)
-            recipe = self._RELOCATION_RECIPES_X64.get(reloc_type, None)
-        elif self.elffile.get_machine_arch() == 'MIPS':
-            if reloc.is_RELA():
-                raise ELFRelocationError(
-                    'Unexpected RELA relocation for MIPS: %s' % reloc)
-            recipe = self._RELOCATION_RECIPES_MIPS.get(reloc_type, None)
-        elif self.elffile.get_machine_arch() == 'ARM':
-            if reloc.is_RELA():
-                raise ELFRelocationError(
-                    'Unexpected RELA relocation for ARM: %s' % reloc)
-            recipe = self._RELOCATION_RECIPES_ARM.get(reloc_type, None)
-        elif self.elffile.get_machine_arch() == 'AArch64':
-            recipe = self._RELOCATION_RECIPES_AARCH64.get(reloc_type, None)
-        elif self.elffile.get_machine_arch() == '64-bit PowerPC':
-            recipe = self._RELOCATION_RECIPES_PPC64.get(reloc_type, None)
+        recipes = self._get_recipes(reloc.is_RELA(), lambda: reloc)
+        recipe = recipes.get(reloc_type, None)
 
         if recipe is None:
             raise ELFRelocationError(
@@ -381,4 +506,15 @@ class RelocationHandler(object):
             bytesize=4, has_addend=True, calc_func=_reloc_calc_sym_plus_addend),
     }
 
-
+    # Maps machine architectures (as returned by ELFFile.get_machine_arch) to
+    # a (rela_expected, recipes) pair. rela_expected tells whether only RELA
+    # (True) or only REL (False) relocations are expected for the
+    # architecture, or both (None).
+    _ARCH_RECIPES = {
+        'x86': (False, _RELOCATION_RECIPES_X86),
+        'x64': (True, _RELOCATION_RECIPES_X64),
+        'MIPS': (False, _RELOCATION_RECIPES_MIPS),
+        'ARM': (False, _RELOCATION_RECIPES_ARM),
+        'AArch64': (None, _RELOCATION_RECIPES_AARCH64),
+        '64-bit PowerPC': (None, _RELOCATION_RECIPES_PPC64),
+    }
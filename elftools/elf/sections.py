@@ -7,11 +7,18 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 from ..common.exceptions import ELFCompressionError
-from ..common.utils import struct_parse, elf_assert, parse_cstring_from_stream
+from ..construct import Container
+from ..common.utils import (struct_parse, elf_assert,
+        parse_cstring_from_stream, read_view, reverse_enum)
 from collections import defaultdict
 from .constants import SH_FLAGS
+from .enums import (ENUM_ST_INFO_BIND, ENUM_ST_INFO_TYPE, ENUM_ST_LOCAL,
+        ENUM_ST_VISIBILITY, ENUM_ST_SHNDX)
 from .notes import iter_notes
 
+import array
+import struct
+import sys
 import zlib
 
 
@@ -74,38 +81,75 @@ class Section(object):
         Note that data is decompressed if the stored section data is
         compressed.
         """
+        data = self.data_view()
+        return data if isinstance(data, bytes) else bytes(data)
+
+    def data_view(self):
+        """ The section data from the file, like data(), as a bytes-like
+        object. If the file is memory-mapped (see ELFFile.load_from_path),
+        the data of uncompressed sections is returned as a memoryview over
+        the mapping rather than as a bytes copy.
+        """
         # If this section is NOBITS, there is no data. provide a dummy answer
         if self.header['sh_type'] == 'SHT_NOBITS':
             return b'\0'*self.data_size
 
-        # If this section is compressed, deflate it
+        # If this section is compressed, deflate it (unless the ELF file keeps
+        # a cache of decompressed data and it's already there)
         if self.compressed:
-            c_type = self._compression_type
-            if c_type == 'ELFCOMPRESS_ZLIB':
-                # Read the data to decompress starting right after the
-                # compression header until the end of the section.
-                hdr_size = self.structs.Elf_Chdr.sizeof()
-                self.stream.seek(self['sh_offset'] + hdr_size)
-                compressed = self.stream.read(self['sh_size'] - hdr_size)
-
-                decomp = zlib.decompressobj()
-                result = decomp.decompress(compressed, self.data_size)
-            else:
-                raise ELFCompressionError(
-                    'Unknown compression type: {:#0x}'.format(c_type)
-                )
-
-            if len(result) != self._decompressed_size:
-                raise ELFCompressionError(
-                    'Decompressed data is {} bytes long, should be {} bytes'
-                    ' long'.format(len(result), self._decompressed_size)
-                )
+            cache = self.elffile.decompressed_cache
+            if cache is not None:
+                result = cache.get(self._cache_key)
+                if result is not None:
+                    return result
+            result = self.decompress(self.compressed_data())
+            if cache is not None:
+                cache.put(self._cache_key, result)
         else:
-            self.stream.seek(self['sh_offset'])
-            result = self.stream.read(self._decompressed_size)
+            result = read_view(self.stream, self['sh_offset'],
+                               self._decompressed_size)
 
         return result
 
+    def compressed_data(self):
+        """ The raw data of a compressed section, following its compression
+            header.
+        """
+        hdr_size = self.structs.Elf_Chdr.sizeof()
+        return read_view(self.stream,
+                         self['sh_offset'] + hdr_size,
+                         self['sh_size'] - hdr_size)
+
+    def decompress(self, compressed):
+        """ Decompress the given raw data (as returned by compressed_data) of
+            a compressed section.
+
+            This doesn't access the stream, so it can safely be called from a
+            worker thread.
+        """
+        c_type = self._compression_type
+        if c_type == 'ELFCOMPRESS_ZLIB':
+            decomp = zlib.decompressobj()
+            result = decomp.decompress(compressed, self.data_size)
+        else:
+            raise ELFCompressionError(
+                'Unknown compression type: {:#0x}'.format(c_type)
+            )
+
+        if len(result) != self._decompressed_size:
+            raise ELFCompressionError(
+                'Decompressed data is {} bytes long, should be {} bytes'
+                ' long'.format(len(result), self._decompressed_size)
+            )
+        return result
+
+    @property
+    def _cache_key(self):
+        """ Key of the decompressed data of this section in the decompressed
+            data cache of the ELF file.
+        """
+        return ('section', self['sh_offset'])
+
     def is_null(self):
         """ Is this a null section?
         """
@@ -136,12 +180,34 @@ class NullSection(Section):
 class StringTableSection(Section):
     """ ELF string table section.
     """
+    def __init__(self, header, name, elffile):
+        super(StringTableSection, self).__init__(header, name, elffile)
+        # The contents of the table, read on first use
+        self._table = None
+        # Decoded strings by offset
+        self._strings = {}
+
     def get_string(self, offset):
         """ Get the string stored at the given offset in this string table.
+
+            The whole table is read once, and the decoded strings are
+            memoized and interned: equal strings (even when found at different
+            offsets) are returned as the same object.
         """
-        table_offset = self['sh_offset']
-        s = parse_cstring_from_stream(self.stream, table_offset + offset)
-        return s.decode('utf-8', errors='replace') if s else ''
+        s = self._strings.get(offset)
+        if s is None:
+            if self._table is None:
+                self._table = self.data()
+            end = self._table.find(b'\x00', offset)
+            if end >= 0:
+                raw = self._table[offset:end]
+            else:
+                # Not terminated within the section, keep reading the file
+                raw = parse_cstring_from_stream(self.stream,
+                                                self['sh_offset'] + offset)
+            s = sys.intern(raw.decode('utf-8', errors='replace')) if raw else ''
+            self._strings[offset] = s
+        return s
 
 
 class SymbolTableIndexSection(Section):
@@ -176,17 +242,62 @@ class SymbolTableSection(Section):
         elf_assert(self['sh_size'] % self['sh_entsize'] == 0,
                 'Expected section size to be a multiple of entry size in section %r' % name)
         self._symbol_name_map = None
+        # The hash section linked to this table (False if there is none),
+        # and the name mappings of the symbols it doesn't cover.
+        self._hash_table = None
+        self._unhashed_symbol_name_maps = None
+        # See _get_symbol_format
+        self._symbol_format = None
 
     def num_symbols(self):
         """ Number of symbols in the table
         """
         return self['sh_size'] // self['sh_entsize']
 
-    def get_symbol(self, n):
-        """ Get the symbol at index #n from the table (Symbol object)
+    def _make_unhashed_symbol_name_maps(self):
+        """ Construct the name to number mappings of the symbols that can't
+            be found through the hash table: the ones before symoffset in a
+            GNU hash table (or the null symbol in an ELF hash table), and the
+            ones past the end of the hash chains.
+        """
+        if self._hash_table['sh_type'] == 'SHT_GNU_HASH':
+            hashed_start = self._hash_table.params['symoffset']
+        else:
+            hashed_start = 1
+        hashed_end = max(hashed_start,
+                         self._hash_table.get_number_of_symbols())
+        st_names = self.to_arrays(use_numpy=False)['st_name']
+        self._unhashed_symbol_name_maps = (defaultdict(list),
+                                           defaultdict(list))
+        for name_map, start, end in zip(self._unhashed_symbol_name_maps,
+                                        (0, hashed_end),
+                                        (hashed_start, len(st_names))):
+            for i, symname in enumerate(
+                    self.symbol_names(st_names[start:end]), start):
+                name_map[symname].append(i)
+
+    def _find_hash_table(self):
+        """ Find the GNU or ELF hash section linked to this symbol table, if
+            any.
+        """
+        for sec_type in ('SHT_GNU_HASH', 'SHT_HASH'):
+            for section in self.elffile.iter_sections(type=sec_type):
+                if self.elffile.get_section(section['sh_link']) is self:
+                    return section
+        return None
+
+    def get_symbol(self, n, compact=False):
+        """ Get the symbol at index #n from the table (Symbol object). If
+            compact is True, return a CompactSymbol instead.
         """
         # Grab the symbol's entry from the stream
         entry_offset = self['sh_offset'] + n * self['sh_entsize']
+        if compact:
+            _, layout, fmt = self._get_symbol_format()
+            self.stream.seek(entry_offset)
+            values = struct.unpack(fmt, self.stream.read(struct.calcsize(fmt)))
+            return CompactSymbol(self.stringtable.get_string(values[0]),
+                                 values, layout)
         entry = struct_parse(
             self.structs.Elf_Sym,
             self.stream,
@@ -199,22 +310,116 @@ class SymbolTableSection(Section):
         """ Get a symbol(s) by name. Return None if no symbol by the given name
             exists.
         """
+        # If a hash section is linked to this table, look the name up through
+        # it.
+        if self._hash_table is None:
+            self._hash_table = self._find_hash_table() or False
+        if self._hash_table:
+            if self._unhashed_symbol_name_maps is None:
+                self._make_unhashed_symbol_name_maps()
+            head_map, tail_map = self._unhashed_symbol_name_maps
+            symbols = ([self.get_symbol(i) for i in head_map.get(name, ())] +
+                       self._hash_table.lookup_many([name]).get(name, []) +
+                       [self.get_symbol(i) for i in tail_map.get(name, ())])
+            return symbols or None
+
         # The first time this method is called, construct a name to number
         # mapping
         #
         if self._symbol_name_map is None:
             self._symbol_name_map = defaultdict(list)
-            for i, sym in enumerate(self.iter_symbols()):
-                self._symbol_name_map[sym.name].append(i)
+            for i, symname in enumerate(self.symbol_names()):
+                self._symbol_name_map[symname].append(i)
         symnums = self._symbol_name_map.get(name)
         return [self.get_symbol(i) for i in symnums] if symnums else None
 
-    def iter_symbols(self):
-        """ Yield all the symbols in the table
+    def iter_symbols(self, compact=False):
+        """ Yield all the symbols in the table. If compact is True, yield
+            CompactSymbol objects decoded in bulk from the section data.
         """
+        if compact:
+            _, layout, fmt = self._get_symbol_format()
+            get_string = self.stringtable.get_string
+            for values in struct.iter_unpack(fmt, self.data_view()):
+                yield CompactSymbol(get_string(values[0]), values, layout)
+            return
         for i in range(self.num_symbols()):
             yield self.get_symbol(i)
 
+    # struct format characters of the Elf_Sym fields, by size
+    _FIELD_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+    def to_arrays(self, use_numpy=None):
+        """ Decode the whole symbol table at once, and return a dict mapping
+            the Elf_Sym field names (st_name, st_value, st_size, st_info,
+            st_other, st_shndx) to columns of raw integer values, one entry
+            per symbol (empty columns if there are no symbols). Nothing is
+            enum-decoded: st_info holds both the bind
+            (high 4 bits) and the type (low 4 bits), and st_name is the
+            offset of the name in the string table (see symbol_names).
+
+            If use_numpy is True the columns are NumPy arrays (views of a
+            single structured array over the section data); if it's False
+            they are array.array objects. By default NumPy is used when it's
+            available.
+        """
+        columns, _, fmt = self._get_symbol_format()
+        data = self.data_view()[:self.num_symbols() * self['sh_entsize']]
+
+        if use_numpy is not False:
+            try:
+                import numpy
+            except ImportError:
+                if use_numpy:
+                    raise
+            else:
+                byteorder = fmt[0]
+                dtype = numpy.dtype({
+                    'names': [name for name, _ in columns],
+                    'formats': [byteorder + code for _, code in columns],
+                    'offsets': [struct.calcsize(byteorder + fmt[1:i])
+                                for i in range(1, len(columns) + 1)],
+                    'itemsize': self['sh_entsize']})
+                table = numpy.frombuffer(data, dtype=dtype,
+                                         count=self.num_symbols())
+                return dict((name, table[name]) for name, _ in columns)
+
+        rows = list(zip(*struct.iter_unpack(fmt, data)))
+        return dict((name, array.array(code, rows[i] if rows else ()))
+                    for i, (name, code) in enumerate(columns))
+
+    def _get_symbol_format(self):
+        """ Return the columns of the symbol entries, as (field name, struct
+            format character) pairs in the order of the fields of Elf_Sym,
+            the position of each field in an entry, and the struct format of
+            an entry, padded up to sh_entsize.
+        """
+        if self._symbol_format is None:
+            columns = tuple((field.name, self._FIELD_FORMATS[field.sizeof()])
+                            for field in self.structs.Elf_Sym.subcons)
+            layout = dict((name, i) for i, (name, _) in enumerate(columns))
+            fmt = ('<' if self.elffile.little_endian else '>') + ''.join(
+                code for _, code in columns)
+            padding = self['sh_entsize'] - struct.calcsize(fmt)
+            elf_assert(padding >= 0,
+                'Expected entry size of section %r to be >= %d' % (
+                    self.name, struct.calcsize(fmt)))
+            if padding:
+                fmt += '%dx' % padding
+            self._symbol_format = (columns, layout, fmt)
+        return self._symbol_format
+
+    def symbol_names(self, st_names=None):
+        """ Return the list of names of the symbols in the table, looked up
+            in the associated string table. st_names is an iterable
+            of string table offsets (such as the st_name column returned by
+            to_arrays); by default all the symbols in the table are named.
+        """
+        if st_names is None:
+            st_names = self.to_arrays(use_numpy=False)['st_name']
+        get_string = self.stringtable.get_string
+        return [get_string(int(offset)) for offset in st_names]
+
 
 class Symbol(object):
     """ Symbol object - representing a single symbol entry from a symbol table
@@ -233,6 +438,47 @@ class Symbol(object):
         return self.entry[name]
 
 
+_DECODE_ST_INFO_BIND = reverse_enum(ENUM_ST_INFO_BIND)
+_DECODE_ST_INFO_TYPE = reverse_enum(ENUM_ST_INFO_TYPE)
+_DECODE_ST_LOCAL = reverse_enum(ENUM_ST_LOCAL)
+_DECODE_ST_VISIBILITY = reverse_enum(ENUM_ST_VISIBILITY)
+_DECODE_ST_SHNDX = reverse_enum(ENUM_ST_SHNDX)
+
+
+class CompactSymbol(object):
+    """ A symbol like Symbol, that only holds the raw integer values of its
+        entry, and decodes the enum fields (st_info, st_other and st_shndx)
+        when they're accessed. It takes a fraction of the memory of a Symbol,
+        and supports the same dictionary-like access to the symbol entry.
+
+        The entry attribute builds an equivalent Container on each access.
+    """
+    __slots__ = ('name', '_values', '_layout')
+
+    def __init__(self, name, values, layout):
+        self.name = name
+        self._values = values
+        self._layout = layout
+
+    def __getitem__(self, name):
+        value = self._values[self._layout[name]]
+        if name == 'st_info':
+            return Container(
+                bind=_DECODE_ST_INFO_BIND.get(value >> 4, value >> 4),
+                type=_DECODE_ST_INFO_TYPE.get(value & 0xf, value & 0xf))
+        elif name == 'st_other':
+            return Container(
+                local=_DECODE_ST_LOCAL.get(value >> 5, value >> 5),
+                visibility=_DECODE_ST_VISIBILITY.get(value & 7, value & 7))
+        elif name == 'st_shndx':
+            return _DECODE_ST_SHNDX.get(value, value)
+        return value
+
+    @property
+    def entry(self):
+        return Container(**dict((name, self[name]) for name in self._layout))
+
+
 class SUNWSyminfoTableSection(Section):
     """ ELF .SUNW Syminfo table section.
         Has an associated SymbolTableSection that's passed in the constructor.
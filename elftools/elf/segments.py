@@ -7,7 +7,7 @@
 # This code is in the public domain
 #-------------------------------------------------------------------------------
 from ..construct import CString
-from ..common.utils import struct_parse
+from ..common.utils import struct_parse, read_view
 from .constants import SH_FLAGS
 from .notes import iter_notes
 
@@ -20,8 +20,14 @@ class Segment(object):
     def data(self):
         """ The segment data from the file.
         """
-        self.stream.seek(self['p_offset'])
-        return self.stream.read(self['p_filesz'])
+        return bytes(self.data_view())
+
+    def data_view(self):
+        """ The segment data from the file, like data(), as a bytes-like
+            object. If the file is memory-mapped, the data is returned as a
+            memoryview over the mapping rather than as a bytes copy.
+        """
+        return read_view(self.stream, self['p_offset'], self['p_filesz'])
 
     def __getitem__(self, name):
         """ Implement dict-like access to header entries
@@ -0,0 +1,160 @@
+#-------------------------------------------------------------------------------
+# elftools: elf/symbolindex.py
+#
+# Address to symbol index
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from bisect import bisect_right
+
+from .enums import ENUM_ST_INFO_BIND, ENUM_ST_INFO_TYPE
+
+
+class SymbolAddressIndex(object):
+    """ An index mapping addresses to the symbols containing them, built once
+        from a symbol table.
+
+        The symbol table can be a SymbolTableSection or, for stripped
+        binaries, a DynamicSegment: anything that implements iter_symbols()
+        and get_symbol(). Symbol values are taken as addresses, so the index
+        is meant for linked (executable or shared object) files.
+
+        types is the list of symbol types to index (e.g. 'STT_FUNC'), or None
+        to index all the symbols. Undefined symbols are never indexed.
+
+        Symbols containing each other are resolved to the innermost one.
+        Zero-sized symbols only match their own address, and only if no sized
+        symbol contains it. When several symbols share the same address and
+        size (aliases), lookups return the preferred one: global symbols
+        first, then weak, then local, then by order in the table. All the
+        aliases are available through aliases().
+    """
+    def __init__(self, symboltable, types=('STT_FUNC', 'STT_OBJECT')):
+        self.symboltable = symboltable
+        self._types = (None if types is None
+                       else set(ENUM_ST_INFO_TYPE[t] for t in types))
+        # Disjoint intervals [start, end) sorted by start, and the list of
+        # symbol numbers (aliases, preferred first) for each interval.
+        self._starts = []
+        self._ends = []
+        self._symnums = []
+        # Symbol numbers of zero-sized symbols by address
+        self._exact = {}
+        self._build()
+
+    def lookup(self, address):
+        """ Return the Symbol containing the given address, or None if there
+            is no such symbol.
+        """
+        symnums = self._find(address)
+        return self.symboltable.get_symbol(symnums[0]) if symnums else None
+
+    def lookup_many(self, addresses):
+        """ Look up many addresses at once, returning the list of Symbol
+            objects (or None) in the order of the given addresses. The
+            addresses are sorted and resolved in a single sweep over the
+            index.
+        """
+        addresses = list(addresses)
+        result = [None] * len(addresses)
+        symbols = {}
+        i = 0
+        num_intervals = len(self._starts)
+        for pos in sorted(range(len(addresses)), key=addresses.__getitem__):
+            address = addresses[pos]
+            while i < num_intervals and self._ends[i] <= address:
+                i += 1
+            if i < num_intervals and self._starts[i] <= address:
+                symnums = self._symnums[i]
+            else:
+                symnums = self._exact.get(address)
+            if symnums:
+                symnum = symnums[0]
+                if symnum not in symbols:
+                    symbols[symnum] = self.symboltable.get_symbol(symnum)
+                result[pos] = symbols[symnum]
+        return result
+
+    def aliases(self, address):
+        """ Return the list of all the Symbols sharing the address and size of
+            the symbol containing the given address, preferred first. The list
+            is empty if no symbol contains the address.
+        """
+        return [self.symboltable.get_symbol(n)
+                for n in self._find(address) or ()]
+
+    def _find(self, address):
+        i = bisect_right(self._starts, address) - 1
+        if i >= 0 and address < self._ends[i]:
+            return self._symnums[i]
+        return self._exact.get(address)
+
+    def _iter_raw_symbols(self):
+        """ Yield (symbol number, st_value, st_size, bind, type) for each
+            defined symbol in the table, with raw bind and type values.
+        """
+        if hasattr(self.symboltable, 'to_arrays'):
+            columns = self.symboltable.to_arrays(use_numpy=False)
+            for n, (value, size, info, shndx) in enumerate(zip(
+                    columns['st_value'], columns['st_size'],
+                    columns['st_info'], columns['st_shndx'])):
+                if shndx != 0:
+                    yield n, value, size, info >> 4, info & 0xf
+        else:
+            for n, sym in enumerate(self.symboltable.iter_symbols()):
+                if sym['st_shndx'] == 'SHN_UNDEF':
+                    continue
+                bind = sym['st_info']['bind']
+                type = sym['st_info']['type']
+                yield (n, sym['st_value'], sym['st_size'],
+                       ENUM_ST_INFO_BIND.get(bind, bind),
+                       ENUM_ST_INFO_TYPE.get(type, type))
+
+    def _build(self):
+        # Group aliases by (start, end) and order them by preference
+        bind_rank = {ENUM_ST_INFO_BIND['STB_GLOBAL']: 0,
+                     ENUM_ST_INFO_BIND['STB_WEAK']: 1,
+                     ENUM_ST_INFO_BIND['STB_LOCAL']: 2}
+        intervals = {}
+        for n, value, size, bind, type in self._iter_raw_symbols():
+            if self._types is not None and type not in self._types:
+                continue
+            key = (bind_rank.get(bind, 3), n)
+            if size == 0:
+                self._exact.setdefault(value, []).append(key)
+            else:
+                intervals.setdefault((value, value + size), []).append(key)
+        for keys in self._exact.values():
+            keys.sort()
+            keys[:] = [n for _, n in keys]
+
+        # Sweep over the intervals sorted by start, outermost first, keeping a
+        # stack of the intervals containing the current position, to split
+        # them into disjoint intervals resolving to the innermost symbol.
+        stack = []
+        pos = None
+        for start, end in sorted(intervals, key=lambda i: (i[0], -i[1])):
+            symnums = [n for _, n in sorted(intervals[(start, end)])]
+            while stack and pos < start:
+                top_end, top_symnums = stack[-1]
+                if top_end > pos:
+                    self._add_interval(pos, min(top_end, start), top_symnums)
+                    pos = min(top_end, start)
+                if top_end <= pos:
+                    stack.pop()
+            pos = start
+            stack.append((end, symnums))
+        while stack:
+            top_end, top_symnums = stack.pop()
+            if top_end > pos:
+                self._add_interval(pos, top_end, top_symnums)
+                pos = top_end
+
+    def _add_interval(self, start, end, symnums):
+        if self._ends and self._ends[-1] == start and \
+                self._symnums[-1] is symnums:
+            self._ends[-1] = end
+        else:
+            self._starts.append(start)
+            self._ends.append(end)
+            self._symnums.append(symnums)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#-------------------------------------------------------------------------------
+# scripts/benchmark_iter_DIEs.py
+#
+# Benchmark of CompileUnit.iter_DIEs() on synthetic CUs of growing size, to
+# check that iterating over a CU takes time linear in its number of DIEs.
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import io
+import struct
+import sys
+import time
+
+# For running from development directory. It should take precedence over the
+# installed pyelftools.
+sys.path.insert(0, '.')
+
+from elftools.dwarf.dwarfinfo import (DWARFInfo, DebugSectionDescriptor,
+        DwarfConfig)
+
+
+# Abbreviations: 1 is the compile unit, 2 a structure with members and a
+# DW_AT_sibling attribute, and 3 a member.
+_ABBREV = bytes([
+    1, 0x11, 1, 0x03, 0x08, 0, 0,                         # DW_TAG_compile_unit
+    2, 0x13, 1, 0x03, 0x08, 0x0b, 0x0b, 0x01, 0x13, 0, 0, # DW_TAG_structure_type
+    3, 0x0d, 0, 0x03, 0x08, 0x0b, 0x0b, 0, 0,             # DW_TAG_member
+    0])
+
+
+def make_dwarfinfo(num_structs, members_per_struct=3):
+    """ Return a DWARFInfo with a single CU holding num_structs structures of
+        members_per_struct members each.
+    """
+    header_size = 11
+    dies = [b'\x01cu\x00']
+    offset = header_size + len(dies[0])
+    for i in range(num_structs):
+        members = b''.join(b'\x03m%d\x00\x04' % j
+                           for j in range(members_per_struct)) + b'\x00'
+        name = b's%d\x00' % i
+        # The sibling reference is relative to the CU
+        sibling = offset + 1 + len(name) + 1 + 4 + len(members)
+        dies.append(b'\x02' + name + b'\x08' + struct.pack('<I', sibling) +
+                    members)
+        offset = sibling
+    dies.append(b'\x00')
+    body = struct.pack('<HIB', 4, 0, 8) + b''.join(dies)
+    info = struct.pack('<I', len(body)) + body
+
+    def section(name, data):
+        return DebugSectionDescriptor(io.BytesIO(data), name, None,
+                                      len(data), 0)
+
+    return DWARFInfo(
+        config=DwarfConfig(little_endian=True, machine_arch='x64',
+                           default_address_size=8),
+        debug_info_sec=section('.debug_info', info),
+        debug_aranges_sec=None,
+        debug_abbrev_sec=section('.debug_abbrev', _ABBREV),
+        debug_frame_sec=None,
+        eh_frame_sec=None,
+        debug_str_sec=None,
+        debug_loc_sec=None,
+        debug_ranges_sec=None,
+        debug_line_sec=None,
+        debug_pubtypes_sec=None,
+        debug_pubnames_sec=None,
+        debug_addr_sec=None,
+        debug_str_offsets_sec=None,
+        debug_line_str_sec=None,
+        debug_loclists_sec=None,
+        debug_rnglists_sec=None,
+        debug_sup_sec=None,
+        gnu_debugaltlink_sec=None)
+
+
+def iter_all(cu):
+    return sum(1 for _ in cu.iter_DIEs())
+
+
+def iter_children_first(cu):
+    # The structures are reached through their siblings first, so that their
+    # members are then cached between them
+    for _ in cu.get_top_DIE().iter_children():
+        pass
+    return sum(1 for _ in cu.iter_DIEs())
+
+
+def main():
+    for func in (iter_all, iter_children_first):
+        print(func.__name__)
+        print('%10s %10s %14s' % ('DIEs', 'seconds', 'us per DIE'))
+        for num_structs in (5000, 10000, 20000, 40000, 80000):
+            dwarfinfo = make_dwarfinfo(num_structs)
+            cu = next(dwarfinfo.iter_CUs())
+            start = time.perf_counter()
+            num_dies = func(cu)
+            elapsed = time.perf_counter() - start
+            print('%10d %10.2f %14.2f' % (num_dies, elapsed,
+                                          elapsed / num_dies * 1e6))
+
+
+if __name__ == '__main__':
+    main()
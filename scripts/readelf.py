@@ -324,12 +324,12 @@ class ReadElf(object):
         for nseg, segment in enumerate(self.elffile.iter_segments()):
             self._emit('   %2.2d     ' % nseg)
 
-            for section in self.elffile.iter_sections():
+            for nsec in self.elffile.get_segment_section_indices(nseg):
+                section = self.elffile.get_section(nsec)
                 if (    not section.is_null() and
                         not ((section['sh_flags'] & SH_FLAGS.SHF_TLS) != 0 and
                              section['sh_type'] == 'SHT_NOBITS' and
-                             segment['p_type'] != 'PT_TLS') and
-                        segment.section_in_segment(section)):
+                             segment['p_type'] != 'PT_TLS')):
                     self._emit('%s ' % section.name)
 
             self._emitline('')
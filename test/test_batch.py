@@ -0,0 +1,82 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+import time
+
+from elftools.batch import analyze_files
+from elftools.common.exceptions import ELFError
+from elftools.elf.elffile import ELFFile
+
+
+def _machine(elffile):
+    return elffile['e_machine']
+
+
+def _slow(elffile):
+    time.sleep(5)
+
+
+class TestAnalyzeFiles(unittest.TestCase):
+    def _paths(self, *names):
+        return [os.path.join('test', 'testfiles_for_readelf', name)
+                for name in names]
+
+    def test_results(self):
+        paths = self._paths('exe_simple32.elf', 'exe_simple64.elf',
+                            'angr-eh_frame.elf', 'exe_simple32.elf')
+        for chunksize in (1, 3):
+            with self.subTest(chunksize=chunksize):
+                results = list(analyze_files(_machine, iter(paths),
+                                             max_workers=2,
+                                             chunksize=chunksize))
+                self.assertEqual(sorted(r.path for r in results),
+                                 sorted(paths))
+                for result in results:
+                    with open(result.path, 'rb') as f:
+                        self.assertEqual(result.value,
+                                         ELFFile(f)['e_machine'])
+                    self.assertIsNone(result.error)
+                    self.assertGreaterEqual(result.elapsed, 0)
+
+    def test_errors(self):
+        paths = self._paths('exe_simple64.elf') + [
+            os.path.join('test', 'test_batch.py'),
+            os.path.join('test', 'no_such_file.elf')]
+        results = dict((r.path, r) for r in analyze_files(
+            _machine, paths, max_workers=1, chunksize=3))
+        self.assertEqual(results[paths[0]].value, 'EM_X86_64')
+        self.assertIsInstance(results[paths[1]].error, ELFError)
+        self.assertIsInstance(results[paths[2]].error, IOError)
+        self.assertIsNone(results[paths[2]].value)
+
+    @unittest.skipUnless(hasattr(__import__('signal'), 'SIGALRM'),
+                         'needs SIGALRM')
+    def test_timeout(self):
+        results = list(analyze_files(_slow, self._paths('exe_simple64.elf'),
+                                     max_workers=1, timeout=0.2))
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0].error, TimeoutError)
+        self.assertLess(results[0].elapsed, 5)
+
+
+class TestStructsCache(unittest.TestCase):
+    def test_shared_structs(self):
+        cache = {}
+        path = os.path.join('test', 'testfiles_for_readelf',
+                            'exe_simple64.elf')
+        elf1 = ELFFile.load_from_path(path, structs_cache=cache)
+        elf2 = ELFFile.load_from_path(path, structs_cache=cache)
+        self.assertIs(elf1.structs, elf2.structs)
+        self.assertEqual(list(cache), [elf1.structs.__getstate__()])
+        self.assertEqual(elf2.get_section_by_name('.text')['sh_type'],
+                         'SHT_PROGBITS')
+        elf1.close()
+        elf2.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -58,24 +58,52 @@ class TestCompressedSupport(unittest.TestCase):
             else:
                 self.fail('An exception was exected')
 
+    def test_parallel_decompression(self):
+        with self.elffile('64') as elf:
+            self.assertEqual(self.get_cus_info(elf, decompress_threads=4),
+                             ['CU 0x0: 0xb-0x319'])
+
+    def test_zdebug_parallel_decompression(self):
+        path = os.path.join('test', 'testfiles_for_readelf',
+                            'exe_compressed64.elf')
+        with open(path, 'rb') as f:
+            expected = self.get_cus_info(ELFFile(f))
+            self.assertEqual(
+                self.get_cus_info(ELFFile(f), decompress_threads=4),
+                expected)
+
+    def test_decompressed_cache(self):
+        with self.elffile('64', decompressed_cache_size=1 << 20) as elf:
+            section = elf.get_section_by_name('.debug_info')
+            data = section.data()
+            self.assertIs(section.data(), data)
+            self.assertEqual(elf.decompressed_cache.size, len(data))
+            self.assertEqual(self.get_cus_info(elf, decompress_threads=2),
+                             ['CU 0x0: 0xb-0x319'])
+
+        with self.elffile('64', decompressed_cache_size=16) as elf:
+            section = elf.get_section_by_name('.debug_info')
+            self.assertIsNot(section.data(), section.data())
+            self.assertEqual(len(elf.decompressed_cache), 0)
+
     # Test helpers
 
     @contextmanager
-    def elffile(self, name):
+    def elffile(self, name, **kwargs):
         """ Context manager to open and parse an ELF file.
         """
         with open(os.path.join('test', 'testfiles_for_unittests',
                                'compressed_{}.o'.format(name)), 'rb') as f:
-            yield ELFFile(f)
+            yield ELFFile(f, **kwargs)
 
-    def get_cus_info(self, elffile):
+    def get_cus_info(self, elffile, **kwargs):
         """ Return basic info about the compile units in `elffile`.
 
         This is used as a basic sanity check for decompressed DWARF data.
         """
         result = []
 
-        dwarf = elffile.get_dwarf_info()
+        dwarf = elffile.get_dwarf_info(**kwargs)
         for cu in dwarf.iter_CUs():
             dies = []
 
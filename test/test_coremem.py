@@ -0,0 +1,113 @@
+#-------------------------------------------------------------------------------
+# Tests reading the memory image of core files
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+from io import BytesIO
+import os
+import struct
+import unittest
+
+from elftools.common.exceptions import ELFError
+from elftools.elf.coremem import CoreMemory
+from elftools.elf.elffile import ELFFile
+
+
+LIBC = '/lib/x86_64-linux-gnu/libc-2.23.so'
+
+
+class TestCoreMemory(unittest.TestCase):
+    def setUp(self):
+        self._core_file = open(os.path.join(
+            'test', 'testfiles_for_unittests', 'core_linux64.elf'), 'rb')
+        self.elf = ELFFile(self._core_file)
+
+    def tearDown(self):
+        self._core_file.close()
+
+    def _fake_libc(self):
+        # Each 8-byte word of the fake libc holds its own file offset
+        return BytesIO(b''.join(struct.pack('<Q', offset)
+                                for offset in range(0, 0x1c4000, 8)))
+
+    def test_dumped_memory(self):
+        with CoreMemory(self.elf) as memory:
+            for segment in self.elf.iter_segments(type='PT_LOAD'):
+                if segment['p_filesz'] == 0:
+                    continue
+                data = segment.data()
+                self.assertEqual(memory.read(segment['p_vaddr'], 16),
+                                 data[:16])
+                # Across pages up to the end of the segment
+                size = min(segment['p_filesz'], 0x1010)
+                self.assertEqual(memory.read(
+                    segment['p_vaddr'] + segment['p_filesz'] - size, size),
+                    data[-size:])
+            # The ELF header of the program
+            self.assertEqual(memory.read(0x400000, 4), b'\x7fELF')
+            self.assertEqual(memory.read_pointer(0x400018),
+                             struct.unpack('<Q', memory.read(0x400018, 8))[0])
+
+    def test_unavailable_memory(self):
+        with CoreMemory(self.elf) as memory:
+            # Not mapped at all
+            with self.assertRaises(ELFError):
+                memory.read(0x1000, 4)
+            # Mapped from libc, which can't be loaded
+            with self.assertRaises(ELFError):
+                memory.read(0x7fa45956d000, 4)
+            # Straddling the end of the dumped part of a segment
+            with self.assertRaises(ELFError):
+                memory.read(0x7fa4593aeffc, 8)
+            self.assertEqual(len(memory.read(0x7fa4593aeff8, 8)), 8)
+
+    def test_mapped_files(self):
+        def stream_loader(path):
+            if path == LIBC:
+                return self._fake_libc()
+            raise IOError(path)
+
+        with CoreMemory(self.elf, stream_loader=stream_loader) as memory:
+            # Past the dumped first page of libc's text, offset 0 in the file
+            self.assertEqual(memory.read_pointer(0x7fa4593af000), 0x1000)
+            # A mapping at offset 0x1bf000 of libc, not dumped at all
+            self.assertEqual(memory.read_pointer(0x7fa45956d008), 0x1bf008)
+            # Dumped memory still comes from the core file
+            self.assertEqual(memory.read(0x7fa4593ae000, 4), b'\x7fELF')
+            # Straddling dumped memory and the mapped file
+            self.assertEqual(memory.read(0x7fa4593aeff8, 16)[8:],
+                             struct.pack('<Q', 0x1000))
+            # A mapping of a file that can't be loaded
+            with self.assertRaises(ELFError):
+                memory.read(0x7fa459778000, 4)
+
+    def test_page_cache(self):
+        reads = []
+
+        class CountingStream(BytesIO):
+            def read(self, *args):
+                reads.append(args)
+                return BytesIO.read(self, *args)
+
+        def stream_loader(path):
+            return CountingStream(self._fake_libc().getvalue())
+
+        with CoreMemory(self.elf, stream_loader=stream_loader,
+                        cache_pages=2) as memory:
+            for i in range(100):
+                memory.read_pointer(0x7fa45956d000 + 8 * (i % 10))
+            self.assertEqual(len(reads), 1)
+            memory.read(0x7fa45956e000, 4)
+            memory.read(0x7fa45956f000, 4)
+            memory.read(0x7fa45956d000, 4)
+            self.assertEqual(len(reads), 4)
+
+    def test_not_a_core_file(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'simple_gcc.elf.arm'), 'rb') as f:
+            with self.assertRaises(ELFError):
+                CoreMemory(ELFFile(f))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from elftools.elf.elffile import ELFFile
+from elftools.elf.debugfiles import (DebugFileResolver, get_build_id,
+        get_debuglink, file_crc32)
+
+
+def _testfile(name):
+    return os.path.join('test', 'testfiles_for_readelf', name)
+
+
+class TestDebugFileResolver(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def _copy(self, src, *dest):
+        dest = os.path.join(self.root, *dest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(src, dest)
+        return dest
+
+    def test_build_id_layout(self):
+        debug_path = self._copy(
+            _testfile('exe_simple64.elf'), 'debug', '.build-id', '8e',
+            '50cda8e25993499ac4aa2d8deaf58d0949d47d.debug')
+        resolver = DebugFileResolver([os.path.join(self.root, 'debug')])
+        with ELFFile.load_from_path(_testfile('exe_stripped64.elf')) as elf:
+            self.assertEqual(get_build_id(elf),
+                             '8e50cda8e25993499ac4aa2d8deaf58d0949d47d')
+            self.assertEqual(resolver.find_debug_file(elf), debug_path)
+            with resolver.open_debug_file(elf) as debug_elf:
+                self.assertTrue(debug_elf.has_dwarf_info())
+        self.assertIsNone(resolver.find_by_build_id('0123456789abcdef'))
+
+    def test_index(self):
+        debug_path = self._copy(_testfile('dwarf_lineprogramv5.elf'),
+                                'store', 'a', 'b', 'prog.debug')
+        self._copy(os.path.join('test', 'test_debugfiles.py'),
+                   'store', 'a', 'notes.txt')
+        index_path = os.path.join(self.root, 'index.json')
+        build_id = '5072601a0f54e7e7fe5cf30a19b08e438a45bb55'
+
+        resolver = DebugFileResolver([os.path.join(self.root, 'store')],
+                                     index_path=index_path)
+        self.assertEqual(resolver.find_by_build_id(build_id), debug_path)
+        self.assertTrue(os.path.exists(index_path))
+
+        # Another resolver uses the saved index without scanning the roots
+        resolver = DebugFileResolver([os.path.join(self.root, 'store')],
+                                     index_path=index_path)
+        resolver.update_index = lambda: self.fail('index rebuilt')
+        self.assertEqual(resolver.find_by_build_id(build_id.upper()),
+                         debug_path)
+        self.assertIsNone(resolver.find_by_build_id('0123456789abcdef'))
+
+        # A moved file is found again by rescanning
+        moved_path = os.path.join(self.root, 'store', 'moved.debug')
+        os.rename(debug_path, moved_path)
+        resolver = DebugFileResolver([os.path.join(self.root, 'store')],
+                                     index_path=index_path)
+        self.assertEqual(resolver.find_by_build_id(build_id), moved_path)
+
+    def test_index_skips_malformed_files(self):
+        # A copy of exe_simple64.elf with no segments, whose build ID note is
+        # cut short at the end of the file
+        path = _testfile('exe_simple64.elf')
+        with ELFFile.load_from_path(path) as elf:
+            note_index = elf.get_section_index('.note.gnu.build-id')
+            note_header_offset = (elf['e_shoff'] +
+                                  note_index * elf['e_shentsize'])
+        with open(path, 'rb') as f:
+            data = bytearray(f.read())
+        struct.pack_into('<H', data, 0x38, 0)
+        struct.pack_into('<Q', data, note_header_offset + 0x18, len(data))
+        data += struct.pack('<III', 4, 20, 3)
+        bad_path = os.path.join(self.root, 'store', 'a', 'bad.debug')
+        os.makedirs(os.path.dirname(bad_path))
+        with open(bad_path, 'wb') as f:
+            f.write(data)
+        debug_path = self._copy(_testfile('dwarf_lineprogramv5.elf'),
+                                'store', 'b', 'prog.debug')
+
+        resolver = DebugFileResolver([os.path.join(self.root, 'store')])
+        self.assertEqual(resolver.find_by_build_id(
+                            '5072601a0f54e7e7fe5cf30a19b08e438a45bb55'),
+                         debug_path)
+
+    def test_debuglink(self):
+        with ELFFile.load_from_path(os.path.join(
+                'test', 'testfiles_for_unittests',
+                'android_dyntags.elf')) as elf:
+            self.assertEqual(get_debuglink(elf),
+                             ('libsoundtrigger.so', 2204042645))
+        with ELFFile.load_from_path(_testfile('exe_simple64.elf')) as elf:
+            self.assertIsNone(get_debuglink(elf))
+
+        exe_path = self._copy(_testfile('exe_stripped64.elf'),
+                              'usr', 'bin', 'prog')
+        data = b'debug data' * 1000
+        crc = zlib.crc32(data) & 0xffffffff
+        debug_root = os.path.join(self.root, 'debug')
+        resolver = DebugFileResolver([debug_root])
+        self.assertIsNone(resolver.find_by_debuglink(exe_path, 'prog.debug',
+                                                     crc))
+
+        debug_path = os.path.join(
+            debug_root, os.path.splitdrive(os.path.dirname(
+                exe_path))[1].lstrip(os.sep), 'prog.debug')
+        os.makedirs(os.path.dirname(debug_path))
+        with open(debug_path, 'wb') as f:
+            f.write(data)
+        self.assertEqual(resolver.find_by_debuglink(exe_path, 'prog.debug',
+                                                    crc), debug_path)
+        # A debug file in the .debug directory takes precedence
+        local_path = os.path.join(os.path.dirname(exe_path), '.debug',
+                                  'prog.debug')
+        os.makedirs(os.path.dirname(local_path))
+        with open(local_path, 'wb') as f:
+            f.write(data)
+        self.assertEqual(resolver.find_by_debuglink(exe_path, 'prog.debug',
+                                                    crc), local_path)
+        self.assertIsNone(resolver.find_by_debuglink(exe_path, 'prog.debug',
+                                                     crc ^ 1))
+
+    def test_file_crc32(self):
+        path = _testfile('exe_simple64.elf')
+        with open(path, 'rb') as f:
+            expected = zlib.crc32(f.read()) & 0xffffffff
+        self.assertEqual(file_crc32(path, chunk_size=100), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,3 +56,25 @@ class TestCacheLUTandDIEref(unittest.TestCase):
 
         self.oprint('\n'.join(lines))
         self.assertGreater(len(lines), 1)
+
+    def test_known_CU_offsets(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'arm_exidx_test.elf')
+        with ELFFile.load_from_path(path) as elffile:
+            cu_offsets = [cu.cu_offset
+                          for cu in elffile.get_dwarf_info().iter_CUs()]
+            last_die = list(elffile.get_dwarf_info().get_CU_at(
+                cu_offsets[-1]).iter_DIEs())[-1]
+        self.assertGreater(len(cu_offsets), 2)
+
+        with ELFFile.load_from_path(path) as elffile:
+            dwarf = elffile.get_dwarf_info()
+            dwarf.add_known_CU_offsets(cu_offsets[:0:-2])
+            dwarf.add_known_CU_offsets(cu_offsets[-1:])
+            cu = dwarf.get_CU_containing(last_die.offset)
+            self.assertEqual(cu.cu_offset, cu_offsets[-1])
+            self.assertEqual(dwarf.get_DIE_from_refaddr(last_die.offset).tag,
+                             last_die.tag)
+            self.assertEqual(dwarf.get_CU_containing(0).cu_offset, 0)
+            self.assertEqual([cu.cu_offset for cu in dwarf.iter_CUs()],
+                             cu_offsets)
@@ -0,0 +1,81 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+
+from elftools.elf.elffile import ELFFile
+from elftools.dwarf.dieparser import read_uleb128, read_sleb128, read_cstring
+
+
+class TestDIEParser(unittest.TestCase):
+    """ DIEs are decoded straight from the .debug_info data when its stream
+        allows it. Check that this gives the same DIEs as parsing them from
+        the stream with the structs.
+    """
+    def _dump_DIEs(self, path, from_buffer):
+        dies = []
+        with open(path, 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info(follow_links=False)
+            self.assertIsNotNone(dwarfinfo._get_debug_info_buffer())
+            if not from_buffer:
+                dwarfinfo._debug_info_buffer = False
+            for cu in dwarfinfo.iter_CUs():
+                for die in cu.iter_DIEs():
+                    dies.append((die.offset, die.size, die.tag,
+                                 die.has_children, list(die.attributes.items())))
+        return dies
+
+    def test_same_as_structs(self):
+        for filename in ('dwarfv5_basic.elf', 'dwarf_lineprog_data16.elf',
+                         'arm_with_form_indirect.elf', 'debug_info.elf',
+                         'dwarf_gnuops1.o'):
+            path = os.path.join('test', 'testfiles_for_unittests', filename)
+            with self.subTest(filename=filename):
+                dies = self._dump_DIEs(path, from_buffer=True)
+                self.assertGreater(len(dies), 0)
+                self.assertEqual(dies, self._dump_DIEs(path, from_buffer=False))
+
+    def test_abbrev_decoders(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'dwarfv5_basic.elf')
+        with open(path, 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info()
+            merged = fixed = 0
+            for cu in dwarfinfo.iter_CUs():
+                abbrev_table = cu.get_abbrev_table()
+                for die in cu.iter_DIEs():
+                    if die.is_null():
+                        continue
+                    abbrev_decl = abbrev_table.get_abbrev(die.abbrev_code)
+                    decoder = abbrev_decl.get_decoder(cu.structs)
+                    # Compiled once per abbreviation and structs
+                    self.assertIs(decoder, abbrev_decl.get_decoder(cu.structs))
+                    self.assertEqual(list(decoder.attr_specs),
+                                     list(abbrev_decl.iter_attr_specs()))
+                    if len(decoder._steps) < len(decoder.attr_specs):
+                        merged += 1
+                    if decoder.fixed_size is not None and die.attributes:
+                        first = next(iter(die.attributes.values()))
+                        self.assertEqual(
+                            die.offset + die.size - first.offset,
+                            decoder.fixed_size)
+                        fixed += 1
+        self.assertGreater(merged, 0)
+        self.assertGreater(fixed, 0)
+
+    def test_readers(self):
+        buf = bytes([0xe5, 0x8e, 0x26, 0x7f, 0x80, 0x7f]) + b'ab\x00c'
+        for data in (buf, memoryview(buf)):
+            self.assertEqual(read_uleb128(data, 0), (624485, 3))
+            self.assertEqual(read_sleb128(data, 3), (-1, 4))
+            self.assertEqual(read_sleb128(data, 4), (-128, 6))
+            self.assertEqual(read_cstring(data, 6), (b'ab', 9))
+            self.assertRaises(IndexError, read_cstring, data, 9)
+            self.assertRaises(IndexError, read_uleb128, data[:2], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
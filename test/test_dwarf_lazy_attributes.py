@@ -0,0 +1,85 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+
+from elftools.elf.elffile import ELFFile
+from elftools.dwarf.die import AttributeValue
+
+
+class TestLazyAttributes(unittest.TestCase):
+    def _get_top_DIE(self, f, from_buffer):
+        dwarfinfo = ELFFile(f).get_dwarf_info()
+        if not from_buffer:
+            dwarfinfo._debug_info_buffer = False
+        return next(dwarfinfo.iter_CUs()).get_top_DIE()
+
+    def test_strings_looked_up_on_access(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'dwarfv5_basic.elf')
+        for from_buffer in (True, False):
+            with open(path, 'rb') as f:
+                top_DIE = self._get_top_DIE(f, from_buffer)
+                dwarfinfo = top_DIE.dwarfinfo
+                lookups = []
+                get_string_from_table = dwarfinfo.get_string_from_table
+                def counting_get_string_from_table(offset):
+                    lookups.append(offset)
+                    return get_string_from_table(offset)
+                dwarfinfo.get_string_from_table = counting_get_string_from_table
+
+                dies = list(top_DIE.iter_children())
+                self.assertEqual(lookups, [])
+
+                # A name indexing .debug_str_offsets, translated when accessed
+                attr = dies[0].attributes['DW_AT_name']
+                self.assertEqual(attr.form, 'DW_FORM_strx1')
+                self.assertEqual(attr.value, b'main')
+                self.assertGreater(len(lookups), 0)
+                # Translated only once
+                count = len(lookups)
+                self.assertIs(dies[0].attributes['DW_AT_name'], attr)
+                self.assertEqual(len(lookups), count)
+
+    def test_low_pc_without_string_lookups(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'arm_exidx_test.elf')
+        with open(path, 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info()
+            lookups = []
+            get_string_from_table = dwarfinfo.get_string_from_table
+            def counting_get_string_from_table(offset):
+                lookups.append(offset)
+                return get_string_from_table(offset)
+            dwarfinfo.get_string_from_table = counting_get_string_from_table
+
+            subprograms = [
+                die for cu in dwarfinfo.iter_CUs() for die in cu.iter_DIEs()
+                if die.tag == 'DW_TAG_subprogram' and
+                   die.attributes.get('DW_AT_low_pc') is not None]
+            self.assertGreater(len(subprograms), 0)
+            self.assertEqual(lookups, [])
+
+            # Only the name accessed is looked up
+            attr = subprograms[0].attributes['DW_AT_name']
+            self.assertEqual(attr.form, 'DW_FORM_strp')
+            self.assertEqual(lookups, [attr.raw_value])
+
+    def test_tuple_behavior(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'dwarfv5_basic.elf')
+        with open(path, 'rb') as f:
+            top_DIE = self._get_top_DIE(f, True)
+            attrs = list(top_DIE.attributes.values())
+        attr = attrs[0]
+        self.assertIsInstance(attr, tuple)
+        self.assertEqual(AttributeValue._make(attr), attr)
+        self.assertEqual(sorted(attrs)[0].name,
+                         min(attr.name for attr in attrs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#-------------------------------------------------------------------------------
+# Tests lazy loading of DWARF sections
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import os
+import unittest
+
+from elftools.elf.elffile import ELFFile
+
+
+class TestLazyDWARFSections(unittest.TestCase):
+    def test_sections_load_on_first_use(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'dwarfv5_basic.elf'), 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info(lazy_sections=True)
+            self.assertFalse(dwarfinfo.debug_info_sec.stream.loaded)
+            self.assertFalse(dwarfinfo.debug_line_sec.stream.loaded)
+
+            cu = next(dwarfinfo.iter_CUs())
+            dwarfinfo.line_program_for_CU(cu)
+            self.assertTrue(dwarfinfo.debug_info_sec.stream.loaded)
+            self.assertTrue(dwarfinfo.debug_line_sec.stream.loaded)
+            self.assertFalse(dwarfinfo.eh_frame_sec.stream.loaded)
+
+    def test_compressed_section_size(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'compressed_64.o'), 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info(lazy_sections=True)
+            self.assertEqual(dwarfinfo.debug_info_sec.size, 0x327)
+            self.assertFalse(dwarfinfo.debug_info_sec.stream.loaded)
+            self.assertEqual(len(list(dwarfinfo.iter_CUs())), 1)
+
+    def _get_tags(self, dwarfinfo):
+        return [die.tag for cu in dwarfinfo.iter_CUs()
+                for die in cu.iter_DIEs()]
+
+    def test_usable_after_close(self):
+        # Without lazy_sections, all the sections are loaded right away
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'dwarfv5_basic.elf')
+        with ELFFile.load_from_path(path) as elf:
+            dwarfinfo = elf.get_dwarf_info()
+        self.assertIn('DW_TAG_compile_unit', self._get_tags(dwarfinfo))
+
+        # Also when the stream is closed by its owner
+        with open(path, 'rb') as f:
+            dwarfinfo = ELFFile(f).get_dwarf_info()
+        self.assertTrue(f.closed)
+        self.assertIn('DW_TAG_compile_unit', self._get_tags(dwarfinfo))
+
+    def test_close_does_not_load(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'dwarfv5_basic.elf')
+        with ELFFile.load_from_path(path) as elf:
+            dwarfinfo = elf.get_dwarf_info(lazy_sections=True)
+        self.assertFalse(dwarfinfo.debug_info_sec.stream.loaded)
+        # A lazy DWARFInfo needs the stream of its ELFFile
+        self.assertRaises(ValueError, self._get_tags, dwarfinfo)
+
+if __name__ == '__main__':
+    unittest.main()
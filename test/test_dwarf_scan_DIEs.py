@@ -0,0 +1,74 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+
+from elftools.elf.elffile import ELFFile
+
+
+class TestScanDIEs(unittest.TestCase):
+    """ CompileUnit.scan_DIEs must find the same DIEs and attributes as
+        walking the DIE tree, whether the section data is accessed directly
+        or not.
+    """
+    ATTRIBUTES = ('DW_AT_name', 'DW_AT_low_pc', 'DW_AT_high_pc',
+                  'DW_AT_ranges')
+
+    def _walk(self, die, tags, attributes, skip_children_of):
+        if tags is None or die.tag in tags:
+            yield (die.offset, die.tag,
+                   [(name, attr) for name, attr in die.attributes.items()
+                    if attributes is None or name in attributes])
+        if die.has_children and die.tag not in skip_children_of:
+            for child in die.iter_children():
+                for found in self._walk(child, tags, attributes,
+                                        skip_children_of):
+                    yield found
+
+    def _check_scan(self, filename, tags=None, attributes=None,
+                    skip_children_of=()):
+        path = os.path.join('test', 'testfiles_for_unittests', filename)
+        for from_buffer in (True, False):
+            with open(path, 'rb') as f:
+                dwarfinfo = ELFFile(f).get_dwarf_info(follow_links=False)
+                if not from_buffer:
+                    dwarfinfo._debug_info_buffer = False
+                for cu in dwarfinfo.iter_CUs():
+                    scanned = [
+                        (s.offset, s.tag, list(s.attributes.items()))
+                        for s in cu.scan_DIEs(tags, attributes,
+                                              skip_children_of)]
+                    self.assertEqual(scanned, list(self._walk(
+                        cu.get_top_DIE(), tags, attributes,
+                        skip_children_of)))
+                    for offset, tag, _ in scanned:
+                        self.assertEqual(
+                            cu.get_DIE_from_refaddr(offset).tag, tag)
+
+    def test_all_DIEs(self):
+        self._check_scan('dwarfv5_basic.elf')
+        self._check_scan('arm_with_form_indirect.elf')
+
+    def test_selected_DIEs(self):
+        self._check_scan('dwarfv5_basic.elf',
+                         tags=('DW_TAG_subprogram', 'DW_TAG_variable'),
+                         attributes=self.ATTRIBUTES)
+        self._check_scan('simple_gcc.elf.arm', tags=('DW_TAG_subprogram',),
+                         attributes=self.ATTRIBUTES)
+
+    def test_skip_children(self):
+        # With and without DW_AT_sibling
+        for filename in ('simple_gcc.elf.arm', 'dwarfv5_basic.elf',
+                         'dwarf_gnuops1.o'):
+            self._check_scan(filename,
+                             tags=('DW_TAG_subprogram', 'DW_TAG_variable'),
+                             attributes=('DW_AT_name',),
+                             skip_children_of=('DW_TAG_subprogram',
+                                               'DW_TAG_structure_type'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -98,6 +98,30 @@ class TestDynamic(unittest.TestCase):
         self.assertEqual(symbol_at_index_3.name, '__register_atfork')
         self.assertIsNotNone(symbols_atfork)
 
+    def test_tag_table(self):
+        """ Verify that the dynamic array is parsed once and that lookups by
+            type agree with a scan of all the tags"""
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'arm_exidx_test.so'), 'rb') as f:
+            elf = ELFFile(f)
+            segment = next(elf.iter_segments('PT_DYNAMIC'))
+            tags = [tag.entry for tag in segment.iter_tags()]
+            self.assertEqual(segment.num_tags(), len(tags))
+            self.assertEqual(tags[-1].d_tag, 'DT_NULL')
+            for d_tag in set(tag.d_tag for tag in tags):
+                self.assertEqual(
+                    [tag.entry for tag in segment.iter_tags(d_tag)],
+                    [tag for tag in tags if tag.d_tag == d_tag])
+
+            # The tags aren't parsed again
+            segment._get_tag = None
+            self.assertEqual(segment.get_table_offset('DT_SYMTAB'),
+                             segment.get_table_offset('DT_SYMTAB'))
+            dynsym = elf.get_section_by_name('.dynsym')
+            self.assertEqual(
+                [(sym.name, sym.entry) for sym in segment.iter_symbols()],
+                [(sym.name, sym.entry) for sym in dynsym.iter_symbols()])
+
     def test_sunw_tags(self):
         def extract_sunw(filename):
             with open(filename, 'rb') as f:
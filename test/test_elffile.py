@@ -6,6 +6,7 @@
 #-------------------------------------------------------------------------------
 import unittest
 import os
+import sys
 
 from elftools.elf.elffile import ELFFile
 
@@ -50,6 +51,38 @@ class TestMap(unittest.TestCase):
         self.assertEqual(tuple(elf.address_offsets(0x103FE, 4)), ())
         self.assertEqual(tuple(elf.address_offsets(0x10400, 4)), ())
 
+    def test_address_index(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'arm_exidx_test.so'), 'rb') as f:
+            elf = ELFFile(f)
+            sections = list(elf.iter_sections())
+            segments = list(elf.iter_segments())
+            for nseg, segment in enumerate(segments):
+                self.assertEqual(
+                    elf.get_segment_section_indices(nseg),
+                    [n for n, section in enumerate(sections)
+                     if segment.section_in_segment(section)])
+            for n, section in enumerate(sections):
+                self.assertEqual(
+                    elf.get_section_segment_indices(n),
+                    [nseg for nseg, segment in enumerate(segments)
+                     if segment.section_in_segment(section)])
+
+            text = elf.get_section_by_name('.text')
+            for address in (text['sh_addr'],
+                            text['sh_addr'] + text['sh_size'] - 1):
+                self.assertIs(elf.get_section_by_address(address), text)
+            self.assertIsNot(elf.get_section_by_address(
+                text['sh_addr'] + text['sh_size']), text)
+            self.assertIs(elf.get_section_by_offset(text['sh_offset'] + 1),
+                          text)
+            self.assertIsNone(elf.get_section_by_address(0xffffff00))
+            self.assertIsNone(elf.get_section_by_offset(0xffffff00))
+            self.assertIs(elf.get_section_by_address(
+                elf.get_section_by_name('.bss')['sh_addr']),
+                elf.get_section_by_name('.bss'))
+
+
 class TestSectionFilter(unittest.TestCase):
 
     def test_section_filter(self):
@@ -61,5 +94,46 @@ class TestSectionFilter(unittest.TestCase):
             self.assertEqual(len(list(elf.iter_sections('SHT_ARM_EXIDX'))), 1)
             self.assertTrue(elf.has_ehabi_info())
 
+class TestSectionCache(unittest.TestCase):
+
+    def test_sections_are_cached(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'arm_exidx_test.so'), 'rb') as f:
+            elf = ELFFile(f)
+            sections = list(elf.iter_sections())
+            for i, section in enumerate(sections):
+                self.assertIs(elf.get_section(i), section)
+            self.assertIs(elf.get_section_by_name('.dynsym'),
+                          elf.get_section_by_name('.dynsym'))
+            self.assertEqual(
+                list(elf.iter_sections('SHT_REL')),
+                [s for s in sections if s['sh_type'] == 'SHT_REL'])
+            self.assertEqual(list(elf.iter_sections('SHT_NONEXISTENT')), [])
+
+
+class TestStringTable(unittest.TestCase):
+
+    def test_strings_are_interned(self):
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'arm_exidx_test.so'), 'rb') as f:
+            elf = ELFFile(f)
+            dynstr = elf.get_section_by_name('.dynstr')
+            data = dynstr.data()
+            offset = data.index(b'\x00', 1) + 1
+            string = data[offset:data.index(b'\x00', offset)].decode('utf-8')
+            self.assertGreater(len(string), 1)
+            self.assertEqual(dynstr.get_string(offset), string)
+            self.assertIs(dynstr.get_string(offset), dynstr.get_string(offset))
+            # A suffix is the same object as an equal string anywhere else
+            self.assertIs(dynstr.get_string(offset + 1),
+                          sys.intern(string[1:]))
+            self.assertEqual(dynstr.get_string(0), '')
+
+            names = [sym.name for sym in elf.get_section_by_name(
+                '.dynsym').iter_symbols()]
+            segment = next(elf.iter_segments('PT_DYNAMIC'))
+            self.assertEqual([sym.name for sym in segment.iter_symbols()],
+                             names)
+
 if __name__ == '__main__':
     unittest.main()
@@ -54,6 +54,22 @@ class TestGetSectionIndex(unittest.TestCase):
             # Test it is actually the symbol we expect.
             self.assertEqual(data_section.name, '.data')
 
+    def test_section_name_map_matches_sections(self):
+        for filename in ('simple_gcc.elf.arm', 'compressed_64.o',
+                         'arm_reloc_unrelocated.o'):
+            with open(os.path.join('test', 'testfiles_for_unittests',
+                                   filename), 'rb') as f:
+                elf = ELFFile(f)
+                expected = {}
+                for i in range(elf.num_sections()):
+                    expected[elf.get_section(i).name] = i
+
+                elf = ELFFile(f)
+                for name, index in expected.items():
+                    self.assertEqual(elf.get_section_index(name), index)
+                # The map is built without creating section objects
+                self.assertEqual(elf._section_cache, {})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -59,6 +59,35 @@ class TestELFHash(unittest.TestCase):
             self.assertIsNotNone(symbol_main)
             self.assertEqual(symbol_main['st_value'], int(0x400790))
 
+    def test_lookup_many(self):
+        """ Verify we can look up several symbols at once from an ELF hash
+            section.
+        """
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'simple_mipsel.elf')
+        with open(path, 'rb') as f:
+            elf = ELFFile(f)
+            hash_section = elf.get_section_by_name('.hash')
+            result = hash_section.lookup_many(['main', 'nonexistent'])
+            self.assertEqual(list(result), ['main'])
+            self.assertEqual(result['main'][0]['st_value'], int(0x400790))
+
+            # The chains are compared by name, only the matching symbols are
+            # parsed
+            symtab = elf.get_section(hash_section['sh_link'])
+            names = [sym.name for sym in symtab.iter_symbols()][1:]
+            parsed = []
+            get_symbol = symtab.get_symbol
+            def counting_get_symbol(n):
+                parsed.append(n)
+                return get_symbol(n)
+            symtab.get_symbol = counting_get_symbol
+            result = hash_section.lookup_many(names)
+            self.assertEqual(sorted(result), sorted(set(names)))
+            self.assertEqual(sorted(parsed), list(range(1, len(names) + 1)))
+            for name, symbols in result.items():
+                self.assertTrue(all(sym.name == name for sym in symbols))
+
 
 class TestGNUHash(unittest.TestCase):
     """ Tests for the GNU hash table.
@@ -113,3 +142,24 @@ class TestGNUHash(unittest.TestCase):
             symbol_f1 = hash_section.get_symbol('caller')
             self.assertIsNotNone(symbol_f1)
             self.assertEqual(symbol_f1['st_value'], int(0x5a4))
+
+    def test_lookup_many(self):
+        """ Verify we can look up several symbols at once from a GNU hash
+            section, and that get_symbol_by_name on the linked symbol table
+            agrees with a full scan of the table.
+        """
+        with open(os.path.join('test', 'testfiles_for_unittests',
+                               'lib_versioned64.so.1.elf'), 'rb') as f:
+            elf = ELFFile(f)
+            hash_section = elf.get_section_by_name('.gnu.hash')
+            symtab = elf.get_section(hash_section['sh_link'])
+            names = [sym.name for sym in symtab.iter_symbols()]
+            result = hash_section.lookup_many(names + ['nonexistent'])
+            symoffset = hash_section.params['symoffset']
+            self.assertEqual(sorted(result), sorted(set(names[symoffset:])))
+            for name in set(names):
+                expected = [i for i, n in enumerate(names) if n == name]
+                self.assertEqual(
+                    [sym.entry for sym in symtab.get_symbol_by_name(name)],
+                    [symtab.get_symbol(i).entry for i in expected])
+            self.assertIsNone(symtab.get_symbol_by_name('nonexistent'))
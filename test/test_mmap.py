@@ -0,0 +1,111 @@
+#-------------------------------------------------------------------------------
+# Tests for memory-mapped ELF files
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import os
+import unittest
+import warnings
+
+from elftools.elf.elffile import ELFFile
+from elftools.common.utils import BufferStream
+
+
+def _test_file(name):
+    return os.path.join('test', 'testfiles_for_unittests', name)
+
+
+class TestMmap(unittest.TestCase):
+    def _dump_dies(self, elf):
+        dwarfinfo = elf.get_dwarf_info()
+        return [(die.offset, die.tag, dict(die.attributes))
+                for cu in dwarfinfo.iter_CUs()
+                for die in cu.iter_DIEs()]
+
+    def test_section_and_segment_data(self):
+        path = _test_file('simple_gcc.elf.arm')
+        with ELFFile.load_from_path(path) as elf, \
+                ELFFile.load_from_path(path, mmap=True) as mapped:
+            self.assertEqual(elf.num_sections(), mapped.num_sections())
+            for sec, mapped_sec in zip(elf.iter_sections(),
+                                       mapped.iter_sections()):
+                self.assertEqual(sec.name, mapped_sec.name)
+                data = mapped_sec.data_view()
+                if mapped_sec['sh_type'] != 'SHT_NOBITS':
+                    self.assertIsInstance(data, memoryview)
+                self.assertEqual(sec.data(), bytes(data))
+                self.assertIsInstance(mapped_sec.data(), bytes)
+                self.assertEqual(mapped_sec.data(), sec.data())
+                del data
+            for seg, mapped_seg in zip(elf.iter_segments(),
+                                       mapped.iter_segments()):
+                data = mapped_seg.data_view()
+                self.assertIsInstance(data, memoryview)
+                self.assertEqual(seg.data(), bytes(data))
+                self.assertEqual(mapped_seg.data(), seg.data())
+                del data
+
+    def test_dwarf_in_place(self):
+        path = _test_file('dwarfv5_basic.elf')
+        with ELFFile.load_from_path(path) as elf, \
+                ELFFile.load_from_path(path, mmap=True) as mapped:
+            self.assertIsInstance(
+                mapped.get_dwarf_info().debug_info_sec.stream,
+                BufferStream)
+            self.assertEqual(self._dump_dies(elf), self._dump_dies(mapped))
+
+    def test_dwarf_relocated(self):
+        path = _test_file('arm_reloc_unrelocated.o')
+        with ELFFile.load_from_path(path) as elf, \
+                ELFFile.load_from_path(path, mmap=True) as mapped:
+            self.assertEqual(self._dump_dies(elf), self._dump_dies(mapped))
+
+    def test_close_with_dwarf(self):
+        path = _test_file('dwarfv5_basic.elf')
+        with ELFFile.load_from_path(path) as elf:
+            expected = self._dump_dies(elf)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', ResourceWarning)
+            with ELFFile.load_from_path(path, mmap=True) as mapped:
+                dwarfinfo = mapped.get_dwarf_info()
+            # The DWARF sections parsed in place outlive the file
+            self.assertIsInstance(dwarfinfo.debug_info_sec.stream,
+                                  BufferStream)
+            self.assertEqual(
+                [(die.offset, die.tag, dict(die.attributes))
+                 for cu in dwarfinfo.iter_CUs() for die in cu.iter_DIEs()],
+                expected)
+
+            # Nor do the DWARF sections of a supplementary file
+            with ELFFile.load_from_path(
+                    _test_file('test_debugsup1.debug').encode(),
+                    mmap=True) as mapped:
+                sup_dwarfinfo = mapped.get_dwarf_info().supplementary_dwarfinfo
+            self.assertIsInstance(sup_dwarfinfo.debug_info_sec.stream,
+                                  BufferStream)
+            self.assertGreater(len(list(sup_dwarfinfo.iter_CUs())), 0)
+
+    def test_close_with_live_views(self):
+        elf = ELFFile.load_from_path(_test_file('simple_gcc.elf.arm'),
+                                     mmap=True)
+        data = elf.get_section_by_name('.text').data_view()
+        with self.assertWarns(ResourceWarning):
+            elf.close()
+        self.assertGreater(len(bytes(data)), 0)
+
+
+class TestBufferStream(unittest.TestCase):
+    def test_read_seek(self):
+        stream = BufferStream(b'0123456789')
+        self.assertEqual(stream.read(3), b'012')
+        self.assertEqual(stream.tell(), 3)
+        stream.seek(-2, os.SEEK_END)
+        self.assertEqual(stream.read(), b'89')
+        self.assertEqual(stream.read(1), b'')
+        stream.seek(2, os.SEEK_SET)
+        stream.seek(2, os.SEEK_CUR)
+        self.assertEqual(stream.read(100), b'456789')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from elftools.batch import DWARFInfoHandle
+from elftools.elf.elffile import ELFFile
+
+
+def _count_DIEs(elffile, cu_offset):
+    with elffile:
+        cu = elffile.get_dwarf_info().get_CU_at(cu_offset)
+        return len(list(cu.iter_DIEs()))
+
+
+class TestPickling(unittest.TestCase):
+    path = os.path.join('test', 'testfiles_for_unittests',
+                        'arm_exidx_test.elf')
+
+    def test_elffile(self):
+        with ELFFile.load_from_path(self.path, decompressed_cache_size=100) as elf:
+            text = elf.get_section_by_name('.text')
+            text_data = bytes(text.data())
+            data = pickle.dumps(elf)
+        # Only the path and options are pickled
+        self.assertLess(len(data), 4096)
+
+        with pickle.loads(data) as elf2:
+            # Opened again when unpickled
+            self.assertFalse(elf2.stream.closed)
+            self.assertEqual(elf2.decompressed_cache.max_size, 100)
+            text2 = elf2.get_section_by_name('.text')
+            self.assertEqual(text2.header, text.header)
+            self.assertEqual(bytes(text2.data()), text_data)
+            # An unpickled ELFFile can be pickled again
+            with pickle.loads(pickle.dumps(elf2)) as elf3:
+                self.assertEqual(elf3.num_sections(), elf2.num_sections())
+
+    def test_elffile_from_stream(self):
+        with open(self.path, 'rb') as f:
+            self.assertRaises(TypeError, pickle.dumps, ELFFile(f))
+
+    def test_dwarfinfo_handle(self):
+        with ELFFile.load_from_path(self.path) as elf:
+            dwarfinfo = elf.get_dwarf_info()
+            cus = list(dwarfinfo.iter_CUs())
+            last_die = list(cus[-1].iter_DIEs())[-1]
+        handle = DWARFInfoHandle(self.path,
+                                 cu_offsets=[cu.cu_offset for cu in cus])
+        data = pickle.dumps(handle)
+        self.assertLess(len(data), 4096)
+
+        with pickle.loads(data) as handle2:
+            dwarfinfo2 = handle2.get()
+            self.assertIs(handle2.get(), dwarfinfo2)
+            self.assertEqual(
+                dwarfinfo2.get_CU_containing(last_die.offset).cu_offset,
+                cus[-1].cu_offset)
+            # The known CU offsets let the lookup above go straight to the
+            # last CU
+            self.assertEqual(len(dwarfinfo2._cu_cache), 1)
+            self.assertEqual([cu.cu_offset for cu in dwarfinfo2.iter_CUs()],
+                             [cu.cu_offset for cu in cus])
+            die = dwarfinfo2.get_DIE_from_refaddr(last_die.offset)
+            self.assertEqual(die.tag, last_die.tag)
+            # A handle in use pickles without its open file
+            self.assertEqual(len(pickle.dumps(handle2)), len(data))
+
+    def test_process_pool(self):
+        with ELFFile.load_from_path(self.path) as elf:
+            cus = list(elf.get_dwarf_info().iter_CUs())[:4]
+            expected = [len(list(cu.iter_DIEs())) for cu in cus]
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                counts = list(executor.map(_count_DIEs,
+                                           [elf] * len(cus),
+                                           [cu.cu_offset for cu in cus]))
+        self.assertEqual(counts, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
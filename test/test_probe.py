@@ -0,0 +1,69 @@
+#-------------------------------------------------------------------------------
+# elftools tests
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import unittest
+import os
+from io import BytesIO
+
+from elftools.common.exceptions import ELFError
+from elftools.elf.elffile import ELFFile
+from elftools.elf.probe import probe, probe_path
+
+
+class TestProbe(unittest.TestCase):
+    def _probe_from_elffile(self, path):
+        with open(path, 'rb') as f:
+            elf = ELFFile(f)
+            interpreter = None
+            build_id = None
+            for seg in elf.iter_segments():
+                if seg['p_type'] == 'PT_INTERP' and interpreter is None:
+                    interpreter = seg.get_interp_name()
+                elif seg['p_type'] == 'PT_NOTE' and build_id is None:
+                    for note in seg.iter_notes():
+                        if note['n_type'] == 'NT_GNU_BUILD_ID':
+                            build_id = note['n_desc']
+                            break
+            return (elf.elfclass, elf.little_endian, elf['e_machine'],
+                    elf['e_type'], interpreter, build_id)
+
+    def test_matches_elffile(self):
+        for name in ('testfiles_for_readelf/dwarf_lineprogramv5.elf',
+                     'testfiles_for_readelf/dt_flags.elf',
+                     'testfiles_for_readelf/angr-eh_frame.elf',
+                     'testfiles_for_readelf/exe_simple64.elf',
+                     'testfiles_for_unittests/arm_exidx_test.so',
+                     'testfiles_for_unittests/core_linux64.elf'):
+            path = os.path.join('test', *name.split('/'))
+            with self.subTest(name=name):
+                self.assertEqual(tuple(probe_path(path)),
+                                 self._probe_from_elffile(path))
+
+    def test_fields(self):
+        result = probe_path(os.path.join(
+            'test', 'testfiles_for_readelf', 'dwarf_lineprogramv5.elf'))
+        self.assertEqual(result.elfclass, 64)
+        self.assertTrue(result.little_endian)
+        self.assertEqual(result.machine, 'EM_X86_64')
+        self.assertEqual(result.type, 'ET_DYN')
+        self.assertEqual(result.interpreter, '/lib64/ld-linux-x86-64.so.2')
+        self.assertEqual(result.build_id,
+                         '5072601a0f54e7e7fe5cf30a19b08e438a45bb55')
+
+    def test_not_elf(self):
+        for data in (b'', b'#!/bin/sh\n' * 4, b'\x7fELF\x03\x01' + b'\0' * 58,
+                     b'\x7fELF\x02\x03' + b'\0' * 58):
+            with self.subTest(data=data[:6]):
+                self.assertRaises(ELFError, probe, BytesIO(data))
+
+    def test_truncated(self):
+        with open(os.path.join('test', 'testfiles_for_readelf',
+                               'exe_simple64.elf'), 'rb') as f:
+            data = f.read(40)
+        self.assertRaises(ELFError, probe, BytesIO(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
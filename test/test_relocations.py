@@ -5,6 +5,9 @@ import unittest
 
 from elftools.elf.elffile import ELFFile
 from elftools.elf.dynamic import DynamicSegment, DynamicSection
+from elftools.elf.relocation import RelocationHandler, RelocationSection
+from elftools.common.exceptions import ELFError
+from elftools.common.utils import get_stream_buffer
 
 
 class TestRelocation(unittest.TestCase):
@@ -44,5 +47,121 @@ class TestRelocation(unittest.TestCase):
                     relos = sect.get_relocation_tables()
                     self.assertEqual(set(relos), {'JMPREL', 'REL'})
 
+    def test_batch_relocation(self):
+        """Verify that relocating a buffer in bulk gives the same result as
+           relocating a stream one relocation at a time"""
+
+        class UnbufferedStream(object):
+            # Not a BytesIO, so relocations are applied one at a time
+            def __init__(self, data):
+                self.bytesio = BytesIO(data)
+            def __getattr__(self, name):
+                return getattr(self.bytesio, name)
+
+        test_dir = os.path.join('test', 'testfiles_for_unittests')
+        for filename in ('arm_exidx_test.o', 'dwarf_gnuops1.o',
+                         'simple_gcc.elf.mips', 'compressed_32.o'):
+            with open(os.path.join(test_dir, filename), 'rb') as f:
+                elff = ELFFile(f)
+                handler = RelocationHandler(elff)
+                num_relocated = 0
+                for sect in elff.iter_sections():
+                    reloc_sect = handler.find_relocations_for_section(sect)
+                    if reloc_sect is None or not sect.name.startswith('.debug'):
+                        continue
+                    data = sect.data()
+                    buf = bytearray(data)
+                    handler.apply_section_relocations_to_buffer(buf, reloc_sect)
+                    stream = UnbufferedStream(data)
+                    handler.apply_section_relocations(stream, reloc_sect)
+                    self.assertEqual(bytes(buf), stream.getvalue())
+                    num_relocated += 1
+                self.assertGreater(num_relocated, 0)
+
+    def test_relocated_dwarf_section_buffer(self):
+        """Verify that the buffer of a relocated DWARF section is shared, not
+           copied, by its stream"""
+
+        test_dir = os.path.join('test', 'testfiles_for_unittests')
+        with open(os.path.join(test_dir, 'dwarf_gnuops1.o'), 'rb') as f:
+            elff = ELFFile(f)
+            debug_info = elff.get_section_by_name('.debug_info')
+            expected = bytearray(debug_info.data())
+            RelocationHandler(elff).apply_section_relocations_to_buffer(
+                expected, elff.get_section_by_name('.rela.debug_info'))
+            self.assertNotEqual(expected, debug_info.data())
+
+            stream = elff.get_dwarf_info().debug_info_sec.stream
+            buf = get_stream_buffer(stream)
+            self.assertEqual(buf, expected)
+            self.assertIs(get_stream_buffer(stream).obj, buf.obj)
+
+    def test_raw_relocations_entry_size(self):
+        """Verify that relocations with an entry size other than the size of
+           the bulk decoding struct are decoded one at a time"""
+
+        test_dir = os.path.join('test', 'testfiles_for_unittests')
+        with open(os.path.join(test_dir, 'dwarf_gnuops1.o'), 'rb') as f:
+            elff = ELFFile(f)
+            handler = RelocationHandler(elff)
+            reloc_sect = elff.get_section_by_name('.rela.debug_info')
+            for entry_size in (reloc_sect.entry_size,
+                               reloc_sect.entry_size + 8):
+                reloc_sect.entry_size = entry_size
+                expected = [(reloc['r_offset'], reloc['r_info_sym'],
+                             reloc['r_info_type'], reloc['r_addend'])
+                            for reloc in reloc_sect.iter_relocations()]
+                self.assertGreater(len(expected), 0)
+                self.assertEqual(
+                    list(handler._iter_raw_relocations(reloc_sect)), expected)
+
+            # Relocation sections with an unexpected sh_entsize are rejected
+            header = reloc_sect.header.copy()
+            header['sh_entsize'] += 8
+            self.assertRaises(ELFError, RelocationSection, header,
+                              reloc_sect.name, elff)
+
+    def test_find_relocations_for_section(self):
+        """Verify that relocation sections are found by the name of the
+           section they apply to"""
+
+        test_dir = os.path.join('test', 'testfiles_for_unittests')
+        with open(os.path.join(test_dir, 'dwarf_gnuops1.o'), 'rb') as f:
+            elff = ELFFile(f)
+            handler = RelocationHandler(elff)
+            num_found = 0
+            for index, sect in enumerate(elff.iter_sections()):
+                expected = None
+                for relsect in elff.iter_sections():
+                    if (relsect['sh_type'] in ('SHT_REL', 'SHT_RELA') and
+                            relsect.name in ('.rel' + sect.name,
+                                             '.rela' + sect.name)):
+                        expected = relsect
+                        self.assertEqual(relsect['sh_info'], index)
+                        num_found += 1
+                        break
+                self.assertIs(handler.find_relocations_for_section(sect),
+                              expected)
+            self.assertGreater(num_found, 0)
+
+    def test_find_relocations_for_section_by_sh_info(self):
+        """Verify that a relocation section whose name doesn't match the
+           section it applies to is found through its sh_info link"""
+
+        test_dir = os.path.join('test', 'testfiles_for_unittests')
+        with open(os.path.join(test_dir, 'dwarfv5_basic.elf'), 'rb') as f:
+            elff = ELFFile(f)
+            handler = RelocationHandler(elff)
+            got_plt = elff.get_section_by_name('.got.plt')
+            rela_plt = elff.get_section_by_name('.rela.plt')
+            self.assertIsNone(elff.get_section_by_name('.rela.got.plt'))
+            self.assertEqual(rela_plt['sh_info'],
+                             elff.get_section_index('.got.plt'))
+            self.assertIs(handler.find_relocations_for_section(got_plt),
+                          rela_plt)
+            self.assertIsNone(handler.find_relocations_for_section(
+                elff.get_section_by_name('.text')))
+
+
 if __name__ == '__main__':
     unittest.main()
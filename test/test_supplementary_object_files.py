@@ -15,8 +15,10 @@
 # $ dwz test_gnudebugaltlink1 test_gnudebugaltlink2 -m test_gnudebugaltlink.common
 
 import unittest
+import io
 import os
 
+from elftools.common.utils import LRUCache
 from elftools.elf.elffile import ELFFile
 
 class TestDWARFSupplementaryObjects(unittest.TestCase):
@@ -99,3 +101,68 @@ class TestDWARFSupplementaryObjects(unittest.TestCase):
                     if ('DW_AT_name' in attrs and attrs['DW_AT_name'].form ==
                             'DW_FORM_strp_sup'):
                         self.assertIsInstance(attrs['DW_AT_name'].value, bytes)
+
+    def test_shared_supplementary_dwarfinfo(self):
+        base_dir = os.path.join(b'test', b'testfiles_for_unittests')
+
+        def supplementary_dwarfinfos(cache, *names):
+            result = []
+            for name in names:
+                with ELFFile.load_from_path(
+                        os.path.join(base_dir, name),
+                        supplementary_dwarfinfo_cache=cache) as elffile:
+                    dwarfinfo = elffile.get_dwarf_info()
+                    result.append(dwarfinfo.supplementary_dwarfinfo)
+            return result
+
+        cache = LRUCache(1)
+        for prefix in (b'test_gnudebugaltlink', b'test_debugsup'):
+            sup1, sup2, sup3 = supplementary_dwarfinfos(
+                cache,
+                prefix + b'1.debug', prefix + b'2.debug', prefix + b'1.debug')
+            self.assertIs(sup1, sup2)
+            self.assertIs(sup1, sup3)
+
+        # The gnudebugaltlink supplementary file was evicted by the debugsup
+        # one, and then replaced it
+        altlink_sup, = supplementary_dwarfinfos(
+            cache, b'test_gnudebugaltlink1.debug')
+        self.assertIsNot(altlink_sup, sup1)
+        self.assertEqual(supplementary_dwarfinfos(
+            cache, b'test_gnudebugaltlink2.debug'), [altlink_sup])
+        self.assertEqual(len(cache), 1)
+
+        # Not shared without a cache
+        sup1, sup2 = supplementary_dwarfinfos(None, b'test_debugsup1.debug',
+                                              b'test_debugsup2.debug')
+        self.assertIsNot(sup1, sup2)
+
+    def test_supplementary_loader_without_fileno(self):
+        base_dir = os.path.join('test', 'testfiles_for_unittests')
+
+        class NamedBytesIO(io.BytesIO):
+            def __init__(self, path):
+                with open(path, 'rb') as f:
+                    io.BytesIO.__init__(self, f.read())
+                self.name = path
+
+        def stream_loader(path):
+            return NamedBytesIO(os.path.join(base_dir, path.decode()))
+
+        # Drop the checksum from .debug_sup, so that the supplementary file
+        # can only be identified by its size and modification time
+        stream = NamedBytesIO(os.path.join(base_dir, 'test_debugsup1.debug'))
+        debug_sup = ELFFile(stream).get_section_by_name('.debug_sup')
+        data = debug_sup.data()
+        checksum_offset = debug_sup['sh_offset'] + data.index(b'\x00', 3) + 1
+        stream.getbuffer()[checksum_offset] = 0
+
+        for cache in (None, LRUCache(1)):
+            dwarfinfo = ELFFile(stream, stream_loader=stream_loader,
+                                supplementary_dwarfinfo_cache=cache
+                                ).get_dwarf_info()
+            self.assertIsNone(dwarfinfo.parse_debugsup_checksum())
+            self.assertIsNotNone(dwarfinfo.supplementary_dwarfinfo)
+            # Not cached, since the stream has no file to stat
+            if cache is not None:
+                self.assertEqual(len(cache), 0)
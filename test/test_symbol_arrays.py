@@ -0,0 +1,113 @@
+#-------------------------------------------------------------------------------
+# Tests the bulk export of symbol tables
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import array
+import os
+import unittest
+
+from elftools.elf.elffile import ELFFile
+from elftools.elf.enums import ENUM_ST_INFO_TYPE
+from elftools.elf.sections import CompactSymbol, SymbolTableSection
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _symtabs():
+    test_dir = os.path.join('test', 'testfiles_for_unittests')
+    for filename in ('simple_gcc.elf.arm', 'simple_gcc.elf.mips',
+                     'sample_exe64.elf'):
+        with open(os.path.join(test_dir, filename), 'rb') as f:
+            elf = ELFFile(f)
+            for name in ('.symtab', '.dynsym'):
+                symtab = elf.get_section_by_name(name)
+                if symtab is not None:
+                    yield symtab
+
+
+class TestSymbolArrays(unittest.TestCase):
+    def _check_columns(self, symtab, columns):
+        self.assertEqual(
+            sorted(columns),
+            ['st_info', 'st_name', 'st_other', 'st_shndx', 'st_size',
+             'st_value'])
+        names = symtab.symbol_names(columns['st_name'])
+        self.assertEqual(len(names), symtab.num_symbols())
+        for i, sym in enumerate(symtab.iter_symbols()):
+            self.assertEqual(names[i], sym.name)
+            self.assertEqual(columns['st_name'][i], sym['st_name'])
+            self.assertEqual(columns['st_value'][i], sym['st_value'])
+            self.assertEqual(columns['st_size'][i], sym['st_size'])
+            self.assertEqual(columns['st_info'][i] & 0xf,
+                             ENUM_ST_INFO_TYPE[sym['st_info']['type']])
+            if isinstance(sym['st_shndx'], int):
+                self.assertEqual(columns['st_shndx'][i], sym['st_shndx'])
+
+    def test_array_columns(self):
+        for symtab in _symtabs():
+            columns = symtab.to_arrays(use_numpy=False)
+            self.assertIsInstance(columns['st_value'], array.array)
+            self._check_columns(symtab, columns)
+            self.assertEqual(symtab.symbol_names(), symtab.symbol_names(
+                columns['st_name']))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_columns(self):
+        for symtab in _symtabs():
+            columns = symtab.to_arrays()
+            self.assertIsInstance(columns['st_value'], numpy.ndarray)
+            self._check_columns(symtab, columns)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_same_as_arrays(self):
+        for symtab in _symtabs():
+            columns = symtab.to_arrays(use_numpy=True)
+            array_columns = symtab.to_arrays(use_numpy=False)
+            self.assertEqual(list(columns), list(array_columns))
+            for name in columns:
+                self.assertEqual(columns[name].tolist(),
+                                 array_columns[name].tolist())
+
+    def test_empty_table(self):
+        for symtab in _symtabs():
+            header = symtab.header.copy()
+            header['sh_size'] = 0
+            empty = SymbolTableSection(header, symtab.name, symtab.elffile,
+                                       symtab.stringtable)
+            for use_numpy in (False, True) if numpy else (False,):
+                columns = empty.to_arrays(use_numpy=use_numpy)
+                self.assertEqual(list(columns),
+                                 list(symtab.to_arrays(use_numpy=use_numpy)))
+                self.assertTrue(all(len(column) == 0
+                                    for column in columns.values()))
+            self.assertEqual(empty.symbol_names(), [])
+
+
+class TestCompactSymbol(unittest.TestCase):
+    def test_compact_symbols(self):
+        for symtab in _symtabs():
+            symbols = list(symtab.iter_symbols())
+            compact = list(symtab.iter_symbols(compact=True))
+            self.assertEqual(len(symbols), len(compact))
+            for i, (sym, compact_sym) in enumerate(zip(symbols, compact)):
+                self.assertIsInstance(compact_sym, CompactSymbol)
+                self.assertFalse(hasattr(compact_sym, '__dict__'))
+                self.assertEqual(compact_sym.name, sym.name)
+                self.assertEqual(compact_sym.entry, sym.entry)
+                for field in ('st_name', 'st_value', 'st_size', 'st_info',
+                              'st_other', 'st_shndx'):
+                    self.assertEqual(compact_sym[field], sym[field])
+                self.assertEqual(compact_sym['st_info']['type'],
+                                 sym['st_info']['type'])
+            self.assertEqual(symtab.get_symbol(i, compact=True).entry,
+                             sym.entry)
+            with self.assertRaises(KeyError):
+                compact[0]['st_nonexistent']
+
+
+if __name__ == '__main__':
+    unittest.main()
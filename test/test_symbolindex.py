@@ -0,0 +1,119 @@
+#-------------------------------------------------------------------------------
+# Tests the address to symbol index
+#
+# This code is in the public domain
+#-------------------------------------------------------------------------------
+import os
+import unittest
+
+from elftools.elf.elffile import ELFFile
+from elftools.elf.dynamic import DynamicSegment
+from elftools.elf.sections import Symbol
+from elftools.elf.symbolindex import SymbolAddressIndex
+
+
+class FakeSymbolTable(object):
+    def __init__(self, symbols):
+        self.symbols = [
+            Symbol(dict(st_value=value, st_size=size,
+                        st_info=dict(bind=bind, type=type),
+                        st_shndx=shndx), name)
+            for name, value, size, bind, type, shndx in symbols]
+
+    def get_symbol(self, n):
+        return self.symbols[n]
+
+    def iter_symbols(self):
+        return iter(self.symbols)
+
+
+class TestSymbolAddressIndex(unittest.TestCase):
+    def _check_linear(self, symtab, index, addresses):
+        """ Compare lookups with a linear scan of the table
+        """
+        symbols = [sym for sym in symtab.iter_symbols()
+                   if sym['st_info']['type'] in ('STT_FUNC', 'STT_OBJECT') and
+                      sym['st_shndx'] != 'SHN_UNDEF']
+        found = 0
+        results = index.lookup_many(addresses)
+        for address, result in zip(addresses, results):
+            containing = [sym.name for sym in symbols
+                          if sym['st_value'] <= address <
+                              sym['st_value'] + sym['st_size']]
+            exact = [sym.name for sym in symbols
+                     if sym['st_value'] == address and sym['st_size'] == 0]
+            sym = index.lookup(address)
+            if containing:
+                self.assertIn(sym.name, containing)
+                found += 1
+            elif exact:
+                self.assertIn(sym.name, exact)
+            else:
+                self.assertIsNone(sym)
+            self.assertEqual(result.name if result else None,
+                             sym.name if sym else None)
+        self.assertGreater(found, 0)
+
+    def test_symtab(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'simple_gcc.elf.arm')
+        with open(path, 'rb') as f:
+            elf = ELFFile(f)
+            symtab = elf.get_section_by_name('.symtab')
+            text = elf.get_section_by_name('.text')
+            addresses = list(range(text['sh_addr'] + text['sh_size'] + 16,
+                                   text['sh_addr'] - 16, -3))
+            self._check_linear(symtab, SymbolAddressIndex(symtab), addresses)
+
+    def test_dynamic_segment(self):
+        path = os.path.join('test', 'testfiles_for_unittests',
+                            'lib_versioned64.so.1.elf')
+        with open(path, 'rb') as f:
+            elf = ELFFile(f)
+            segment = next(seg for seg in elf.iter_segments()
+                           if isinstance(seg, DynamicSegment))
+            index = SymbolAddressIndex(segment, types=None)
+            symbols = [sym for sym in segment.iter_symbols()
+                       if sym['st_size'] > 0 and
+                          sym['st_shndx'] != 'SHN_UNDEF']
+            self.assertTrue(symbols)
+            for sym in symbols:
+                self.assertEqual(
+                    index.lookup(sym['st_value'] + sym['st_size'] - 1)[
+                        'st_value'],
+                    sym['st_value'])
+
+    def test_nested_aliases_and_zero_size(self):
+        symtab = FakeSymbolTable([
+            ('undef', 0x100, 0x10, 'STB_GLOBAL', 'STT_FUNC', 'SHN_UNDEF'),
+            ('outer', 0x100, 0x100, 'STB_GLOBAL', 'STT_FUNC', 1),
+            ('inner_local', 0x140, 0x20, 'STB_LOCAL', 'STT_FUNC', 1),
+            ('inner_weak', 0x140, 0x20, 'STB_WEAK', 'STT_FUNC', 1),
+            ('label', 0x150, 0, 'STB_GLOBAL', 'STT_FUNC', 1),
+            ('marker', 0x300, 0, 'STB_GLOBAL', 'STT_OBJECT', 1),
+            ('section', 0x300, 0x10, 'STB_LOCAL', 'STT_SECTION', 1),
+            ('data', 0x400, 0x8, 'STB_GLOBAL', 'STT_OBJECT', 1),
+        ])
+        index = SymbolAddressIndex(symtab)
+        expected = {
+            0xff: None, 0x100: 'outer', 0x13f: 'outer',
+            0x140: 'inner_weak', 0x150: 'inner_weak', 0x15f: 'inner_weak',
+            0x160: 'outer', 0x1ff: 'outer', 0x200: None,
+            0x300: 'marker', 0x301: None, 0x404: 'data', 0x408: None,
+        }
+        for address, name in expected.items():
+            sym = index.lookup(address)
+            self.assertEqual(sym.name if sym else None, name)
+        results = index.lookup_many(list(expected))
+        self.assertEqual([sym.name if sym else None for sym in results],
+                         list(expected.values()))
+        self.assertEqual([sym.name for sym in index.aliases(0x145)],
+                         ['inner_weak', 'inner_local'])
+        self.assertEqual(index.aliases(0x200), [])
+
+        index = SymbolAddressIndex(symtab, types=None)
+        self.assertEqual(index.lookup(0x301).name, 'section')
+
+
+if __name__ == '__main__':
+    unittest.main()
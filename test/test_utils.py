@@ -9,7 +9,7 @@ from io import BytesIO
 from random import randint
 
 from elftools.common.utils import (parse_cstring_from_stream, merge_dicts,
-        preserve_stream_pos)
+        preserve_stream_pos, LRUCache)
 
 
 class Test_parse_cstring_from_stream(unittest.TestCase):
@@ -64,5 +64,31 @@ class Test_merge_dicts(unittest.TestCase):
         self.assertEqual(md, {10: 20, 20: 40, 50: 60})
 
 
+class Test_LRUCache(unittest.TestCase):
+    def test_count_bound(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertIsNone(cache.get('b'))
+
+    def test_size_bound(self):
+        cache = LRUCache(10, len)
+        cache.put('a', b'12345')
+        cache.put('b', b'1234')
+        self.assertEqual(cache.size, 9)
+        cache.put('c', b'12')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 6)
+        cache.put('d', b'12345678901')
+        self.assertNotIn('d', cache)
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+
 if __name__ == '__main__':
     unittest.main()